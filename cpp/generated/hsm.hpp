@@ -1,5 +1,6 @@
 #pragma once
 // Generated by StateSurf minimal generator (v1 subset). C++11 header-only.
+#include <cstddef>
 #include <cstdint>
 
 enum class HsmState : std::uint8_t {
@@ -111,6 +112,45 @@ public:
       }
     }
     on_event(current_state_, event);
+    react(event);
+  }
+
+  /**
+   * @brief Dispatches `[first, last)` in order, exactly like repeated
+   * `dispatch` calls, with the started/terminated checks hoisted out of the
+   * loop. Stops right after the event that terminates the machine.
+   * @return Number of events consumed.
+   */
+  template <typename InputIt>
+  std::size_t dispatch_many(InputIt first, InputIt last) {
+    if (terminated_) {
+      return 0;
+    }
+    if (!started_) {
+      start();
+      if (!started_) {
+        return 0;
+      }
+    }
+    std::size_t consumed = 0;
+    for (; first != last; ++first) {
+      const HsmEvent event = *first;
+      on_event(current_state_, event);
+      react(event);
+      ++consumed;
+      if (terminated_) {
+        break;
+      }
+    }
+    return consumed;
+  }
+
+  std::size_t dispatch_many(const HsmEvent* events, std::size_t count) {
+    return dispatch_many(events, events + count);
+  }
+
+private:
+  void react(HsmEvent event) {
     switch (current_state_) {
       case HsmState::s:
         handle_s(event);
@@ -136,7 +176,6 @@ public:
     }
   }
 
-private:
   void handle_s(HsmEvent event) {
     switch (event) {
       case HsmEvent::I:
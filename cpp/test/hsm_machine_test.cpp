@@ -187,3 +187,29 @@ TEST(StateSurfMachine, DrivesThroughLifecycle) {
   EXPECT_TRUE(machine.terminated());
   EXPECT_EQ(machine.state(), HsmState::FinalPseudoState);
 }
+
+TEST(StateSurfMachine, DispatchManyMatchesRepeatedDispatch) {
+  const std::vector<HsmEvent> events{
+      HsmEvent::G, HsmEvent::I, HsmEvent::A, HsmEvent::D, HsmEvent::D,
+      HsmEvent::C, HsmEvent::E, HsmEvent::I, HsmEvent::I, HsmEvent::TERMINATE,
+      HsmEvent::A, HsmEvent::B};
+
+  RecordingCallbacks single_callbacks;
+  HsmMachine<RecordingCallbacks> single(single_callbacks);
+  for (HsmEvent event : events) {
+    single.dispatch(event);
+  }
+
+  RecordingCallbacks batch_callbacks;
+  HsmMachine<RecordingCallbacks> batch(batch_callbacks);
+  const std::size_t consumed = batch.dispatch_many(events.data(), events.size());
+
+  EXPECT_EQ(consumed, std::size_t{10});
+  EXPECT_TRUE(batch.terminated());
+  EXPECT_EQ(batch.state(), single.state());
+  EXPECT_EQ(batch_callbacks.entries, single_callbacks.entries);
+  EXPECT_EQ(batch_callbacks.exits, single_callbacks.exits);
+  EXPECT_EQ(batch_callbacks.actions, single_callbacks.actions);
+  EXPECT_EQ(batch_callbacks.guard_calls, single_callbacks.guard_calls);
+  EXPECT_EQ(batch.dispatch_many(events.begin(), events.end()), std::size_t{0});
+}
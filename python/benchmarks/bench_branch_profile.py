@@ -0,0 +1,108 @@
+"""Python dispatch speed with and without --branch-profile on skewed event streams.
+
+For each model a --counters machine is run on a training stream and its
+stats() dump becomes the branch profile; the plain and the profile-ordered
+machines are then timed on a different stream drawn from the same skewed
+distribution. Events get Zipf weights with the hottest ones last in model
+order, i.e. at the bottom of the default if/elif chains. Events that
+terminate the machine are left out, so restarts do not swamp the timings.
+
+Run from the repository root: python3 -m python.benchmarks.bench_branch_profile
+"""
+import argparse
+import json
+import random
+import time
+import types
+from pathlib import Path
+
+from python import statesurf
+from python.benchmarks.models import nested_puml, synthetic_puml
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def load_machine(model: statesurf.Model, options: statesurf.CodegenOptions) -> types.ModuleType:
+    module = types.ModuleType("bench_branch_profile_machine")
+    code = statesurf.gen_code(model, "PMachine", "python", "bench", "P", options)
+    exec(compile(code, "<bench>", "exec"), module.__dict__)
+    return module
+
+
+def skewed_stream(model: statesurf.Model, module: types.ModuleType, steps: int, skew: float, seed: int) -> list:
+    terminating = {statesurf.normalize_identifier(t.event) for t in model.transitions if t.dst is None}
+    events = [event for event in module.PEvent if event.name not in terminating]
+    weights = [1.0 / (rank + 1) ** skew for rank in reversed(range(len(events)))]
+    return random.Random(seed).choices(events, weights, k=steps)
+
+
+def run(module: types.ModuleType, stream: list, seed: int = 1):
+    """Dispatch ``stream`` into a fresh machine whose guards flip a seeded coin."""
+    rng = random.Random(seed)
+
+    class Callbacks(module.PCallbacks):
+        def on_entry(self, state) -> None:
+            pass
+
+        def on_exit(self, state) -> None:
+            pass
+
+        def guard(self, state, event, guard) -> bool:
+            return rng.random() < 0.5
+
+        def action(self, state, event, action) -> None:
+            pass
+
+    machine = module.PMachine(Callbacks())
+    remaining = iter(stream)
+    # dispatch_many stops after a terminating event; reset and carry on.
+    while machine.dispatch_many(remaining):
+        machine.reset()
+    return machine
+
+
+def record_profile(model: statesurf.Model, steps: int, skew: float, dispatch: str) -> bytes:
+    """The stats() dump of a --counters machine run on a training stream."""
+    module = load_machine(model, statesurf.CodegenOptions(dispatch=dispatch, counters=True))
+    machine = run(module, skewed_stream(model, module, steps, skew, seed=7))
+    return json.dumps(machine.stats()).encode("utf-8")
+
+
+def python_ns(module: types.ModuleType, stream: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(module, stream)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e9 / len(stream)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--steps", type=int, default=200_000)
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    ap.add_argument("--skew", type=float, default=1.5, help="Zipf exponent of the event weights (default: 1.5)")
+    ap.add_argument("--dispatch", choices=statesurf.DISPATCH_MODES, default="switch")
+    ap.add_argument("--trace", choices=statesurf.TRACE_MODES, default="none")
+    args = ap.parse_args(argv)
+
+    models = {
+        "hsm": statesurf.parse_puml(REPO_ROOT / "plantuml" / "hsm.puml"),
+        "flat-300": statesurf.parse_puml_text(synthetic_puml(states=300, events=32)),
+        "nested-12x8": statesurf.parse_puml_text(nested_puml(depth=12, width=8)),
+    }
+    print(f"{'model':<14}{'plain ns':>10}{'profiled ns':>13}{'speedup':>9}")
+    for name, model in models.items():
+        profile = record_profile(model, args.steps, args.skew, args.dispatch)
+        results = []
+        for branch_profile in (None, profile):
+            options = statesurf.CodegenOptions(dispatch=args.dispatch, trace=args.trace, branch_profile=branch_profile)
+            module = load_machine(model, options)
+            results.append(python_ns(module, skewed_stream(model, module, args.steps, args.skew, seed=11), args.repeat))
+        plain, profiled = results
+        print(f"{name:<14}{plain:>10.1f}{profiled:>13.1f}{plain / profiled:>8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""Cold vs. warm cost of gen_code per language.
+
+cold      fresh template environment, templates compiled from source
+bytecode  fresh environment loading templates from the on-disk bytecode cache
+warm      shared environment with templates already compiled in memory
+
+Run from the repository root: python3 -m python.benchmarks.bench_codegen
+"""
+import argparse
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, List
+
+from python import statesurf
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+LANGUAGES = ["cpp", "rust", "python"]
+
+
+def _time_once(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _median(samples: List[float]) -> float:
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2]
+
+
+def bench_language(model_path: Path, language: str, repeat: int) -> dict:
+    model = statesurf.parse_puml(model_path)
+    namespace_base = statesurf.generate_namespace_base(model_path)
+    type_prefix = statesurf.generate_type_prefix(model_path)
+
+    def render() -> str:
+        return statesurf.gen_code(model, f"{type_prefix}Machine", language, namespace_base, type_prefix)
+
+    cold: List[float] = []
+    from_bytecode: List[float] = []
+    for _ in range(repeat):
+        statesurf.configure_template_cache(None)
+        cold.append(_time_once(render))
+        with TemporaryDirectory() as tmp:
+            statesurf.configure_template_cache(Path(tmp))
+            render()
+            statesurf.configure_template_cache(Path(tmp))
+            from_bytecode.append(_time_once(render))
+    render()
+    warm = [_time_once(render) for _ in range(repeat)]
+    return {
+        "language": language,
+        "cold": _median(cold),
+        "bytecode": _median(from_bytecode),
+        "warm": _median(warm),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-i", "--input", default=str(REPO_ROOT / "plantuml" / "hsm.puml"))
+    ap.add_argument("-r", "--repeat", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    print(f"{'language':<10}{'cold':>12}{'bytecode':>12}{'warm':>12}")
+    for language in LANGUAGES:
+        row = bench_language(Path(args.input), language, args.repeat)
+        print(
+            f"{language:<10}"
+            f"{row['cold'] * 1000:>10.2f}ms"
+            f"{row['bytecode'] * 1000:>10.2f}ms"
+            f"{row['warm'] * 1000:>10.2f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
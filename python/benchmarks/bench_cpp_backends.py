@@ -0,0 +1,174 @@
+"""Code size and dispatch speed of the C++ switch and table backends.
+
+Each backend is compiled twice with the system C++ compiler: a translation
+unit that only instantiates the machine (for .text/.rodata sizes) and a
+driver that feeds it a seeded random event stream (for ns/dispatch).
+
+Run from the repository root: python3 -m python.benchmarks.bench_cpp_backends
+"""
+import argparse
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional
+
+from python import statesurf
+from python.benchmarks.models import nested_puml, synthetic_puml
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+BACKENDS = ["switch", "table"]
+
+DRIVER = """\
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <vector>
+
+#include "machine.hpp"
+
+namespace {
+
+std::uint64_t next(std::uint64_t& x) {
+  x ^= x << 13;
+  x ^= x >> 7;
+  x ^= x << 17;
+  return x;
+}
+
+struct Callbacks {
+  std::uint64_t rng;
+  std::uint64_t sink;
+
+  void on_entry(PState s) { sink += static_cast<std::uint64_t>(s); }
+  void on_exit(PState s) { sink += static_cast<std::uint64_t>(s) << 1; }
+  bool guard(PState, PEvent, PGuardId) { return (next(rng) & 1) != 0; }
+  void action(PState, PEvent, PActionId a) { sink += static_cast<std::uint64_t>(a); }
+};
+
+}  // namespace
+
+int main(int, char** argv) {
+  const std::size_t steps = std::strtoull(argv[1], nullptr, 10);
+  std::uint64_t seed = 0x9E3779B97F4A7C15ull;
+  std::vector<PEvent> events(steps);
+  for (auto& event : events) {
+    event = static_cast<PEvent>(next(seed) % EVENT_COUNT);
+  }
+  Callbacks callbacks{0x2545F4914F6CDD1Dull, 0};
+  PMachine<Callbacks> machine(callbacks);
+  const auto started = std::chrono::steady_clock::now();
+  for (const PEvent event : events) {
+    machine.dispatch(event);
+    if (machine.terminated()) machine.reset();
+  }
+  const auto elapsed = std::chrono::steady_clock::now() - started;
+  const double ns = static_cast<double>(std::chrono::duration_cast<std::chrono::nanoseconds>(elapsed).count());
+  std::printf("%.3f %llu\\n", ns / static_cast<double>(steps), static_cast<unsigned long long>(callbacks.sink));
+  return 0;
+}
+"""
+
+INSTANTIATION = """\
+#include "machine.hpp"
+
+struct Callbacks {
+  void on_entry(PState);
+  void on_exit(PState);
+  bool guard(PState, PEvent, PGuardId);
+  void action(PState, PEvent, PActionId);
+  std::uint64_t trace_clock();
+};
+
+template class PMachine<Callbacks>;
+"""
+
+
+def compiler() -> Optional[str]:
+    return os.environ.get("CXX") or shutil.which("g++") or shutil.which("clang++")
+
+
+def write_sources(directory: Path, model: statesurf.Model, options: statesurf.CodegenOptions) -> None:
+    header = statesurf.gen_code(model, "PMachine", "cpp", "bench", "P", options)
+    (directory / "machine.hpp").write_text(header, encoding="utf-8")
+    (directory / "driver.cpp").write_text(DRIVER, encoding="utf-8")
+    (directory / "instantiate.cpp").write_text(INSTANTIATION, encoding="utf-8")
+
+
+def build_driver(directory: Path, model: statesurf.Model, options: statesurf.CodegenOptions, opt: str = "-O2") -> Path:
+    write_sources(directory, model, options)
+    binary = directory / "driver"
+    subprocess.run(
+        [
+            compiler(), "-std=c++11", opt, "-Wall", "-Wextra", "-Werror",
+            f"-DEVENT_COUNT={max(len(model.events), 1)}", "-I", str(directory),
+            str(directory / "driver.cpp"), "-o", str(binary),
+        ],
+        check=True,
+    )
+    return binary
+
+
+def section_sizes(directory: Path, model: statesurf.Model, options: statesurf.CodegenOptions, opt: str) -> Dict[str, int]:
+    write_sources(directory, model, options)
+    obj = directory / "instantiate.o"
+    subprocess.run(
+        [compiler(), "-std=c++11", opt, "-c", "-I", str(directory), str(directory / "instantiate.cpp"), "-o", str(obj)],
+        check=True,
+    )
+    out = subprocess.run(["size", "-A", str(obj)], check=True, capture_output=True, text=True).stdout
+    sizes = {"text": 0, "rodata": 0}
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and fields[1].isdigit():
+            for kind in sizes:
+                if fields[0].startswith(f".{kind}"):
+                    sizes[kind] += int(fields[1])
+    return sizes
+
+
+def bench_model(name: str, model: statesurf.Model, steps: int, repeat: int, opt: str) -> List[dict]:
+    rows = []
+    for dispatch in BACKENDS:
+        options = statesurf.CodegenOptions(dispatch=dispatch)
+        with TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            sizes = section_sizes(directory, model, options, opt)
+            binary = build_driver(directory, model, options, opt)
+            samples = []
+            for _ in range(repeat):
+                out = subprocess.run([str(binary), str(steps)], check=True, capture_output=True, text=True).stdout
+                samples.append(float(out.split()[0]))
+        rows.append({"model": name, "dispatch": dispatch, "ns": min(samples), **sizes})
+    return rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--steps", type=int, default=1_000_000)
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    ap.add_argument("--opt", default="-Os", help="Optimization flag for both backends (default: -Os)")
+    args = ap.parse_args(argv)
+    if compiler() is None:
+        print("No C++ compiler found (set CXX)")
+        return 1
+
+    models = {
+        "hsm": statesurf.parse_puml(REPO_ROOT / "plantuml" / "hsm.puml"),
+        "flat-300": statesurf.parse_puml_text(synthetic_puml(states=300, events=32)),
+        "nested-12x8": statesurf.parse_puml_text(nested_puml(depth=12, width=8)),
+    }
+    print(f"{'model':<14}{'dispatch':<10}{'.text':>9}{'.rodata':>9}{'total':>9}{'ns/dispatch':>13}")
+    for name, model in models.items():
+        for row in bench_model(name, model, args.steps, args.repeat, args.opt):
+            print(
+                f"{row['model']:<14}{row['dispatch']:<10}{row['text']:>9}{row['rodata']:>9}"
+                f"{row['text'] + row['rodata']:>9}{row['ns']:>13.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+"""parse_puml throughput over synthetic large models.
+
+Run from the repository root: python3 -m python.benchmarks.bench_parse
+"""
+import argparse
+import time
+
+from python import statesurf
+from python.benchmarks.models import synthetic_puml
+
+
+def bench_parse(text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        statesurf.parse_puml_text(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--states", type=int, nargs="+", default=[100, 1000, 4000])
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    print(f"{'states':>8}{'lines':>10}{'best':>12}{'lines/s':>14}")
+    for states in args.states:
+        text = synthetic_puml(states=states)
+        lines = text.count("\n")
+        best = bench_parse(text, args.repeat)
+        print(f"{states:>8}{lines:>10}{best * 1000:>10.1f}ms{lines / best:>14,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
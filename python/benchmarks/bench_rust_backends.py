@@ -0,0 +1,167 @@
+"""Code size and dispatch speed of the Rust match and table backends.
+
+Each backend is compiled with rustc into a small driver that feeds the
+machine a seeded random event stream; the driver's object file gives the
+.text/.rodata sizes and running it gives ns/dispatch. For hsm.puml alone,
+rust/tests/dispatch_bench.rs measures the same thing from cargo.
+
+Run from the repository root: python3 -m python.benchmarks.bench_rust_backends
+"""
+import argparse
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional
+
+from python import statesurf
+from python.benchmarks.bench_cpp_backends import BACKENDS
+from python.benchmarks.models import nested_puml, synthetic_puml
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+DRIVER = """\
+#![allow(dead_code)]
+include!("machine.rs");
+
+use bench::*;
+use std::hint::black_box;
+use std::time::Instant;
+
+fn next(x: &mut u64) -> u64 {
+    *x ^= *x << 13;
+    *x ^= *x >> 7;
+    *x ^= *x << 17;
+    *x
+}
+
+const EVENTS: [PEvent; EVENT_COUNT] = [EVENT_LIST];
+
+struct Callbacks {
+    rng: u64,
+    sink: u64,
+}
+
+impl PCallbacks for Callbacks {
+    fn on_entry(&mut self, state: PState) {
+        self.sink += state as u64;
+    }
+
+    fn on_exit(&mut self, state: PState) {
+        self.sink += (state as u64) << 1;
+    }
+
+    fn guard(&mut self, _state: PState, _event: PEvent, _guard: PGuardId) -> bool {
+        next(&mut self.rng) & 1 == 1
+    }
+
+    fn action(&mut self, _state: PState, _event: PEvent, action: PActionId) {
+        self.sink += action as u64;
+    }
+}
+
+fn main() {
+    let steps: usize = std::env::args().nth(1).unwrap().parse().unwrap();
+    let mut seed = 0x9E37_79B9_7F4A_7C15u64;
+    let events: Vec<PEvent> = (0..steps).map(|_| EVENTS[(next(&mut seed) % EVENT_COUNT as u64) as usize]).collect();
+    let mut machine = PMachine::new(Callbacks { rng: 0x2545_F491_4F6C_DD1D, sink: 0 });
+    let started = Instant::now();
+    for &event in &events {
+        machine.dispatch(black_box(event));
+        if machine.terminated() {
+            machine.reset();
+        }
+    }
+    let elapsed = started.elapsed().as_nanos() as f64;
+    println!("{:.3} {}", elapsed / steps as f64, machine.callbacks().sink);
+}
+"""
+
+
+def compiler() -> Optional[str]:
+    return os.environ.get("RUSTC") or shutil.which("rustc")
+
+
+def write_sources(directory: Path, model: statesurf.Model, options: statesurf.CodegenOptions) -> Path:
+    code = statesurf.gen_code(model, "PMachine", "rust", "bench", "P", options)
+    (directory / "machine.rs").write_text(code, encoding="utf-8")
+    events = [statesurf.normalize_identifier(e) for e in sorted(model.events)] or ["__None"]
+    driver = DRIVER.replace("EVENT_COUNT", str(len(events))).replace(
+        "EVENT_LIST", ", ".join(f"PEvent::{e}" for e in events)
+    )
+    source = directory / "driver.rs"
+    source.write_text(driver, encoding="utf-8")
+    return source
+
+
+def build_driver(directory: Path, model: statesurf.Model, options: statesurf.CodegenOptions, opt: str = "3") -> Path:
+    source = write_sources(directory, model, options)
+    binary = directory / "driver"
+    subprocess.run(
+        [
+            compiler(), "--edition", "2021", "-C", f"opt-level={opt}", "-C", "codegen-units=1",
+            "-D", "warnings", "--emit", f"link={binary},obj={directory / 'driver.o'}",
+            str(source),
+        ],
+        check=True,
+        cwd=directory,
+    )
+    return binary
+
+
+def section_sizes(obj: Path) -> Dict[str, int]:
+    out = subprocess.run(["size", "-A", str(obj)], check=True, capture_output=True, text=True).stdout
+    sizes = {"text": 0, "rodata": 0}
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and fields[1].isdigit():
+            for kind in sizes:
+                if fields[0].startswith(f".{kind}"):
+                    sizes[kind] += int(fields[1])
+    return sizes
+
+
+def bench_model(name: str, model: statesurf.Model, steps: int, repeat: int, opt: str) -> List[dict]:
+    rows = []
+    for dispatch in BACKENDS:
+        options = statesurf.CodegenOptions(dispatch=dispatch)
+        with TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            binary = build_driver(directory, model, options, opt)
+            sizes = section_sizes(directory / "driver.o")
+            samples = []
+            for _ in range(repeat):
+                out = subprocess.run([str(binary), str(steps)], check=True, capture_output=True, text=True).stdout
+                samples.append(float(out.split()[0]))
+        rows.append({"model": name, "dispatch": dispatch, "ns": min(samples), **sizes})
+    return rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--steps", type=int, default=1_000_000)
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    ap.add_argument("--opt", default="s", help="rustc opt-level for both backends (default: s)")
+    args = ap.parse_args(argv)
+    if compiler() is None:
+        print("No rustc found (set RUSTC)")
+        return 1
+
+    models = {
+        "hsm": statesurf.parse_puml(REPO_ROOT / "plantuml" / "hsm.puml"),
+        "flat-300": statesurf.parse_puml_text(synthetic_puml(states=300, events=32)),
+        "nested-12x8": statesurf.parse_puml_text(nested_puml(depth=12, width=8)),
+    }
+    print(f"{'model':<14}{'dispatch':<10}{'.text':>9}{'.rodata':>9}{'total':>9}{'ns/dispatch':>13}")
+    for name, model in models.items():
+        for row in bench_model(name, model, args.steps, args.repeat, args.opt):
+            print(
+                f"{row['model']:<14}{row['dispatch']:<10}{row['text']:>9}{row['rodata']:>9}"
+                f"{row['text'] + row['rodata']:>9}{row['ns']:>13.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+"""Dispatch speed and code size of generated machines in every language.
+
+Each --shape is synthesized into a model (composites of 10 leaves for depth
+1, a chain of nested composites otherwise), generated for every language and
+dispatch backend, and driven with the seeded random event streams of
+bench_trace (Python) and the bench_cpp_backends / bench_rust_backends
+drivers. Rows report ns/dispatch, events/sec, generated source bytes and,
+for C++ and Rust, .text/.rodata of the compiled machine. --json writes the
+rows together with the environment they were measured in, and --baseline
+prints the ns/dispatch change against an earlier --json file.
+
+Run from the repository root: python3 -m python.benchmarks.bench_suite
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from python import statesurf
+from python.benchmarks import bench_cpp_backends, bench_rust_backends
+from python.benchmarks.bench_trace import python_ns
+from python.benchmarks.models import nested_puml, synthetic_puml
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+LANGUAGES = ["python", "cpp", "rust"]
+REPORT_FORMAT = "statesurf-bench"
+REPORT_VERSION = 1
+SHAPE_DEFAULTS = {"states": 100, "depth": 1, "events": 16, "guards": 0.3}
+DEFAULT_SHAPES = ["states=300,events=32", "states=96,depth=12,events=16"]
+
+
+def parse_shape(text: str) -> Dict[str, float]:
+    """``key=value`` pairs (states, depth, events, guards) over SHAPE_DEFAULTS."""
+    shape = dict(SHAPE_DEFAULTS)
+    for item in filter(None, text.split(",")):
+        key, _, value = item.partition("=")
+        if key not in shape:
+            raise argparse.ArgumentTypeError(f"Unknown shape key '{key}'. Available: {', '.join(shape)}")
+        try:
+            shape[key] = type(SHAPE_DEFAULTS[key])(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Bad value for shape key '{key}': {value!r}") from None
+    if shape["states"] < 1 or shape["depth"] < 1 or shape["events"] < 1 or not 0.0 <= shape["guards"] <= 1.0:
+        raise argparse.ArgumentTypeError(f"Shape out of range: {text!r}")
+    return shape
+
+
+def shape_name(shape: Dict[str, float]) -> str:
+    return f"s{shape['states']}-d{shape['depth']}-e{shape['events']}-g{shape['guards']:g}"
+
+
+def shape_model(shape: Dict[str, float], seed: int) -> statesurf.Model:
+    if shape["depth"] == 1:
+        text = synthetic_puml(
+            states=shape["states"], events=shape["events"], seed=seed, guard_ratio=shape["guards"]
+        )
+    else:
+        text = nested_puml(
+            depth=shape["depth"],
+            width=max(1, shape["states"] // shape["depth"]),
+            events=shape["events"],
+            seed=seed,
+            guard_ratio=shape["guards"],
+        )
+    return statesurf.parse_puml_text(text)
+
+
+def source_bytes(model: statesurf.Model, language: str, dispatch: str) -> int:
+    options = statesurf.CodegenOptions(dispatch=dispatch)
+    return len(statesurf.gen_code(model, "PMachine", language, "bench", "P", options).encode("utf-8"))
+
+
+def bench_shape(shape: Dict[str, float], languages: List[str], args: argparse.Namespace) -> List[dict]:
+    model = shape_model(shape, args.seed)
+    common = {
+        "shape": shape_name(shape),
+        **shape,
+        "model_states": len(model.nodes) - 1,
+        "model_transitions": len(model.transitions),
+    }
+    rows = []
+    for language in languages:
+        if language == "python":
+            measured = [
+                {
+                    "dispatch": dispatch,
+                    "ns": python_ns(model, statesurf.CodegenOptions(dispatch=dispatch), args.python_steps, args.repeat),
+                    "text": None,
+                    "rodata": None,
+                }
+                for dispatch in bench_cpp_backends.BACKENDS
+            ]
+        else:
+            bench, opt = (bench_cpp_backends, args.cpp_opt) if language == "cpp" else (bench_rust_backends, args.rust_opt)
+            measured = bench.bench_model(common["shape"], model, args.steps, args.repeat, opt)
+        for row in measured:
+            rows.append(
+                {
+                    **common,
+                    "language": language,
+                    "dispatch": row["dispatch"],
+                    "ns": row["ns"],
+                    "events_per_sec": 1e9 / row["ns"] if row["ns"] else None,
+                    "source_bytes": source_bytes(model, language, row["dispatch"]),
+                    "text": row["text"],
+                    "rodata": row["rodata"],
+                }
+            )
+    return rows
+
+
+def tool_version(command: List[str]) -> Optional[str]:
+    try:
+        out = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.splitlines()[0] if out else None
+
+
+def environment(args: argparse.Namespace, languages: List[str]) -> dict:
+    cxx = bench_cpp_backends.compiler()
+    rustc = bench_rust_backends.compiler()
+    return {
+        "revision": tool_version(["git", "-C", str(REPO_ROOT), "rev-parse", "HEAD"]),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cxx": tool_version([cxx, "--version"]) if cxx and "cpp" in languages else None,
+        "rustc": tool_version([rustc, "--version"]) if rustc and "rust" in languages else None,
+        "cpp_opt": args.cpp_opt,
+        "rust_opt": args.rust_opt,
+        "steps": args.steps,
+        "python_steps": args.python_steps,
+        "repeat": args.repeat,
+        "seed": args.seed,
+    }
+
+
+def row_key(row: dict) -> tuple:
+    return row["shape"], row["language"], row["dispatch"]
+
+
+def format_rows(rows: List[dict], baseline: Optional[Dict[tuple, dict]] = None) -> str:
+    header = f"{'shape':<22}{'language':<10}{'dispatch':<10}{'ns/dispatch':>13}{'events/s':>13}{'source':>9}{'.text':>9}{'.rodata':>9}"
+    if baseline is not None:
+        header += f"{'vs base':>9}"
+    lines = [header]
+    for row in rows:
+        line = (
+            f"{row['shape']:<22}{row['language']:<10}{row['dispatch']:<10}{row['ns']:>13.1f}"
+            f"{row['events_per_sec'] or 0:>13.3g}{row['source_bytes']:>9}"
+            f"{'-' if row['text'] is None else row['text']:>9}{'-' if row['rodata'] is None else row['rodata']:>9}"
+        )
+        if baseline is not None:
+            before = baseline.get(row_key(row))
+            line += f"{100.0 * (row['ns'] - before['ns']) / before['ns']:>+8.1f}%" if before else f"{'new':>9}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def load_report(path: Path) -> Dict[tuple, dict]:
+    report = json.loads(path.read_text(encoding="utf-8"))
+    if report.get("format") != REPORT_FORMAT or report.get("version") != REPORT_VERSION:
+        raise ValueError(f"{path} is not a {REPORT_FORMAT} v{REPORT_VERSION} report")
+    return {row_key(row): row for row in report["results"]}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument(
+        "--shape",
+        action="append",
+        type=parse_shape,
+        default=None,
+        help=(
+            "Model shape as key=value pairs: states, depth, events, guards (guarded share of transitions); "
+            f"repeatable (default: {' and '.join(DEFAULT_SHAPES)})"
+        ),
+    )
+    ap.add_argument("-l", "--languages", nargs="+", choices=LANGUAGES, default=LANGUAGES)
+    ap.add_argument("-n", "--steps", type=int, default=1_000_000, help="Events per native run")
+    ap.add_argument("--python-steps", type=int, default=200_000, help="Events per Python run")
+    ap.add_argument("-r", "--repeat", type=int, default=5, help="Runs per row; the fastest is reported")
+    ap.add_argument("--seed", type=int, default=0, help="Model synthesis seed")
+    ap.add_argument("--cpp-opt", default="-O2")
+    ap.add_argument("--rust-opt", default="3")
+    ap.add_argument("--json", default=None, help="Write the report as JSON to this path, or - for stdout")
+    ap.add_argument("--baseline", default=None, help="Earlier --json report to compare ns/dispatch against")
+    args = ap.parse_args(argv)
+
+    shapes = args.shape or [parse_shape(text) for text in DEFAULT_SHAPES]
+    languages = []
+    for language in args.languages:
+        if language == "cpp" and bench_cpp_backends.compiler() is None:
+            print("No C++ compiler found (set CXX); skipping cpp", file=sys.stderr)
+        elif language == "rust" and bench_rust_backends.compiler() is None:
+            print("No rustc found (set RUSTC); skipping rust", file=sys.stderr)
+        else:
+            languages.append(language)
+    baseline = load_report(Path(args.baseline)) if args.baseline else None
+
+    rows: List[dict] = []
+    for shape in shapes:
+        rows.extend(bench_shape(shape, languages, args))
+    report = {
+        "format": REPORT_FORMAT,
+        "version": REPORT_VERSION,
+        "environment": environment(args, languages),
+        "results": rows,
+    }
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_rows(rows, baseline))
+        if args.json:
+            Path(args.json).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+"""Per-dispatch cost of the --trace modes in every target language.
+
+The Python machine is timed in-process; the C++ and Rust machines reuse the
+drivers from bench_cpp_backends and bench_rust_backends. Overhead is the
+ns/dispatch difference against --trace none on the same model and backend.
+For Python, "format" is --trace hooks with on_event/on_transition replaced
+by loggers that format a line per call, for comparison with binary.
+
+Run from the repository root: python3 -m python.benchmarks.bench_trace
+"""
+import argparse
+import random
+import subprocess
+import time
+import types
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List
+
+from python import statesurf
+from python.benchmarks import bench_cpp_backends, bench_rust_backends
+from python.benchmarks.models import nested_puml
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def python_ns(
+    model: statesurf.Model, options: statesurf.CodegenOptions, steps: int, repeat: int, formatted: bool = False
+) -> float:
+    """ns/dispatch in-process; ``formatted`` overrides the hooks with string-formatting loggers."""
+    module = types.ModuleType("bench_trace_machine")
+    code = statesurf.gen_code(model, "PMachine", "python", "bench", "P", options)
+    exec(compile(code, "<bench>", "exec"), module.__dict__)
+    if formatted:
+        log: List[str] = []
+        module.on_event = lambda state, event: log.append(f"{state.name} : {event.name}")
+        module.on_transition = lambda src, dst, event: log.append(f"{src.name} --> {dst.name} : {event.name}")
+
+    class Callbacks(module.PCallbacks):
+        def on_entry(self, state) -> None:
+            pass
+
+        def on_exit(self, state) -> None:
+            pass
+
+        def guard(self, state, event, guard) -> bool:
+            return rng.random() < 0.5
+
+        def action(self, state, event, action) -> None:
+            pass
+
+    rng = random.Random(1)
+    events = list(module.PEvent)
+    stream = [rng.choice(events) for _ in range(steps)]
+    best = float("inf")
+    for _ in range(repeat):
+        machine = module.PMachine(Callbacks())
+        remaining = iter(stream)
+        started = time.perf_counter()
+        # dispatch_many stops after a terminating event; reset and carry on.
+        while machine.dispatch_many(remaining):
+            machine.reset()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e9 / steps
+
+
+def native_ns(
+    bench, model: statesurf.Model, options: statesurf.CodegenOptions, steps: int, repeat: int, opt: str
+) -> float:
+    with TemporaryDirectory() as tmp:
+        binary = bench.build_driver(Path(tmp), model, options, opt)
+        samples = []
+        for _ in range(repeat):
+            out = subprocess.run([str(binary), str(steps)], check=True, capture_output=True, text=True).stdout
+            samples.append(float(out.split()[0]))
+    return min(samples)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--steps", type=int, default=1_000_000)
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    ap.add_argument("--python-steps", type=int, default=200_000)
+    ap.add_argument("--capacity", type=int, default=statesurf.DEFAULT_TRACE_CAPACITY)
+    ap.add_argument("-l", "--languages", nargs="+", choices=["python", "cpp", "rust"], default=["python", "cpp", "rust"])
+    args = ap.parse_args(argv)
+
+    models = {
+        "hsm": statesurf.parse_puml(REPO_ROOT / "plantuml" / "hsm.puml"),
+        "nested-12x8": statesurf.parse_puml_text(nested_puml(depth=12, width=8)),
+    }
+    runners = []
+    if "python" in args.languages:
+        for dispatch in bench_cpp_backends.BACKENDS:
+            runners.append(("python", dispatch, lambda m, o: python_ns(m, o, args.python_steps, args.repeat)))
+    if "cpp" in args.languages and bench_cpp_backends.compiler():
+        for dispatch in bench_cpp_backends.BACKENDS:
+            runners.append(
+                ("cpp", dispatch, lambda m, o: native_ns(bench_cpp_backends, m, o, args.steps, args.repeat, "-O2"))
+            )
+    if "rust" in args.languages and bench_rust_backends.compiler():
+        for dispatch in bench_cpp_backends.BACKENDS:
+            runners.append(
+                ("rust", dispatch, lambda m, o: native_ns(bench_rust_backends, m, o, args.steps, args.repeat, "3"))
+            )
+
+    print(f"{'model':<14}{'language':<10}{'dispatch':<10}{'trace':<7}{'ns/dispatch':>13}{'overhead':>10}")
+    for name, model in models.items():
+        for language, dispatch, run in runners:
+            rows: List[tuple] = []
+            for trace in statesurf.TRACE_MODES:
+                options = statesurf.CodegenOptions(dispatch=dispatch, trace=trace, trace_capacity=args.capacity)
+                rows.append((trace, run(model, options)))
+            if language == "python":
+                options = statesurf.CodegenOptions(dispatch=dispatch)
+                rows.append(("format", python_ns(model, options, args.python_steps, args.repeat, formatted=True)))
+            baseline = rows[0][1]
+            for trace, ns in rows:
+                print(f"{name:<14}{language:<10}{dispatch:<10}{trace:<7}{ns:>13.1f}{ns - baseline:>+10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""Scaling of build_transitions_by_state over deep and wide hierarchies.
+
+Times the top-down resolution against the previous per-state ancestor walk
+plus depth sort, on nested synthetic models of growing depth and width.
+
+Run from the repository root: python3 -m python.benchmarks.bench_transitions
+"""
+import argparse
+import time
+from typing import Callable
+
+from python import statesurf
+from python.benchmarks.models import nested_puml
+
+
+def ancestor_walk(m: statesurf.Model):
+    """The per-state ancestor walk with a root-walking depth sort, for comparison."""
+    def depth(name: str) -> int:
+        d = 0
+        n = m.nodes[name]
+        while n.parent and n.parent.name != "__root__":
+            d += 1
+            n = n.parent
+        return d
+
+    by_src = {}
+    for t in m.transitions:
+        by_src.setdefault(t.src, []).append(t)
+    result = {}
+    for s in m.nodes:
+        if s == "__root__":
+            continue
+        cand = []
+        n = m.nodes[s]
+        while n and n.name != "__root__":
+            cand.extend(by_src.get(n.name, []))
+            n = n.parent
+        evmap = {}
+        for t in cand:
+            if t.event is not None:
+                evmap.setdefault(t.event, []).append(t)
+        for lst in evmap.values():
+            lst.sort(key=lambda t: depth(t.src), reverse=True)
+        result[s] = evmap
+    return result
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--depths", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    ap.add_argument("--widths", type=int, nargs="+", default=[8, 32])
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    print(f"{'depth':>6}{'width':>7}{'states':>8}{'top-down':>12}{'walk+sort':>12}{'speedup':>9}")
+    for width in args.widths:
+        for depth in args.depths:
+            model = statesurf.parse_puml_text(nested_puml(depth=depth, width=width))
+            states = len(model.nodes) - 1
+            fast = best_of(lambda: statesurf.build_transitions_by_state(model), args.repeat)
+            slow = best_of(lambda: ancestor_walk(model), args.repeat)
+            print(
+                f"{depth:>6}{width:>7}{states:>8}"
+                f"{fast * 1000:>10.2f}ms{slow * 1000:>10.2f}ms{slow / fast:>8.1f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
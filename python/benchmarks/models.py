@@ -0,0 +1,82 @@
+"""Synthetic PlantUML models for benchmarks."""
+import random
+
+
+def synthetic_puml(
+    states: int = 1000,
+    events: int = 32,
+    transitions_per_state: int = 8,
+    seed: int = 0,
+    guard_ratio: float = 0.3,
+) -> str:
+    """A valid model with ``states`` leaf states grouped into composites of 10.
+
+    Every leaf carries entry/exit actions, ``transitions_per_state`` external
+    transitions (a ``guard_ratio`` share guarded, some with actions) and one
+    internal transition, which roughly matches the line mix of tool-generated
+    models.
+    """
+    rng = random.Random(seed)
+    event_names = [f"ev{i}" for i in range(events)]
+    leaves = [f"s{i}" for i in range(states)]
+    lines = ["@startuml", f"[*] --> g0"]
+    for group_start in range(0, states, 10):
+        group = leaves[group_start:group_start + 10]
+        lines.append(f"state g{group_start // 10} {{")
+        lines.append(f"  [*] --> {group[0]}")
+        for leaf in group:
+            lines.append(f"  state {leaf}")
+            lines.append(f"  {leaf} : entry / enter_{leaf}")
+            lines.append(f"  {leaf} : exit / leave_{leaf}")
+            lines.append(f"  {leaf} : {rng.choice(event_names)} [isReady] / tick")
+            for event in rng.sample(event_names, min(transitions_per_state, events)):
+                target = rng.choice(leaves)
+                label = event
+                if rng.random() < guard_ratio:
+                    label += f" [guard{rng.randrange(16)}]"
+                if rng.random() < 0.5:
+                    label += f" / action{rng.randrange(64)}"
+                lines.append(f"  {leaf} --> {target} : {label}")
+        lines.append("}")
+    lines.append("g0 --> [*] : TERMINATE")
+    lines.append("@enduml")
+    return "\n".join(lines) + "\n"
+
+
+def nested_puml(
+    depth: int = 12,
+    width: int = 8,
+    events: int = 16,
+    transitions_per_state: int = 2,
+    seed: int = 0,
+    guard_ratio: float = 0.3,
+) -> str:
+    """A valid model nesting composites ``depth`` levels deep.
+
+    Each composite holds ``width`` leaves and the next composite, and every
+    state (composite or leaf) declares ``transitions_per_state`` transitions
+    (a ``guard_ratio`` share guarded), so leaves inherit candidates from their whole ancestor chain. Transitions
+    follow the hierarchy so that every target is already declared.
+    """
+    rng = random.Random(seed)
+    event_names = [f"ev{i}" for i in range(events)]
+    composites = [f"c{level}" for level in range(depth)]
+    leaves = [[f"l{level}_{i}" for i in range(width)] for level in range(depth)]
+    targets = [leaf for level in leaves for leaf in level]
+    lines = ["@startuml", "[*] --> c0"]
+    for level in range(depth):
+        indent = "  " * level
+        lines.append(f"{indent}state {composites[level]} {{")
+        lines.append(f"{indent}  [*] --> {leaves[level][0]}")
+        lines.extend(f"{indent}  state {leaf}" for leaf in leaves[level])
+    for level in reversed(range(depth)):
+        lines.append("  " * level + "}")
+    for state in composites + targets:
+        for event in rng.sample(event_names, min(transitions_per_state, events)):
+            label = event
+            if rng.random() < guard_ratio:
+                label += f" [guard{rng.randrange(8)}]"
+            lines.append(f"{state} --> {rng.choice(targets)} : {label}")
+    lines.append("c0 --> [*] : TERMINATE")
+    lines.append("@enduml")
+    return "\n".join(lines) + "\n"
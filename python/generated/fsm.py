@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from enum import Enum
+from typing import Iterable
 
 
 class FsmState(Enum):
@@ -90,6 +91,31 @@ class FsmMachine:
             if not self._started:
                 return
         on_event(self._state, event)
+        self._react(event)
+
+    def dispatch_many(self, events: Iterable[FsmEvent]) -> int:
+        """Same as calling dispatch() per event; returns how many were consumed.
+
+        Stops right after the event that terminates the machine.
+        """
+        if self._terminated:
+            return 0
+        if not self._started:
+            self.start()
+            if not self._started:
+                return 0
+        trace_event = on_event
+        react = self._react
+        consumed = 0
+        for event in events:
+            trace_event(self._state, event)
+            react(event)
+            consumed += 1
+            if self._terminated:
+                break
+        return consumed
+
+    def _react(self, event: FsmEvent) -> None:
         if self._state == FsmState.State1:
             if event == FsmEvent.eventA:
               on_transition(self._state, FsmState.State2, event)
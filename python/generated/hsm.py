@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from enum import Enum
+from typing import Iterable
 
 
 class HsmState(Enum):
@@ -99,6 +100,31 @@ class HsmMachine:
             if not self._started:
                 return
         on_event(self._state, event)
+        self._react(event)
+
+    def dispatch_many(self, events: Iterable[HsmEvent]) -> int:
+        """Same as calling dispatch() per event; returns how many were consumed.
+
+        Stops right after the event that terminates the machine.
+        """
+        if self._terminated:
+            return 0
+        if not self._started:
+            self.start()
+            if not self._started:
+                return 0
+        trace_event = on_event
+        react = self._react
+        consumed = 0
+        for event in events:
+            trace_event(self._state, event)
+            react(event)
+            consumed += 1
+            if self._terminated:
+                break
+        return consumed
+
+    def _react(self, event: HsmEvent) -> None:
         if self._state == HsmState.s:
             if event == HsmEvent.I:
               if self._callbacks.guard(self._state, event, HsmGuardId.isFooTrue):
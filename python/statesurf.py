@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
+import contextlib
+import cProfile
+import functools
+import glob
+import hashlib
+import json
 import os
+import random
+import struct
 import subprocess
-import sys, re, venv
+import sys, re, time, tracemalloc, venv
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Dict, Iterable, List, Optional, Tuple, Set, Union
 
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 
 class ParseError(Exception):
@@ -16,6 +25,13 @@ class ParseError(Exception):
 
 
 class LanguageSpec:
+    dispatch_modes: Tuple[str, ...] = ("switch",)
+    enum_styles: Tuple[str, ...] = ()
+    # Whether "table" dispatch means interpreting DispatchTables (rather than a
+    # table of generated handlers, as in Python).
+    data_tables = False
+    extension = ""
+
     def __init__(self, name: str, template: str, pseudo_initial_state: str, pseudo_final_state: str):
         self.name = name
         self.template = template
@@ -23,6 +39,8 @@ class LanguageSpec:
         self.pseudo_final_state = pseudo_final_state
         self.namespace_base = "statesurf"
         self.type_prefix = "StateMachine"
+        self.enum_style = "str"
+        self.trace_mode = "hooks"
 
     def configure(self, namespace_base: str, type_prefix: str):
         self.namespace_base = namespace_base
@@ -52,6 +70,18 @@ class LanguageSpec:
     def call_transition(self, src: str, dst: str, event: str) -> str:
         raise NotImplementedError
 
+    def record_trace(self, src: str, dst: str, event: str) -> str:
+        raise NotImplementedError
+
+    def trace_transition(self, src: str, dst: str, event: str) -> Optional[str]:
+        """The line reporting a transition for the configured trace mode, if any."""
+        # Binary traces record whole dispatches, not individual transitions.
+        if self.trace_mode in ("none", "binary"):
+            return None
+        if self.trace_mode == "ring":
+            return self.record_trace(src, dst, event)
+        return self.call_transition(src, dst, event)
+
     def call_entry(self, state: str) -> str:
         raise NotImplementedError
 
@@ -85,8 +115,22 @@ class LanguageSpec:
     def guard_close(self) -> Optional[str]:
         return "}"
 
+    def shared_body_name(self, index: int) -> str:
+        return f"body_{index}"
+
+    def unsigned_type(self, cpp_type: str) -> str:
+        """Spell a type picked by select_enum_underlying_type in this language."""
+        return cpp_type
+
+    def call_shared_body(self, name: str, event: str) -> str:
+        raise NotImplementedError
+
 
 class CppLanguageSpec(LanguageSpec):
+    dispatch_modes = ("switch", "table")
+    data_tables = True
+    extension = ".hpp"
+
     def __init__(self):
         super().__init__(
             name="cpp",
@@ -137,6 +181,9 @@ class CppLanguageSpec(LanguageSpec):
     def call_transition(self, src: str, dst: str, event: str) -> str:
         return f"on_transition({self._transition_type}{{{src}, {dst}}}, {event});"
 
+    def record_trace(self, src: str, dst: str, event: str) -> str:
+        return f"trace_record({src}, {dst}, {event}, true);"
+
     def call_entry(self, state: str) -> str:
         return f"{self._callbacks_ref}->on_entry({state});"
 
@@ -147,7 +194,10 @@ class CppLanguageSpec(LanguageSpec):
         return f"{self._callbacks_ref}->action({state}, {event}, {action});"
 
     def guard_condition(self, state: str, event: str, guard: str) -> str:
-        return f"if ({self._callbacks_ref}->guard({state}, {event}, {guard})) "
+        call = f"{self._callbacks_ref}->guard({state}, {event}, {guard})"
+        if self.trace_mode == "binary":
+            call = f"trace_guard({call})"
+        return f"if ({call}) "
 
     def set_state(self, state: str) -> str:
         return f"{self._current_state} = {state};"
@@ -164,8 +214,15 @@ class CppLanguageSpec(LanguageSpec):
     def case_epilogue(self) -> Optional[str]:
         return "return;"
 
+    def call_shared_body(self, name: str, event: str) -> str:
+        return f"{name}({event});"
+
 
 class RustLanguageSpec(LanguageSpec):
+    dispatch_modes = ("switch", "table")
+    data_tables = True
+    extension = ".rs"
+
     def __init__(self):
         super().__init__(
             name="rust",
@@ -214,6 +271,9 @@ class RustLanguageSpec(LanguageSpec):
     def call_transition(self, src: str, dst: str, event: str) -> str:
         return f"on_transition({src}, {dst}, {event});"
 
+    def record_trace(self, src: str, dst: str, event: str) -> str:
+        return f"self.trace_record({src}, {dst}, {event}, true);"
+
     def call_entry(self, state: str) -> str:
         return f"{self._callbacks_ref}.on_entry({state});"
 
@@ -224,7 +284,10 @@ class RustLanguageSpec(LanguageSpec):
         return f"{self._callbacks_ref}.action({state}, {event}, {action});"
 
     def guard_condition(self, state: str, event: str, guard: str) -> str:
-        return f"if {self._callbacks_ref}.guard({state}, {event}, {guard}) "
+        call = f"{self._callbacks_ref}.guard({state}, {event}, {guard})"
+        if self.trace_mode == "binary":
+            call = f"self.trace.guard({call})"
+        return f"if {call} "
 
     def set_state(self, state: str) -> str:
         return f"{self._state_ref} = {state};"
@@ -238,8 +301,18 @@ class RustLanguageSpec(LanguageSpec):
     def return_statement(self) -> str:
         return "return;"
 
+    def call_shared_body(self, name: str, event: str) -> str:
+        return f"self.{name}({event});"
+
+    def unsigned_type(self, cpp_type: str) -> str:
+        return RUST_UNSIGNED_TYPES[cpp_type]
+
 
 class PythonLanguageSpec(LanguageSpec):
+    dispatch_modes = ("switch", "table")
+    enum_styles = ("str", "int")
+    extension = ".py"
+
     def __init__(self):
         super().__init__(
             name="python",
@@ -264,17 +337,40 @@ class PythonLanguageSpec(LanguageSpec):
         self._callbacks_type = f"{prefix}Callbacks"
         self._machine_type = f"{prefix}Machine"
 
+    def _member_literal(self, enum_type: str, alias_prefix: str, name: str) -> str:
+        if self.enum_style == "int":
+            return f"_{alias_prefix}_{name}"
+        return f"{enum_type}.{name}"
+
     def state_literal(self, name: str) -> str:
-        return f"{self._state_enum}.{name}"
+        return self._member_literal(self._state_enum, "S", name)
 
     def event_literal(self, name: str) -> str:
-        return f"{self._event_enum}.{name}"
+        return self._member_literal(self._event_enum, "E", name)
 
     def action_literal(self, name: str) -> str:
-        return f"{self._action_enum}.{name}"
+        return self._member_literal(self._action_enum, "A", name)
 
     def guard_literal(self, name: str) -> str:
-        return f"{self._guard_enum}.{name}"
+        return self._member_literal(self._guard_enum, "G", name)
+
+    def enum_aliases(
+        self, states: List[str], events: List[str], guards: List[str], actions: List[str]
+    ) -> List[Tuple[str, str]]:
+        if self.enum_style != "int":
+            return []
+        aliases: List[Tuple[str, str]] = []
+        for enum_type, alias_prefix, names in (
+            (self._state_enum, "S", states),
+            (self._event_enum, "E", events),
+            (self._guard_enum, "G", guards),
+            (self._action_enum, "A", actions),
+        ):
+            for name in names:
+                if name.startswith("__"):
+                    continue  # "__None" placeholder for empty enums, never referenced
+                aliases.append((f"_{alias_prefix}_{name}", f"{enum_type}.{name}"))
+        return aliases
 
     def default_event_literal(self) -> str:
         return "self._default_event()"
@@ -288,6 +384,9 @@ class PythonLanguageSpec(LanguageSpec):
     def call_transition(self, src: str, dst: str, event: str) -> str:
         return f"on_transition({src}, {dst}, {event})"
 
+    def record_trace(self, src: str, dst: str, event: str) -> str:
+        return f"self._trace_record({src}, {dst}, {event}, True)"
+
     def call_entry(self, state: str) -> str:
         return f"{self._callbacks_ref}.on_entry({state})"
 
@@ -298,7 +397,10 @@ class PythonLanguageSpec(LanguageSpec):
         return f"{self._callbacks_ref}.action({state}, {event}, {action})"
 
     def guard_condition(self, state: str, event: str, guard: str) -> str:
-        return f"if {self._callbacks_ref}.guard({state}, {event}, {guard})"
+        call = f"{self._callbacks_ref}.guard({state}, {event}, {guard})"
+        if self.trace_mode == "binary":
+            call = f"self._trace_guard({call})"
+        return f"if {call}"
 
     def guard_open(self, condition: str) -> str:
         return f"{condition}:"
@@ -321,6 +423,12 @@ class PythonLanguageSpec(LanguageSpec):
     def case_epilogue(self) -> Optional[str]:
         return "return"
 
+    def shared_body_name(self, index: int) -> str:
+        return f"_body_{index}"
+
+    def call_shared_body(self, name: str, event: str) -> str:
+        return f"self.{name}({event})"
+
 
 LANGUAGE_SPECS = {
     "cpp": CppLanguageSpec(),
@@ -328,6 +436,71 @@ LANGUAGE_SPECS = {
     "python": PythonLanguageSpec(),
 }
 
+RUST_UNSIGNED_TYPES = {
+    "std::uint8_t": "u8",
+    "std::uint16_t": "u16",
+    "std::uint32_t": "u32",
+    "std::uint64_t": "u64",
+}
+
+DISPATCH_MODES = ("switch", "table")
+ENUM_STYLES = ("str", "int")
+OPTIMIZE_MODES = ("speed", "size")
+TRACE_MODES = ("none", "hooks", "ring", "binary")
+DEFAULT_TRACE_CAPACITY = 64
+# --trace binary dump layout, shared by every template and decode_trace():
+# header (magic, version, record size, state/event/guard counts, capacity,
+# records in the dump, dispatches recorded so far), then the retained
+# records oldest first. Everything is little-endian.
+TRACE_MAGIC = b"SSTR"
+TRACE_FORMAT_VERSION = 1
+TRACE_HEADER = struct.Struct("<4sBBHHHIIQ")
+# timestamp, state, event, state after dispatch, guards evaluated, guard
+# results (bit i = i-th guard evaluated; only the first 8 are kept).
+TRACE_RECORD = struct.Struct("<QHHHBB")
+# --counters stats() / write_stats() JSON, read by format_stats_report().
+STATS_FORMAT = "statesurf-stats"
+STATS_FORMAT_VERSION = 1
+# Transition bodies shorter than this stay inline: a call would not be smaller.
+SHARED_BODY_MIN_STEPS = 3
+# Rendered diagrams the simulator keeps in memory before evicting the least recently used.
+DEFAULT_RENDER_CACHE_BYTES = 64 << 20
+SIMULATOR_DIAGRAM_FORMATS = ("png", "svg")
+# Stdlib-only diagram rendering imported by the generated simulator.py.
+SIMULATOR_RENDER_MODULE = "simulator_render.py"
+
+
+class CodegenOptions:
+    def __init__(
+        self,
+        dispatch: str = "switch",
+        enums: str = "str",
+        optimize: str = "speed",
+        trace: str = "hooks",
+        trace_capacity: int = DEFAULT_TRACE_CAPACITY,
+        counters: bool = False,
+        branch_profile: Optional[bytes] = None,
+    ):
+        if dispatch not in DISPATCH_MODES:
+            raise ValueError(f"Unsupported dispatch mode '{dispatch}'. Available: {', '.join(DISPATCH_MODES)}")
+        if enums not in ENUM_STYLES:
+            raise ValueError(f"Unsupported enum style '{enums}'. Available: {', '.join(ENUM_STYLES)}")
+        if optimize not in OPTIMIZE_MODES:
+            raise ValueError(f"Unsupported optimize mode '{optimize}'. Available: {', '.join(OPTIMIZE_MODES)}")
+        if trace not in TRACE_MODES:
+            raise ValueError(f"Unsupported trace mode '{trace}'. Available: {', '.join(TRACE_MODES)}")
+        if trace_capacity < 1 or trace_capacity & (trace_capacity - 1):
+            raise ValueError(f"Trace capacity must be a power of two, got {trace_capacity}")
+        self.dispatch = dispatch
+        self.enums = enums
+        self.optimize = optimize
+        self.trace = trace
+        self.trace_capacity = trace_capacity
+        self.counters = counters
+        # Raw stats/trace dump; decoded against the model in gen_code.
+        self.branch_profile = branch_profile
+
+
 class Node:
     def __init__(self, name: str, parent: Optional['Node']):
         self.name = name
@@ -337,6 +510,27 @@ class Node:
         self.initial_action: Optional[str] = None
         self.entry_actions: List[str] = []
         self.exit_actions: List[str] = []
+        self._depth: Optional[int] = None
+
+    @property
+    def depth(self) -> int:
+        """Nesting depth below the root (top-level states are 0), computed once."""
+        if self._depth is None:
+            # Walk up to the first node whose depth is known (or a top-level
+            # state), then fill the chain back down; no recursion, so any
+            # nesting depth works.
+            chain: List['Node'] = []
+            node = self
+            while node._depth is None and node.parent is not None and node.parent.parent is not None:
+                chain.append(node)
+                node = node.parent
+            if node._depth is None:
+                node._depth = 0
+            depth = node._depth
+            for node in reversed(chain):
+                depth += 1
+                node._depth = depth
+        return self._depth
 
 class Transition:
     def __init__(self, src: str, dst: Optional[str], event: Optional[str],
@@ -401,54 +595,246 @@ class Model:
             n = t
         return n.name
 
+    def to_dict(self) -> dict:
+        return {
+            "nodes": [
+                {
+                    "name": n.name,
+                    "parent": n.parent.name if n.parent is not None else None,
+                    "children": list(n.children),
+                    "initial_target": n.initial_target,
+                    "initial_action": n.initial_action,
+                    "entry_actions": n.entry_actions,
+                    "exit_actions": n.exit_actions,
+                }
+                for n in self.nodes.values()
+            ],
+            "transitions": [
+                [t.src, t.dst, t.event, t.guard, t.action, t.internal] for t in self.transitions
+            ],
+            "events": sorted(self.events),
+            "guards": sorted(self.guards),
+            "actions": sorted(self.actions),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Model":
+        m = cls()
+        m.nodes = {}
+        for entry in data["nodes"]:
+            n = Node(entry["name"], None)
+            n.initial_target = entry["initial_target"]
+            n.initial_action = entry["initial_action"]
+            n.entry_actions = list(entry["entry_actions"])
+            n.exit_actions = list(entry["exit_actions"])
+            m.nodes[n.name] = n
+        for entry in data["nodes"]:
+            n = m.nodes[entry["name"]]
+            if entry["parent"] is not None:
+                n.parent = m.nodes[entry["parent"]]
+            n.children = {child: m.nodes[child] for child in entry["children"]}
+        m.root = m.nodes["__root__"]
+        m.transitions = [Transition(*fields) for fields in data["transitions"]]
+        m.events = set(data["events"])
+        m.guards = set(data["guards"])
+        m.actions = set(data["actions"])
+        return m
+
+
+class PhaseProfiler:
+    """Wall time and peak memory per phase of a command, plus named counts (--profile).
+
+    Phases nest; repeated phases with the same path are merged. Memory is the
+    peak of tracemalloc's traced size while the phase ran, so the profiled
+    run is slower than a plain one.
+    """
+
+    def __init__(self):
+        self.phases: Dict[Tuple[str, ...], List[float]] = {}  # path -> [calls, seconds, peak bytes]
+        self.counts: Dict[str, int] = {}
+        self._stack: List[List] = []  # [name, started, peak so far]
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self._stack:
+            self._stack[-1][2] = max(self._stack[-1][2], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        path = tuple(frame[0] for frame in self._stack) + (name,)
+        entry = self.phases.setdefault(path, [0, 0.0, 0])
+        frame = [name, time.perf_counter(), 0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[1]
+            peak = max(frame[2], tracemalloc.get_traced_memory()[1])
+            self._stack.pop()
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], peak)
+            if self._stack:
+                self._stack[-1][2] = max(self._stack[-1][2], peak)
+            else:
+                tracemalloc.stop()
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def report(self) -> str:
+        total = max((seconds for path, (_, seconds, _) in self.phases.items() if len(path) == 1), default=0.0)
+        lines = [f"{'phase':<28}{'calls':>6}{'wall ms':>11}{'share':>8}{'peak MiB':>10}"]
+        for path, (calls, seconds, peak) in self.phases.items():
+            share = 100.0 * seconds / total if total else 0.0
+            lines.append(
+                f"{'  ' * (len(path) - 1) + path[-1]:<28}{calls:>6}{1e3 * seconds:>11.1f}{share:>7.1f}%"
+                f"{peak / (1 << 20):>10.1f}"
+            )
+        if self.counts:
+            lines.append(", ".join(f"{name}: {value}" for name, value in self.counts.items()))
+        return "\n".join(lines)
+
+
+_PROFILER: Optional[PhaseProfiler] = None
+
+
+def configure_profiler(profiler: Optional[PhaseProfiler]) -> None:
+    """Install the profiler that profile_phase/profile_count report to; ``None`` turns them off."""
+    global _PROFILER
+    _PROFILER = profiler
+
+
+def profile_phase(name: str):
+    return _PROFILER.phase(name) if _PROFILER is not None else contextlib.nullcontext()
+
+
+def profile_count(name: str, value: int) -> None:
+    if _PROFILER is not None:
+        _PROFILER.count(name, value)
+
+
+def profiled(name: str):
+    """Run the decorated function as a profile_phase."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _PROFILER is None:
+                return fn(*args, **kwargs)
+            with _PROFILER.phase(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+STDIN_INPUT = "-"
+
 def parse_puml(path: Path) -> Model:
-    text = path.read_text(encoding="utf-8")
+    with path.open("rb") as stream:
+        return parse_puml_stream(stream)
+
+def parse_puml_stream(stream) -> Model:
+    """Parse a model from a text or binary (UTF-8) file-like, one line at a time."""
+    return parse_puml_lines(stream)
+
+_RE_STATE_OPEN = re.compile(r'^\s*state\s+([A-Za-z_]\w*)\s*\{\s*$')
+_RE_STATE_DECL = re.compile(r'^\s*state\s+([A-Za-z_]\w*)\s*$')
+_RE_CLOSE = re.compile(r'^\s*\}\s*$')
+_RE_INITIAL = re.compile(r'^\s*\[\*\]\s*[-]{1,2}>\s*([A-Za-z_]\w*)\s*(?::\s*(?:([A-Za-z_]\w*)\s*)?(?:\[([A-Za-z_]\w*)\])?\s*(?:/\s*([A-Za-z_]\w*))?)?\s*$')
+_RE_ENTRYEXIT = re.compile(r'^\s*([A-Za-z_]\w*)\s*:\s*(entry|exit)(?:\s*/\s*([A-Za-z_]\w*))?\s*$')
+_RE_TRANSITION = re.compile(r'^\s*([A-Za-z_]\w*)\s*[-]{1,2}>\s*([A-Za-z_\*\]\[]\w*|\[\*\])\s*:\s*([A-Za-z_]\w*)?(?:\s*\[([A-Za-z_]\w*)\])?(?:\s*/\s*([A-Za-z_]\w*)?)?\s*$')
+_RE_INTERNAL = re.compile(r'^\s*([A-Za-z_]\w*)\s*:\s*([A-Za-z_]\w*)?(?:\s*\[([A-Za-z_]\w*)\])?(?:\s*/\s*([A-Za-z_]\w*)?)?\s*$')
+# Line kinds that can possibly match, keyed by the leading character and the
+# punctuation present: only transitions contain '-', only entry/exit and
+# internal lines contain ':' (besides initial and transition lines), so this
+# routing gives the same result as trying every pattern in turn.
+_CLOSE_LINES = (("close", _RE_CLOSE),)
+_INITIAL_LINES = (("initial", _RE_INITIAL),)
+_ARROW_LINES = (("transition", _RE_TRANSITION),)
+_COLON_LINES = (("entryexit", _RE_ENTRYEXIT), ("internal", _RE_INTERNAL))
+_STATE_LINES = (("state_open", _RE_STATE_OPEN), ("state_decl", _RE_STATE_DECL))
+
+
+def classify_line(line: str) -> Tuple[Optional[str], Optional[re.Match]]:
+    """Return the kind of a stripped, non-empty model line and its match."""
+    lead = line[0]
+    if lead == "}":
+        candidates = _CLOSE_LINES
+    elif lead == "[":
+        candidates = _INITIAL_LINES
+    elif "-" in line:
+        candidates = _ARROW_LINES
+    elif ":" in line:
+        candidates = _COLON_LINES
+    else:
+        candidates = _STATE_LINES
+    for kind, regex in candidates:
+        mo = regex.match(line)
+        if mo:
+            return kind, mo
+    return None, None
+
+def parse_puml_text(text: str) -> Model:
+    return parse_puml_lines(text.splitlines())
+
+@profiled("parse")
+def parse_puml_lines(lines: Iterable[Union[str, bytes]]) -> Model:
+    """Build a Model incrementally from an iterable of lines.
+
+    Lines may be ``str`` or UTF-8 ``bytes`` and may keep their line endings, so
+    file objects and pipes can be passed directly; only the model itself is
+    held in memory.
+    """
     m = Model()
     stack: List[Node] = [m.root]
 
-    re_state_open = re.compile(r'^\s*state\s+([A-Za-z_]\w*)\s*\{\s*$')
-    re_state_decl = re.compile(r'^\s*state\s+([A-Za-z_]\w*)\s*$')
-    re_close = re.compile(r'^\s*\}\s*$')
-    re_initial = re.compile(r'^\s*\[\*\]\s*[-]{1,2}>\s*([A-Za-z_]\w*)\s*(?::\s*(?:([A-Za-z_]\w*)\s*)?(?:\[([A-Za-z_]\w*)\])?\s*(?:/\s*([A-Za-z_]\w*))?)?\s*$')
-    re_entryexit = re.compile(r'^\s*([A-Za-z_]\w*)\s*:\s*(entry|exit)(?:\s*/\s*([A-Za-z_]\w*))?\s*$')
-    re_transition = re.compile(r'^\s*([A-Za-z_]\w*)\s*[-]{1,2}>\s*([A-Za-z_\*\]\[]\w*|\[\*\])\s*:\s*([A-Za-z_]\w*)?(?:\s*\[([A-Za-z_]\w*)\])?(?:\s*/\s*([A-Za-z_]\w*)?)?\s*$')
-    re_internal = re.compile(r'^\s*([A-Za-z_]\w*)\s*:\s*([A-Za-z_]\w*)?(?:\s*\[([A-Za-z_]\w*)\])?(?:\s*/\s*([A-Za-z_]\w*)?)?\s*$')
-
     last_line_no = 0
-    for lineno, raw in enumerate(text.splitlines(), 1):
+    for lineno, raw in enumerate(lines, 1):
         last_line_no = lineno
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        raw = raw.rstrip("\r\n")
         line = raw.strip()
-        if not line or line.startswith("'") or line.startswith("@"):
+        if not line or line[0] == "'" or line[0] == "@":
             continue
 
-        matched = False
+        kind, mo = classify_line(line)
 
-        mo = re_state_open.match(line)
-        if mo:
+        if kind == "transition":
+            src, dst, ev, gd, ac = mo.groups()
+            if ac == "":
+                ac = None
+            m.ensure_node(src, stack[-1])
+            dst_name = None if dst=="[*]" else dst
+            if dst_name:
+                # ensure known (attach to nearest scope if unknown)
+                if dst_name not in m.nodes:
+                    m.ensure_node(dst_name, stack[-1])
+            if ev: m.events.add(ev)
+            if gd: m.guards.add(gd)
+            if ac: m.actions.add(ac)
+            m.transitions.append(Transition(src, dst_name, ev, gd, ac, internal=False))
+
+        elif kind == "state_open":
             name = mo.group(1)
             parent = stack[-1]
             node = m.ensure_node(name, parent)
             stack.append(node)
-            matched = True
-            continue
 
-        mo = re_state_decl.match(line)
-        if mo:
+        elif kind == "state_decl":
             name = mo.group(1)
             parent = stack[-1]
             m.ensure_node(name, parent)
-            matched = True
-            continue
 
-        if re_close.match(line):
+        elif kind == "close":
             if len(stack) <= 1:
                 raise ParseError(lineno, raw)
             stack.pop()
-            matched = True
-            continue
 
-        mo = re_initial.match(line)
-        if mo:
+        elif kind == "initial":
             tgt = mo.group(1)
             action = mo.group(4)
             scope = stack[-1]
@@ -457,42 +843,17 @@ def parse_puml(path: Path) -> Model:
             if action:
                 scope.initial_action = action
                 m.actions.add(action)
-            matched = True
-            continue
 
-        mo = re_entryexit.match(line)
-        if mo:
-            st = mo.group(1); kind = mo.group(2); act = mo.group(3)
+        elif kind == "entryexit":
+            st = mo.group(1); which = mo.group(2); act = mo.group(3)
             m.ensure_node(st, stack[-1])
             node = m.nodes[st]
-            if kind == 'entry':
+            if which == 'entry':
                 if act: node.entry_actions.append(act); m.actions.add(act)
             else:
                 if act: node.exit_actions.append(act); m.actions.add(act)
-            matched = True
-            continue
-
-        mo = re_transition.match(line)
-        if mo:
-            src, dst, ev, gd, ac = mo.groups()
-            if ac == "":
-                ac = None
-            m.ensure_node(src, stack[-1])
-            dst_name = None if dst=="[*]" else dst
-            if dst_name:
-                # ensure known (attach to nearest scope if unknown)
-                if dst_name not in m.nodes:
-                    m.ensure_node(dst_name, stack[-1])
-            if ev: m.events.add(ev)
-            if gd: m.guards.add(gd)
-            if ac: m.actions.add(ac)
-            m.transitions.append(Transition(src, dst_name, ev, gd, ac, internal=False))
-            matched = True
-            continue
 
-        mo = re_internal.match(line)
-        if mo:
-            matched = True
+        elif kind == "internal":
             st, ev, gd, ac = mo.groups()
             if ac == "":
                 ac = None
@@ -505,16 +866,156 @@ def parse_puml(path: Path) -> Model:
             if gd: m.guards.add(gd)
             if ac: m.actions.add(ac)
             m.transitions.append(Transition(st, st, ev, gd, ac, internal=True))
-            continue
 
-        if not matched:
+        else:
             raise ParseError(lineno, raw)
 
     if len(stack) > 1:
         raise ParseError(last_line_no, "missing } before end of file")
 
+    profile_count("model lines", last_line_no)
+    profile_count("states", len(m.nodes) - 1)
+    profile_count("transitions", len(m.transitions))
     return m
 
+
+SYNTH_MAX_DEPTH = 200
+
+
+class ModelShape:
+    """Knobs for synthesize_puml; ratios are probabilities per state or transition."""
+
+    def __init__(
+        self,
+        states: int = 1000,
+        depth: int = 4,
+        branching: int = 4,
+        events: int = 32,
+        transitions: int = 4,
+        guard_ratio: float = 0.3,
+        action_ratio: float = 0.5,
+        guard_reuse: float = 0.9,
+        action_reuse: float = 0.9,
+        entry_exit_ratio: float = 0.5,
+        internal_ratio: float = 0.2,
+        deep_initial_ratio: float = 0.2,
+        final_ratio: float = 0.01,
+    ):
+        if states < 1 or events < 1 or transitions < 0:
+            raise ValueError("A model needs at least one state and one event, and transitions cannot be negative")
+        if not 1 <= depth <= SYNTH_MAX_DEPTH:
+            raise ValueError(f"Depth must be between 1 and {SYNTH_MAX_DEPTH}, got {depth}")
+        if branching < 1:
+            raise ValueError(f"Branching must be at least 1, got {branching}")
+        ratios = {
+            "guard_ratio": guard_ratio,
+            "action_ratio": action_ratio,
+            "guard_reuse": guard_reuse,
+            "action_reuse": action_reuse,
+            "entry_exit_ratio": entry_exit_ratio,
+            "internal_ratio": internal_ratio,
+            "deep_initial_ratio": deep_initial_ratio,
+            "final_ratio": final_ratio,
+        }
+        for name, value in ratios.items():
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1, got {value}")
+        self.states = states
+        self.depth = depth
+        self.branching = branching  # children per composite state
+        self.events = events
+        self.transitions = transitions  # external transitions per state
+        self.guard_ratio = guard_ratio
+        self.action_ratio = action_ratio
+        self.guard_reuse = guard_reuse  # chance a guard/action repeats an existing name
+        self.action_reuse = action_reuse
+        self.entry_exit_ratio = entry_exit_ratio
+        self.internal_ratio = internal_ratio
+        self.deep_initial_ratio = deep_initial_ratio  # composites whose [*] skips a level
+        self.final_ratio = final_ratio  # states with a --> [*] transition
+
+
+def synthesize_puml(shape: ModelShape, seed: int = 0) -> Iterable[str]:
+    """Yield the lines of a valid model of the given shape; the same seed gives the same lines.
+
+    States are laid out as trees of ``branching`` children per composite, up
+    to ``depth`` levels, with as many top-level trees as it takes to reach
+    ``states``. Transitions follow the state blocks and may target any state.
+    Lines are produced lazily, so models with millions of lines can be
+    streamed to a file.
+    """
+    rng = random.Random(seed)
+    children: List[List[int]] = []
+    levels: List[int] = []
+    top_level: List[int] = []
+
+    def add_tree(level: int) -> int:
+        index = len(levels)
+        levels.append(level)
+        children.append([])
+        if level + 1 < shape.depth:
+            for _ in range(shape.branching):
+                if len(levels) >= shape.states:
+                    break
+                children[index].append(add_tree(level + 1))
+        return index
+
+    while len(levels) < shape.states:
+        top_level.append(add_tree(0))
+
+    events = [f"e{i}" for i in range(shape.events)]
+    guards: List[str] = []
+    actions: List[str] = []
+
+    def reuse(pool: List[str], prefix: str, ratio: float) -> str:
+        if pool and rng.random() < ratio:
+            return rng.choice(pool)
+        pool.append(f"{prefix}{len(pool)}")
+        return pool[-1]
+
+    def label(event: str) -> str:
+        text = event
+        if rng.random() < shape.guard_ratio:
+            text += f" [{reuse(guards, 'g', shape.guard_reuse)}]"
+        if rng.random() < shape.action_ratio:
+            text += f" / {reuse(actions, 'a', shape.action_reuse)}"
+        return text
+
+    def initial(targets: List[int], indent: str) -> str:
+        target = targets[0]
+        if children[target] and rng.random() < shape.deep_initial_ratio:
+            while children[target]:
+                target = rng.choice(children[target])
+        action = f" : / {reuse(actions, 'a', shape.action_reuse)}" if rng.random() < shape.action_ratio else ""
+        return f"{indent}[*] --> s{target}{action}"
+
+    def blocks(index: int, indent: str) -> Iterable[str]:
+        if not children[index]:
+            yield f"{indent}state s{index}"
+            return
+        yield f"{indent}state s{index} {{"
+        for child in children[index]:
+            yield from blocks(child, indent + "  ")
+        yield initial(children[index], indent + "  ")
+        yield f"{indent}}}"
+
+    yield "@startuml"
+    for index in top_level:
+        yield from blocks(index, "")
+    yield initial(top_level, "")
+    for index in range(len(levels)):
+        state = f"s{index}"
+        if rng.random() < shape.entry_exit_ratio:
+            yield f"{state} : entry / {reuse(actions, 'a', shape.action_reuse)}"
+            yield f"{state} : exit / {reuse(actions, 'a', shape.action_reuse)}"
+        if rng.random() < shape.internal_ratio:
+            yield f"{state} : {label(rng.choice(events))}"
+        for event in rng.sample(events, min(shape.transitions, len(events))):
+            yield f"{state} --> s{rng.randrange(len(levels))} : {label(event)}"
+        if rng.random() < shape.final_ratio:
+            yield f"{state} --> [*] : {label(rng.choice(events))}"
+    yield "@enduml"
+
 def topo_states(m: Model) -> List[str]:
     order = []
     def walk(n: Node):
@@ -525,10 +1026,7 @@ def topo_states(m: Model) -> List[str]:
     return order
 
 def compute_state_depth(m: Model, name: str) -> int:
-    d=0; n=m.nodes[name]
-    while n.parent and n.parent.name!="__root__":
-        d+=1; n=n.parent
-    return d
+    return m.nodes[name].depth
 
 
 def select_enum_underlying_type(count: int) -> str:
@@ -540,95 +1038,109 @@ def select_enum_underlying_type(count: int) -> str:
         return "std::uint32_t"
     return "std::uint64_t"
 
+@profiled("transitions")
 def build_transitions_by_state(m: Model):
-    by_src = {}
+    # Each state's event map is its own transitions followed by its parent's
+    # map, so candidates end up ordered deepest source first without sorting.
+    own: Dict[str, Dict[str, List[Transition]]] = {}
     for t in m.transitions:
-        by_src.setdefault(t.src, []).append(t)
-    result = {}
+        if t.event is None: continue
+        own.setdefault(t.src, {}).setdefault(t.event, []).append(t)
+    maps: Dict[str, Dict[str, List[Transition]]] = {}
     for s in m.nodes:
-        if s == "__root__": continue
-        cand = []
+        if s == "__root__" or s in maps: continue
+        # Walk up to the nearest resolved ancestor, then fill in top-down.
+        pending = []
         n = m.nodes[s]
-        while n and n.name != "__root__":
-            cand.extend(by_src.get(n.name, []))
+        while n is not None and n.name != "__root__" and n.name not in maps:
+            pending.append(n.name)
             n = n.parent
-        evmap = {}
-        for t in cand:
-            if t.event is None: continue
-            evmap.setdefault(t.event, []).append(t)
-        for e, lst in evmap.items():
-            lst.sort(key=lambda t: compute_state_depth(m, t.src), reverse=True)
-        result[s] = evmap
-    return result
-
-def normalize_identifier(name: str) -> str:
-    return re.sub(r'[^A-Za-z0-9_]', '_', name)
+        inherited = maps.get(n.name, {}) if n is not None else {}
+        for name in reversed(pending):
+            evmap = dict(own.get(name, {}))
+            for e, lst in inherited.items():
+                # Lists are shared between states and must not be mutated.
+                evmap[e] = evmap[e] + lst if e in evmap else lst
+            maps[name] = evmap
+            inherited = evmap
+    return {s: maps[s] for s in m.nodes if s != "__root__"}
 
+CURRENT_STATE = "<current>"
+FINAL_STATE = "<final>"
 
-def split_camel(name: str) -> str:
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1)
 
+class PlanStep:
+    def __init__(self, kind: str, state: str, action: Optional[str] = None):
+        self.kind = kind  # "transition", "exit", "entry", "action", "set_state" or "terminate"
+        self.state = state  # node name, CURRENT_STATE or FINAL_STATE
+        self.action = action  # model action name for "action" steps
 
-def generate_namespace_base(puml_path: Path) -> str:
-    base = puml_path.stem
-    base = split_camel(base)
-    base = normalize_identifier(base)
-    base = base.strip('_') or "state_machine"
-    return base.lower()
+    def key(self) -> Tuple[str, str, Optional[str]]:
+        return (self.kind, self.state, self.action)
 
 
-def generate_type_prefix(puml_path: Path) -> str:
-    base = puml_path.stem
-    base = normalize_identifier(split_camel(base))
-    parts = [part for part in base.split('_') if part]
-    return ''.join(part.capitalize() for part in parts) or "StateMachine"
+class PlanBranch:
+    def __init__(self, transition: Transition, target: str, steps: List[PlanStep]):
+        self.transition = transition
+        self.guard = transition.guard
+        self.target = target  # leaf state name, CURRENT_STATE (internal) or FINAL_STATE
+        self.steps = steps
 
 
-def gen_code(m, machine_name: str, language: str, namespace_base: str, type_prefix: str) -> str:
-    namespace_base = normalize_identifier(namespace_base).lower() or "state_machine"
-    type_prefix = type_prefix or "StateMachine"
-    type_prefix = ''.join(part.capitalize() for part in split_camel(type_prefix).split('_') if part)
-    type_prefix = type_prefix or "StateMachine"
-    if language not in LANGUAGE_SPECS:
-        raise ValueError(
-            f"Unsupported language '{language}'. Available: {', '.join(sorted(LANGUAGE_SPECS.keys()))}"
-        )
-    spec = LANGUAGE_SPECS[language]
-    spec.configure(namespace_base, type_prefix)
+class EventPlan:
+    def __init__(self, event: str, branches: List[PlanBranch]):
+        self.event = event
+        self.branches = branches
 
-    def sanitize_id(x: str) -> str:
-        return re.sub(r'[^A-Za-z0-9_]', '_', x)
+    def falls_through(self) -> bool:
+        # Only when every candidate is guarded can the event end up ignored.
+        return all(b.guard for b in self.branches)
 
-    states = [s for s in topo_states(m) if s != "__root__"]
-    events = sorted(m.events, key=lambda x: x)
 
-    guard_ids: List[str] = []
-    guard_map: Dict[str, str] = {}
-    action_ids: List[str] = []
-    action_map: Dict[str, str] = {}
+class MachinePlan:
+    def __init__(self):
+        self.states: List[str] = []
+        self.events: List[str] = []
+        self.state_ids: Dict[str, str] = {}
+        self.event_ids: Dict[str, str] = {}
+        self.guard_ids: List[str] = []
+        self.guard_map: Dict[str, str] = {}
+        self.action_ids: List[str] = []
+        self.action_map: Dict[str, str] = {}
+        self.start_target: Optional[str] = None
+        self.start_steps: List[PlanStep] = []
+        self.state_events: Dict[str, List[EventPlan]] = {}
+
+
+@profiled("plan")
+def build_machine_plan(m: Model) -> MachinePlan:
+    plan = MachinePlan()
+    plan.states = [s for s in topo_states(m) if s != "__root__"]
+    plan.events = sorted(m.events, key=lambda x: x)
+    plan.state_ids = {name: normalize_identifier(name) for name in plan.states}
+    plan.event_ids = {name: normalize_identifier(name) for name in plan.events}
+    states = plan.states
+    by_state = build_transitions_by_state(m)
 
     def normalized_id(name: str) -> str:
-        sid = sanitize_id(name)
+        sid = normalize_identifier(name)
         if not sid:
             sid = "_"
         if sid[0].isdigit():
             sid = "_" + sid
         return sid
 
-    def register_guard(name: str) -> str:
+    def register_guard(name: str):
         gid = normalized_id(name)
-        if gid not in guard_ids:
-            guard_ids.append(gid)
-        guard_map[name] = gid
-        return gid
+        if gid not in plan.guard_ids:
+            plan.guard_ids.append(gid)
+        plan.guard_map[name] = gid
 
-    def register_action(name: str) -> str:
+    def register_action(name: str):
         aid = normalized_id(name)
-        if aid not in action_ids:
-            action_ids.append(aid)
-        action_map[name] = aid
-        return aid
+        if aid not in plan.action_ids:
+            plan.action_ids.append(aid)
+        plan.action_map[name] = aid
 
     for t in m.transitions:
         if t.guard:
@@ -652,31 +1164,19 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
 
     collect_initial_actions(m.root)
 
-    by_state = build_transitions_by_state(m)
+    def exit_steps(nodes: List[str]) -> List[PlanStep]:
+        steps: List[PlanStep] = []
+        for name in nodes:
+            for act in m.nodes[name].exit_actions:
+                steps.append(PlanStep("action", name, act))
+            steps.append(PlanStep("exit", name))
+        return steps
 
-    state_ids_map = {name: sanitize_id(name) for name in states}
-    event_ids_map = {name: sanitize_id(name) for name in events}
-
-    def indent(level: int, text: str) -> str:
-        return "  " * level + text
-
-    def emit_exit_chain_for_state(sname: str) -> List[str]:
-        lines: List[str] = []
-        n = m.nodes[sname]
-        while n and n.name != "__root__":
-            node_id = state_ids_map[n.name]
-            for act in n.exit_actions:
-                aid = action_map[act]
-                lines.append(
-                    spec.call_action(
-                        spec.state_literal(node_id),
-                        spec.event_param_ref(),
-                        spec.action_literal(aid),
-                    )
-                )
-            lines.append(spec.call_exit(spec.state_literal(node_id)))
-            n = n.parent
-        return lines
+    def entry_steps(name: str) -> List[PlanStep]:
+        steps = [PlanStep("entry", name)]
+        for act in m.nodes[name].entry_actions:
+            steps.append(PlanStep("action", name, act))
+        return steps
 
     def append_state(lst: List[str], name: str):
         if name != "__root__":
@@ -693,15 +1193,84 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
         acc.reverse()
         return acc
 
-    start_lines: List[str] = []
-    start_target_state: Optional[str] = None
+    def build_external_branch(s: str, t: Transition) -> PlanBranch:
+        dest_leaf = m.initial_leaf(t.dst) if m.is_composite(t.dst) else t.dst
+        exit_nodes: List[str] = []
+        n = m.nodes[s]
+        source_node = m.nodes.get(t.src)
+        if not t.internal and source_node is not None and source_node.name == s:
+            append_state(exit_nodes, s)
+            n = n.parent
+        else:
+            while n and (source_node is None or n.name != source_node.name):
+                append_state(exit_nodes, n.name)
+                n = n.parent
+        dest_within_source = False
+        target_node = m.nodes.get(t.dst) if t.dst is not None else None
+        target_is_ancestor = False
+        if t.src in m.nodes:
+            dn = m.nodes[dest_leaf]
+            while dn:
+                if dn.name == t.src:
+                    dest_within_source = True
+                    break
+                dn = dn.parent
+        if target_node is not None and source_node is not None:
+            anc = source_node
+            while anc and anc.name != "__root__":
+                if anc.name == target_node.name:
+                    target_is_ancestor = True
+                    break
+                anc = anc.parent
+        if not dest_within_source and source_node is not None and source_node.name != "__root__":
+            append_state(exit_nodes, t.src)
+            n = source_node.parent
+        else:
+            n = source_node.parent if source_node is not None else n
+        lca_src_dest = m.lca(t.src, dest_leaf) if t.src in m.nodes else None
+        if not dest_within_source:
+            while n and (lca_src_dest is None or n.name != lca_src_dest.name):
+                append_state(exit_nodes, n.name)
+                n = n.parent
+        if target_is_ancestor and target_node is not None and t.src != s:
+            current_node = m.nodes[s]
+            anc = current_node.parent
+            while anc and anc.name != "__root__":
+                if anc.name == target_node.name:
+                    break
+                append_state(exit_nodes, anc.name)
+                anc = anc.parent
+        exit_common = False
+        if (not t.internal) and dest_within_source and t.src == t.dst:
+            exit_common = True
+        if dest_within_source and source_node is not None:
+            if target_is_ancestor and target_node is not None:
+                entry_anchor_name = target_node.name
+            else:
+                entry_anchor_name = t.src
+        else:
+            lca_node = lca_src_dest if lca_src_dest is not None else (source_node if source_node is not None else None)
+            entry_anchor_name = lca_node.name if lca_node is not None else "__root__"
+        entry_nodes = entry_chain_nodes(entry_anchor_name, dest_leaf)
+        if exit_common and source_node is not None and source_node.name != s:
+            append_state(exit_nodes, source_node.name)
+        steps = [PlanStep("transition", dest_leaf)]
+        steps.extend(exit_steps(exit_nodes))
+        if t.action:
+            steps.append(PlanStep("action", CURRENT_STATE, t.action))
+        if exit_common and source_node is not None and source_node.name != "__root__":
+            steps.extend(entry_steps(source_node.name))
+        for en in entry_nodes:
+            steps.extend(entry_steps(en))
+        steps.append(PlanStep("set_state", dest_leaf))
+        return PlanBranch(t, dest_leaf, steps)
 
     root_init = m.root.initial_target
     if root_init is None and states:
         root_init = states[0]
     if root_init:
         leaf = m.initial_leaf(root_init)
-        start_target_state = state_ids_map[leaf]
+        plan.start_target = leaf
         path: List[Node] = []
         n = m.nodes[leaf]
         while n and n.name != "__root__":
@@ -718,25 +1287,248 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
             if parent:
                 initial_action = parent.initial_action
                 if initial_action and first_child.get(parent.name) == node.name:
-                    aid = action_map[initial_action]
                     action_state = node.name if parent.name == "__root__" else parent.name
-                    start_lines.append(
-                        spec.call_action(
-                            spec.state_literal(state_ids_map[action_state]),
-                            spec.default_event_literal(),
-                            spec.action_literal(aid),
-                        )
-                    )
-            start_lines.append(spec.call_entry(spec.state_literal(state_ids_map[node.name])))
-            for act in node.entry_actions:
-                aid = action_map[act]
-                start_lines.append(
-                    spec.call_action(
-                        spec.state_literal(state_ids_map[node.name]),
-                        spec.default_event_literal(),
-                        spec.action_literal(aid),
-                    )
-                )
+                    plan.start_steps.append(PlanStep("action", action_state, initial_action))
+            plan.start_steps.extend(entry_steps(node.name))
+
+    for s in states:
+        event_plans: List[EventPlan] = []
+        for ev, transitions in by_state.get(s, {}).items():
+            branches: List[PlanBranch] = []
+            for t in transitions:
+                if t.internal:
+                    steps = [PlanStep("transition", CURRENT_STATE)]
+                    if t.action:
+                        steps.append(PlanStep("action", CURRENT_STATE, t.action))
+                    branches.append(PlanBranch(t, CURRENT_STATE, steps))
+                elif t.dst is None:
+                    chain: List[str] = []
+                    n = m.nodes[s]
+                    while n and n.name != "__root__":
+                        chain.append(n.name)
+                        n = n.parent
+                    steps = [PlanStep("transition", FINAL_STATE)]
+                    steps.extend(exit_steps(chain))
+                    if t.action:
+                        steps.append(PlanStep("action", CURRENT_STATE, t.action))
+                    steps.append(PlanStep("entry", FINAL_STATE))
+                    steps.append(PlanStep("set_state", FINAL_STATE))
+                    steps.append(PlanStep("terminate", FINAL_STATE))
+                    branches.append(PlanBranch(t, FINAL_STATE, steps))
+                else:
+                    branches.append(build_external_branch(s, t))
+                if not t.guard:
+                    break
+            event_plans.append(EventPlan(ev, branches))
+        plan.state_events[s] = event_plans
+    return plan
+
+
+def order_branches_by_profile(plan: MachinePlan, counts: Dict[Tuple[str, str], int]) -> List[str]:
+    """Sort each state's event plans by dispatch count, hottest first, and
+    return the states in the same order for the dispatch chain.
+
+    Only the order of mutually exclusive branches changes: guarded candidates
+    of one event keep their model order, and ``plan.states`` (which fixes the
+    enum values) is left alone. Ties keep the model order.
+    """
+    state_totals: Dict[str, int] = {}
+    for (state, _), count in counts.items():
+        state_totals[state] = state_totals.get(state, 0) + count
+    for state, event_plans in plan.state_events.items():
+        event_plans.sort(key=lambda ep, state=state: -counts.get((state, ep.event), 0))
+    return sorted(plan.states, key=lambda state: -state_totals.get(state, 0))
+
+
+TABLE_OPS = {"transition": 0, "exit": 1, "entry": 2, "action": 3, "set_state": 4, "terminate": 5}
+
+
+class DispatchTables:
+    """A MachinePlan flattened into integer tables for data-driven backends.
+
+    ``ops`` holds (kind, state, action) opcodes; a state equal to
+    ``current_state`` means "the state the machine is in". ``rows`` holds
+    (guard, first op, op count) per branch, with ``no_guard`` for unguarded
+    branches, and the rows of cell ``state * event_count + event`` are
+    ``rows[cell_rows[cell]:cell_rows[cell + 1]]``. States and events use their
+    generated enum values.
+    """
+
+    def __init__(self):
+        self.state_count = 0
+        self.event_count = 0
+        self.current_state = 0
+        self.no_guard = 0
+        self.ops: List[Tuple[int, int, int]] = []
+        self.rows: List[Tuple[int, int, int]] = []
+        self.row_labels: List[str] = []
+        self.cell_rows: List[int] = []
+
+
+def build_dispatch_tables(plan: MachinePlan) -> DispatchTables:
+    tables = DispatchTables()
+    state_index = {name: i + 1 for i, name in enumerate(plan.states)}
+    final_index = len(plan.states) + 1
+    tables.state_count = final_index + 1
+    tables.event_count = max(len(plan.events), 1)
+    tables.current_state = tables.state_count
+    tables.no_guard = len(plan.guard_ids)
+    event_index = {name: i for i, name in enumerate(plan.events)}
+    guard_index = {name: plan.guard_ids.index(gid) for name, gid in plan.guard_map.items()}
+    action_index = {name: plan.action_ids.index(aid) for name, aid in plan.action_map.items()}
+
+    def resolve(name: str) -> int:
+        if name == CURRENT_STATE:
+            return tables.current_state
+        if name == FINAL_STATE:
+            return final_index
+        return state_index[name]
+
+    # Identical step sequences are stored once and shared by every row using them.
+    spans: Dict[Tuple[Tuple[int, int, int], ...], Tuple[int, int]] = {}
+
+    def encode(steps: List[PlanStep]) -> Tuple[int, int]:
+        ops = tuple(
+            (TABLE_OPS[step.kind], resolve(step.state), action_index[step.action] if step.action else 0)
+            for step in steps
+        )
+        if ops not in spans:
+            spans[ops] = (len(tables.ops), len(ops))
+            tables.ops.extend(ops)
+        return spans[ops]
+
+    cells: Dict[Tuple[int, int], List[Tuple[int, int, int]]] = {}
+    labels: Dict[Tuple[int, int], List[str]] = {}
+    for s in plan.states:
+        for event_plan in plan.state_events.get(s, []):
+            key = (state_index[s], event_index[event_plan.event])
+            for branch in event_plan.branches:
+                first, count = encode(branch.steps)
+                guard = guard_index[branch.guard] if branch.guard else tables.no_guard
+                cells.setdefault(key, []).append((guard, first, count))
+                label = f"{plan.state_ids[s]} / {plan.event_ids[event_plan.event]}"
+                if branch.guard:
+                    label += f" [{plan.guard_map[branch.guard]}]"
+                labels.setdefault(key, []).append(label)
+
+    for state in range(tables.state_count):
+        for event in range(tables.event_count):
+            tables.cell_rows.append(len(tables.rows))
+            tables.rows.extend(cells.get((state, event), []))
+            tables.row_labels.extend(labels.get((state, event), []))
+    tables.cell_rows.append(len(tables.rows))
+    return tables
+
+
+def normalize_identifier(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_]', '_', name)
+
+
+def split_camel(name: str) -> str:
+    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
+    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1)
+
+
+def generate_namespace_base(puml_path: Path) -> str:
+    base = puml_path.stem
+    base = split_camel(base)
+    base = normalize_identifier(base)
+    base = base.strip('_') or "state_machine"
+    return base.lower()
+
+
+def generate_type_prefix(puml_path: Path) -> str:
+    base = puml_path.stem
+    base = normalize_identifier(split_camel(base))
+    parts = [part for part in base.split('_') if part]
+    return ''.join(part.capitalize() for part in parts) or "StateMachine"
+
+
+def normalize_type_prefix(type_prefix: str) -> str:
+    type_prefix = type_prefix or "StateMachine"
+    type_prefix = ''.join(part.capitalize() for part in split_camel(type_prefix).split('_') if part)
+    return type_prefix or "StateMachine"
+
+
+@profiled("codegen")
+def gen_code(
+    m,
+    machine_name: str,
+    language: str,
+    namespace_base: str,
+    type_prefix: str,
+    options: Optional[CodegenOptions] = None,
+) -> str:
+    namespace_base = normalize_identifier(namespace_base).lower() or "state_machine"
+    type_prefix = normalize_type_prefix(type_prefix)
+    if language not in LANGUAGE_SPECS:
+        raise ValueError(
+            f"Unsupported language '{language}'. Available: {', '.join(sorted(LANGUAGE_SPECS.keys()))}"
+        )
+    spec = LANGUAGE_SPECS[language]
+    spec.configure(namespace_base, type_prefix)
+    options = options or CodegenOptions()
+    if options.dispatch not in spec.dispatch_modes:
+        raise ValueError(
+            f"Dispatch mode '{options.dispatch}' is not available for '{language}'. "
+            f"Available: {', '.join(spec.dispatch_modes)}"
+        )
+    # C++/Rust enums are already sized integers; only the Python template has
+    # an alternative representation to choose from.
+    if options.enums != "str" and options.enums not in spec.enum_styles:
+        raise ValueError(f"Enum style '{options.enums}' is not available for '{language}'.")
+    spec.enum_style = options.enums
+    spec.trace_mode = options.trace
+
+    plan = build_machine_plan(m)
+    if options.trace == "binary" and max(len(plan.states) + 2, len(plan.events)) > 0xFFFF:
+        raise ValueError("--trace binary stores state and event values as 16-bit integers; the model has too many")
+    states = plan.states
+    dispatch_states = states
+    if options.branch_profile:
+        dispatch_states = order_branches_by_profile(plan, load_branch_profile(m, options.branch_profile))
+    events = plan.events
+    guard_ids = plan.guard_ids
+    guard_map = plan.guard_map
+    action_ids = plan.action_ids
+    action_map = plan.action_map
+    state_ids_map = plan.state_ids
+    event_ids_map = plan.event_ids
+
+    def indent(level: int, text: str) -> str:
+        return "  " * level + text
+
+    pseudo_initial_literal = spec.state_literal(spec.pseudo_initial_state)
+    pseudo_final_literal = spec.state_literal(spec.pseudo_final_state)
+
+    def state_ref(name: str) -> str:
+        if name == CURRENT_STATE:
+            return spec.current_state_ref()
+        if name == FINAL_STATE:
+            return pseudo_final_literal
+        return spec.state_literal(state_ids_map[name])
+
+    def step_line(step: PlanStep, event_ref: str) -> Optional[str]:
+        if step.kind == "transition":
+            return spec.trace_transition(spec.current_state_ref(), state_ref(step.state), event_ref)
+        if step.kind == "exit":
+            return spec.call_exit(state_ref(step.state))
+        if step.kind == "entry":
+            return spec.call_entry(state_ref(step.state))
+        if step.kind == "action":
+            return spec.call_action(state_ref(step.state), event_ref, spec.action_literal(action_map[step.action]))
+        if step.kind == "set_state":
+            return spec.set_state(state_ref(step.state))
+        if step.kind == "terminate":
+            return spec.set_terminated_true()
+        raise ValueError(f"Unknown plan step '{step.kind}'")
+
+    def step_lines(steps: List[PlanStep], event_ref: str) -> List[str]:
+        lines = (step_line(step, event_ref) for step in steps)
+        return [line for line in lines if line is not None]
+
+    start_lines = step_lines(plan.start_steps, spec.default_event_literal())
+    start_target_state = state_ids_map[plan.start_target] if plan.start_target else None
 
     reset_lines: List[str] = [
         spec.set_started_false(),
@@ -744,8 +1536,6 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
     ]
 
     default_event_variant = event_ids_map[events[0]] if events else None
-    pseudo_initial_literal = spec.state_literal(spec.pseudo_initial_state)
-    pseudo_final_literal = spec.state_literal(spec.pseudo_final_state)
 
     start_transition_line: Optional[str] = None
     start_state_line: Optional[str] = None
@@ -753,7 +1543,7 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
 
     if start_target_state:
         target_literal = spec.state_literal(start_target_state)
-        start_transition_line = spec.call_transition(
+        start_transition_line = spec.trace_transition(
             pseudo_initial_literal,
             target_literal,
             spec.default_event_literal(),
@@ -761,7 +1551,7 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
         start_state_line = spec.set_state(target_literal)
     else:
         fallback_lines = [
-            spec.call_transition(
+            spec.trace_transition(
                 pseudo_initial_literal,
                 pseudo_final_literal,
                 spec.default_event_literal(),
@@ -770,309 +1560,122 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
             spec.set_state(pseudo_final_literal),
             spec.set_terminated_true(),
         ]
+        fallback_lines = [line for line in fallback_lines if line is not None]
 
     state_cases: List[Dict[str, object]] = []
+    handler_names: Set[str] = set()
+
+    def unique_handler_name(state_id: str, event_id: str) -> str:
+        base = f"_on_{state_id}__{event_id}"
+        name = base
+        suffix = 1
+        while name in handler_names:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        handler_names.add(name)
+        return name
+
+    # In size mode, identical step sequences used by several (state, event)
+    # branches anywhere in the model are emitted once as a shared method.
+    shared_bodies: List[Dict[str, object]] = []
+    shared_body_names: Dict[Tuple[Tuple[str, str, Optional[str]], ...], str] = {}
+    # Data tables already store each distinct step sequence once.
+    use_tables = options.dispatch == "table" and spec.data_tables
+    if options.optimize == "size" and not use_tables:
+        body_uses: Dict[Tuple[Tuple[str, str, Optional[str]], ...], List[PlanBranch]] = {}
+        for s in states:
+            for event_plan in plan.state_events.get(s, []):
+                for branch in event_plan.branches:
+                    body_uses.setdefault(tuple(step.key() for step in branch.steps), []).append(branch)
+        for key, branches in body_uses.items():
+            if len(branches) < 2 or len(key) < SHARED_BODY_MIN_STEPS:
+                continue
+            name = spec.shared_body_name(len(shared_bodies))
+            shared_body_names[key] = name
+            steps = branches[0].steps
+            shared_bodies.append(
+                {
+                    "name": name,
+                    "uses": len(branches),
+                    "lines": step_lines(steps, spec.event_param_ref()),
+                    # Without actions or traced transitions the event goes
+                    # unused; native templates leave the parameter unnamed.
+                    "uses_event": any(
+                        step.kind in ("action", "transition") and step_line(step, spec.event_param_ref()) is not None
+                        for step in steps
+                    ),
+                }
+            )
 
-    for s in states:
-        case_label = spec.state_literal(state_ids_map[s])
-        evmap = by_state.get(s, {})
-        event_blocks: List[Dict[str, object]] = []
-        for ev, transitions in evmap.items():
-            event_label = spec.event_literal(event_ids_map[ev])
-            body_lines: List[str] = []
-            stop_after_transition = False
-            emit_case_epilogue = True
-            for t in transitions:
-                if stop_after_transition:
-                    break
-                if t.internal:
-                    cond = ""
-                    if t.guard:
-                        gid = guard_map[t.guard]
-                        cond = spec.guard_condition(
-                            spec.current_state_ref(),
-                            spec.event_param_ref(),
-                            spec.guard_literal(gid),
-                        )
-                        guard_open = spec.guard_open(cond)
-                        if guard_open:
-                            body_lines.append(indent(6, guard_open))
-                        inner_indent = 7
-                    else:
-                        inner_indent = 6
-                    body_lines.append(
-                        indent(
-                            inner_indent,
-                            spec.call_transition(
-                                spec.current_state_ref(),
-                                spec.current_state_ref(),
-                                spec.event_param_ref(),
-                            ),
-                        )
-                    )
-                    if t.action:
-                        aid = action_map[t.action]
-                        body_lines.append(
-                            indent(
-                                inner_indent,
-                                spec.call_action(
-                                    spec.current_state_ref(),
-                                    spec.event_param_ref(),
-                                    spec.action_literal(aid),
-                                ),
-                            )
-                        )
-                    body_lines.append(indent(inner_indent, spec.return_statement()))
-                    if t.guard:
-                        guard_close = spec.guard_close()
-                        if guard_close:
-                            body_lines.append(indent(6, guard_close))
-                    else:
-                        stop_after_transition = True
-                        emit_case_epilogue = False
-                    continue
-
-                if t.dst is None:
-                    cond = ""
-                    if t.guard:
-                        gid = guard_map[t.guard]
-                        cond = spec.guard_condition(
-                            spec.current_state_ref(),
-                            spec.event_param_ref(),
-                            spec.guard_literal(gid),
-                        )
-                    if t.guard:
-                        guard_open = spec.guard_open(cond)
-                        if guard_open:
-                            body_lines.append(indent(6, guard_open))
-                        inner_indent = 7
-                    else:
-                        inner_indent = 6
-                    body_lines.append(
-                        indent(
-                            inner_indent,
-                            spec.call_transition(
-                                spec.current_state_ref(),
-                                pseudo_final_literal,
-                                spec.event_param_ref(),
-                            ),
-                        )
-                    )
-                    for ln in emit_exit_chain_for_state(s):
-                        body_lines.append(indent(inner_indent, ln))
-                    if t.action:
-                        aid = action_map[t.action]
-                        body_lines.append(
-                            indent(
-                                inner_indent,
-                                spec.call_action(
-                                    spec.current_state_ref(),
-                                    spec.event_param_ref(),
-                                    spec.action_literal(aid),
-                                ),
-                            )
-                        )
-                    body_lines.append(indent(inner_indent, spec.call_entry(pseudo_final_literal)))
-                    body_lines.append(indent(inner_indent, spec.set_state(pseudo_final_literal)))
-                    body_lines.append(indent(inner_indent, spec.set_terminated_true()))
-                    body_lines.append(indent(inner_indent, spec.return_statement()))
-                    if t.guard:
-                        guard_close = spec.guard_close()
-                        if guard_close:
-                            body_lines.append(indent(6, guard_close))
-                    else:
-                        stop_after_transition = True
-                        emit_case_epilogue = False
-                    continue
+    def branch_lines(branch: PlanBranch) -> List[str]:
+        lines: List[str] = []
+        inner_indent = 6
+        if branch.guard:
+            cond = spec.guard_condition(
+                spec.current_state_ref(),
+                spec.event_param_ref(),
+                spec.guard_literal(guard_map[branch.guard]),
+            )
+            guard_open = spec.guard_open(cond)
+            if guard_open:
+                lines.append(indent(6, guard_open))
+            inner_indent = 7
+        shared_name = shared_body_names.get(tuple(step.key() for step in branch.steps))
+        if shared_name is not None:
+            lines.append(indent(inner_indent, spec.call_shared_body(shared_name, spec.event_param_ref())))
+        else:
+            for line in step_lines(branch.steps, spec.event_param_ref()):
+                lines.append(indent(inner_indent, line))
+        lines.append(indent(inner_indent, spec.return_statement()))
+        if branch.guard:
+            guard_close = spec.guard_close()
+            if guard_close:
+                lines.append(indent(6, guard_close))
+        return lines
 
-                dest_leaf = m.initial_leaf(t.dst) if m.is_composite(t.dst) else t.dst
-                exit_nodes: List[str] = []
-                n = m.nodes[s]
-                source_node = m.nodes.get(t.src)
-                if not t.internal and source_node is not None and source_node.name == s:
-                    append_state(exit_nodes, s)
-                    n = n.parent
-                else:
-                    while n and (source_node is None or n.name != source_node.name):
-                        append_state(exit_nodes, n.name)
-                        n = n.parent
-                dest_within_source = False
-                target_node = m.nodes.get(t.dst) if t.dst is not None else None
-                target_is_ancestor = False
-                if t.src in m.nodes:
-                    dn = m.nodes[dest_leaf]
-                    while dn:
-                        if dn.name == t.src:
-                            dest_within_source = True
-                            break
-                        dn = dn.parent
-                if target_node is not None and source_node is not None:
-                    anc = source_node
-                    while anc and anc.name != "__root__":
-                        if anc.name == target_node.name:
-                            target_is_ancestor = True
-                            break
-                        anc = anc.parent
-                if not dest_within_source and source_node is not None and source_node.name != "__root__":
-                    append_state(exit_nodes, t.src)
-                    n = source_node.parent
-                else:
-                    n = source_node.parent if source_node is not None else n
-                lca_src_dest = m.lca(t.src, dest_leaf) if t.src in m.nodes else None
-                if not dest_within_source:
-                    while n and (lca_src_dest is None or n.name != lca_src_dest.name):
-                        append_state(exit_nodes, n.name)
-                        n = n.parent
-                if target_is_ancestor and target_node is not None and t.src != s:
-                    current_node = m.nodes[s]
-                    anc = current_node.parent
-                    while anc and anc.name != "__root__":
-                        if anc.name == target_node.name:
-                            break
-                        append_state(exit_nodes, anc.name)
-                        anc = anc.parent
-                exit_common = False
-                if (not t.internal) and dest_within_source and t.src == t.dst:
-                    exit_common = True
-                if dest_within_source and source_node is not None:
-                    if target_is_ancestor and target_node is not None:
-                        entry_anchor_name = target_node.name
-                    else:
-                        entry_anchor_name = t.src
-                else:
-                    lca_node = lca_src_dest if lca_src_dest is not None else (source_node if source_node is not None else None)
-                    entry_anchor_name = lca_node.name if lca_node is not None else "__root__"
-                entry_nodes = entry_chain_nodes(entry_anchor_name, dest_leaf)
-                if exit_common and source_node is not None and source_node.name != s:
-                    append_state(exit_nodes, source_node.name)
-                cond = ""
-                if t.guard:
-                    gid = guard_map[t.guard]
-                    cond = spec.guard_condition(
-                        spec.current_state_ref(),
-                        spec.event_param_ref(),
-                        spec.guard_literal(gid),
-                    )
-                if t.guard:
-                    guard_open = spec.guard_open(cond)
-                    if guard_open:
-                        body_lines.append(indent(6, guard_open))
-                    inner_indent = 7
-                else:
-                    inner_indent = 6
-                body_lines.append(
-                    indent(
-                        inner_indent,
-                        spec.call_transition(
-                            spec.current_state_ref(),
-                            spec.state_literal(state_ids_map[dest_leaf]),
-                            spec.event_param_ref(),
-                        ),
-                    )
+    with profile_phase("bodies"):
+        for s in dispatch_states:
+            case_label = spec.state_literal(state_ids_map[s])
+            event_blocks: List[Dict[str, object]] = []
+            for event_plan in plan.state_events.get(s, []):
+                ev = event_plan.event
+                body_lines: List[str] = []
+                for branch in event_plan.branches:
+                    body_lines.extend(branch_lines(branch))
+                epilogue = spec.case_epilogue()
+                if event_plan.falls_through() and epilogue:
+                    body_lines.append(indent(6, epilogue))
+                event_blocks.append(
+                    {
+                        "enum_name": event_ids_map[ev],
+                        "case_label": spec.event_literal(event_ids_map[ev]),
+                        "handler_name": unique_handler_name(state_ids_map[s], event_ids_map[ev]),
+                        "lines": body_lines,
+                    }
                 )
-                for en in exit_nodes:
-                    node = m.nodes[en]
-                    node_id = state_ids_map[node.name]
-                    for act in node.exit_actions:
-                        aid = action_map[act]
-                        body_lines.append(
-                            indent(
-                                inner_indent,
-                                spec.call_action(
-                                    spec.state_literal(node_id),
-                                    spec.event_param_ref(),
-                                    spec.action_literal(aid),
-                                ),
-                            )
-                        )
-                    body_lines.append(indent(inner_indent, spec.call_exit(spec.state_literal(node_id))))
-                if t.action:
-                    aid = action_map[t.action]
-                    body_lines.append(
-                        indent(
-                            inner_indent,
-                            spec.call_action(
-                                spec.current_state_ref(),
-                                spec.event_param_ref(),
-                                spec.action_literal(aid),
-                            ),
-                        )
-                    )
-                if exit_common and source_node is not None and source_node.name != "__root__":
-                    source_id = state_ids_map[source_node.name]
-                    body_lines.append(indent(inner_indent, spec.call_entry(spec.state_literal(source_id))))
-                    for act in source_node.entry_actions:
-                        aid = action_map[act]
-                        body_lines.append(
-                            indent(
-                                inner_indent,
-                                spec.call_action(
-                                    spec.state_literal(source_id),
-                                    spec.event_param_ref(),
-                                    spec.action_literal(aid),
-                                ),
-                            )
-                        )
-                for en in entry_nodes:
-                    node = m.nodes[en]
-                    node_id = state_ids_map[node.name]
-                    body_lines.append(indent(inner_indent, spec.call_entry(spec.state_literal(node_id))))
-                    for act in node.entry_actions:
-                        aid = action_map[act]
-                        body_lines.append(
-                            indent(
-                                inner_indent,
-                                spec.call_action(
-                                    spec.state_literal(node_id),
-                                    spec.event_param_ref(),
-                                    spec.action_literal(aid),
-                                ),
-                            )
-                        )
-                body_lines.append(indent(inner_indent, spec.set_state(spec.state_literal(state_ids_map[dest_leaf]))))
-                body_lines.append(indent(inner_indent, spec.return_statement()))
-                if t.guard:
-                    guard_close = spec.guard_close()
-                    if guard_close:
-                        body_lines.append(indent(6, guard_close))
+            cpp_event_blocks: List[Dict[str, object]] = []
+            for block in event_blocks:
+                merged = {
+                    "enum_name": block["enum_name"],
+                    "case_labels": [block["case_label"]],
+                    "lines": block["lines"],
+                }
+                if cpp_event_blocks and cpp_event_blocks[-1]["lines"] == block["lines"]:
+                    cpp_event_blocks[-1]["case_labels"].append(block["case_label"])
                 else:
-                    stop_after_transition = True
-                    emit_case_epilogue = False
-            epilogue = spec.case_epilogue()
-            if emit_case_epilogue and epilogue:
-                body_lines.append(indent(6, epilogue))
-            event_blocks.append(
+                    cpp_event_blocks.append(merged)
+            handler_name = state_ids_map[s]
+            state_cases.append(
                 {
-                    "enum_name": event_ids_map[ev],
-                    "case_label": event_label,
-                    "lines": body_lines,
+                    "enum_name": state_ids_map[s],
+                    "case_label": case_label,
+                    "handler_name": handler_name,
+                    "events": event_blocks,
+                    "cpp_events": cpp_event_blocks,
                 }
             )
-        cpp_event_blocks: List[Dict[str, object]] = []
-        for block in event_blocks:
-            merged = {
-                "enum_name": block["enum_name"],
-                "case_labels": [block["case_label"]],
-                "lines": block["lines"],
-            }
-            if cpp_event_blocks and cpp_event_blocks[-1]["lines"] == block["lines"]:
-                cpp_event_blocks[-1]["case_labels"].append(block["case_label"])
-            else:
-                cpp_event_blocks.append(merged)
-        handler_name = state_ids_map[s]
-        state_cases.append(
-            {
-                "enum_name": state_ids_map[s],
-                "case_label": case_label,
-                "handler_name": handler_name,
-                "events": event_blocks,
-                "cpp_events": cpp_event_blocks,
-            }
-        )
 
-    template_dir = Path(__file__).parent / "templates"
-    env = Environment(loader=FileSystemLoader(str(template_dir)), trim_blocks=True, lstrip_blocks=True)
-    template = env.get_template(spec.template)
+    template = template_environment().get_template(spec.template)
 
     rendered_states = [state_ids_map[s] for s in states] or ["__None"]
     rendered_events = [event_ids_map[e] for e in events] or ["__None"]
@@ -1085,36 +1688,187 @@ def gen_code(m, machine_name: str, language: str, namespace_base: str, type_pref
     guard_enum_type = select_enum_underlying_type(len(rendered_guard_ids))
     action_enum_type = select_enum_underlying_type(len(rendered_action_ids))
 
-    code = template.render(
-        machine_name=machine_name,
-        namespace_base=namespace_base,
+    tables: Optional[DispatchTables] = None
+    table_types: Dict[str, str] = {}
+    if use_tables:
+        tables = build_dispatch_tables(plan)
+        table_types = {
+            "state": spec.unsigned_type(select_enum_underlying_type(tables.current_state + 1)),
+            "guard": spec.unsigned_type(select_enum_underlying_type(tables.no_guard + 1)),
+            "action": spec.unsigned_type(action_enum_type),
+            "op_index": spec.unsigned_type(select_enum_underlying_type(len(tables.ops) + 1)),
+            "row_index": spec.unsigned_type(select_enum_underlying_type(len(tables.rows) + 1)),
+        }
+
+    enum_aliases: List[Tuple[str, str]] = []
+    if isinstance(spec, PythonLanguageSpec):
+        enum_aliases = spec.enum_aliases(
+            state_enum_values, rendered_events, rendered_guard_ids, rendered_action_ids
+        )
+
+    with profile_phase("render"):
+        code = template.render(
+            machine_name=machine_name,
+            namespace_base=namespace_base,
+            type_prefix=type_prefix,
+            dispatch_mode=options.dispatch,
+            enum_style=options.enums,
+            trace_mode=options.trace,
+            trace_capacity=options.trace_capacity,
+            counters=options.counters,
+            stats_format=STATS_FORMAT,
+            stats_version=STATS_FORMAT_VERSION,
+            trace_magic=TRACE_MAGIC.decode("ascii"),
+            trace_version=TRACE_FORMAT_VERSION,
+            trace_header=TRACE_HEADER,
+            trace_record=TRACE_RECORD,
+            enum_aliases=enum_aliases,
+            states=rendered_states,
+            events=rendered_events,
+            guard_ids=rendered_guard_ids,
+            action_ids=rendered_action_ids,
+            reset_lines=reset_lines,
+            state_cases=state_cases,
+            shared_bodies=shared_bodies,
+            tables=tables,
+            table_types=table_types,
+            start_lines=start_lines,
+            has_start_target=start_target_state is not None,
+            start_transition_line=start_transition_line,
+            start_state_line=start_state_line,
+            fallback_lines=fallback_lines,
+            pseudo_initial=spec.pseudo_initial_state,
+            pseudo_final=spec.pseudo_final_state,
+            pseudo_initial_literal=pseudo_initial_literal,
+            pseudo_final_literal=pseudo_final_literal,
+            current_state_ref=spec.current_state_ref(),
+            event_param_ref=spec.event_param_ref(),
+            default_event_variant=default_event_variant,
+            default_event_literal=spec.default_event_literal(),
+            return_statement=spec.return_statement(),
+            state_enum_type=state_enum_type,
+            event_enum_type=event_enum_type,
+            guard_enum_type=guard_enum_type,
+            action_enum_type=action_enum_type,
+        )
+    return code
+
+
+FLEET_LANGUAGE = "python-fleet"
+FLEET_EXTENSION = "_fleet.py"
+FLEET_OPS = {"exit": 0, "entry": 1, "action": 2}
+NUMPY_UNSIGNED_TYPES = {
+    "std::uint8_t": "uint8",
+    "std::uint16_t": "uint16",
+    "std::uint32_t": "uint32",
+    "std::uint64_t": "uint64",
+}
+
+
+def fleet_unsupported_options(options: CodegenOptions) -> List[str]:
+    """Flags set away from their defaults; the fleet engine has a single code shape."""
+    defaults = CodegenOptions()
+    unsupported = [
+        f"--{name.replace('_', '-')} {getattr(options, name)}"
+        for name in ("dispatch", "enums", "optimize", "trace", "trace_capacity")
+        if getattr(options, name) != getattr(defaults, name)
+    ]
+    if options.counters:
+        unsupported.append("--counters")
+    if options.branch_profile is not None:
+        unsupported.append("--branch-profile")
+    return unsupported
+
+
+def gen_fleet_code(m: Model, type_prefix: str, options: Optional[CodegenOptions] = None) -> str:
+    if options is not None:
+        unsupported = fleet_unsupported_options(options)
+        if unsupported:
+            raise ValueError(f"{FLEET_LANGUAGE} does not support {', '.join(unsupported)}")
+    type_prefix = normalize_type_prefix(type_prefix)
+    plan = build_machine_plan(m)
+
+    rendered_states = [plan.state_ids[s] for s in plan.states] or ["__None"]
+    rendered_events = [plan.event_ids[e] for e in plan.events] or ["__None"]
+    state_values = (
+        [("InitialPseudoState", 0)]
+        + [(name, i + 1) for i, name in enumerate(rendered_states)]
+        + [("FinalPseudoState", len(rendered_states) + 1)]
+    )
+    state_index = {name: i + 1 for i, name in enumerate(plan.states)}
+    final_index = len(rendered_states) + 1
+    event_index = {name: i for i, name in enumerate(plan.events)}
+    guard_index = {name: plan.guard_ids.index(gid) for name, gid in plan.guard_map.items()}
+    action_index = {name: plan.action_ids.index(aid) for name, aid in plan.action_map.items()}
+
+    ops: List[Tuple[int, int, int]] = []
+    spans: Dict[Tuple[Tuple[int, int, int], ...], Tuple[int, int]] = {}
+
+    def resolve(name: str, current: int) -> int:
+        if name == CURRENT_STATE:
+            return current
+        if name == FINAL_STATE:
+            return final_index
+        return state_index[name]
+
+    def encode(steps: List[PlanStep], current: int) -> Tuple[int, int]:
+        rows = tuple(
+            (
+                FLEET_OPS[step.kind],
+                resolve(step.state, current),
+                action_index[step.action] if step.action else -1,
+            )
+            for step in steps
+            if step.kind in FLEET_OPS
+        )
+        if rows not in spans:
+            spans[rows] = (len(ops), len(rows))
+            ops.extend(rows)
+        return spans[rows]
+
+    direct_cells: List[Tuple[int, int, int, bool, int, int]] = []
+    guarded_cells: List[Tuple[Tuple[int, int], List[Tuple[int, int, bool, int, int]]]] = []
+    for s in plan.states:
+        current = state_index[s]
+        for event_plan in plan.state_events.get(s, []):
+            branches = []
+            for branch in event_plan.branches:
+                start, count = encode(branch.steps, current)
+                guard = guard_index[branch.guard] if branch.guard else -1
+                branches.append(
+                    (guard, resolve(branch.target, current), branch.target == FINAL_STATE, start, count)
+                )
+            key = (current, event_index[event_plan.event])
+            if branches[0][0] < 0:
+                direct_cells.append(key + branches[0][1:])
+            else:
+                guarded_cells.append((key, branches))
+
+    if plan.start_target:
+        start_state = state_index[plan.start_target]
+        start_ops = encode(plan.start_steps, start_state)
+        start_terminates = False
+    else:
+        start_state = final_index
+        start_ops = encode([PlanStep("entry", FINAL_STATE)], final_index)
+        start_terminates = True
+
+    return render_template(
+        "python/fleet.py.j2",
         type_prefix=type_prefix,
-        states=rendered_states,
-        events=rendered_events,
-        guard_ids=rendered_guard_ids,
-        action_ids=rendered_action_ids,
-        reset_lines=reset_lines,
-        state_cases=state_cases,
-        start_lines=start_lines,
-        has_start_target=start_target_state is not None,
-        start_transition_line=start_transition_line,
-        start_state_line=start_state_line,
-        fallback_lines=fallback_lines,
-        pseudo_initial=spec.pseudo_initial_state,
-        pseudo_final=spec.pseudo_final_state,
-        pseudo_initial_literal=pseudo_initial_literal,
-        pseudo_final_literal=pseudo_final_literal,
-        current_state_ref=spec.current_state_ref(),
-        event_param_ref=spec.event_param_ref(),
-        default_event_variant=default_event_variant,
-        default_event_literal=spec.default_event_literal(),
-        return_statement=spec.return_statement(),
-        state_enum_type=state_enum_type,
-        event_enum_type=event_enum_type,
-        guard_enum_type=guard_enum_type,
-        action_enum_type=action_enum_type,
+        state_values=state_values,
+        events=rendered_events if plan.events else [],
+        guard_ids=plan.guard_ids or ["__None"],
+        action_ids=plan.action_ids or ["__None"],
+        pseudo_initial="InitialPseudoState",
+        state_dtype=NUMPY_UNSIGNED_TYPES[select_enum_underlying_type(len(state_values))],
+        ops=ops,
+        direct_cells=direct_cells,
+        guarded_cells=guarded_cells,
+        start_state=start_state,
+        start_terminates=start_terminates,
+        start_ops=start_ops,
     )
-    return code
 
 
 def generate_python_assets(
@@ -1126,38 +1880,766 @@ def generate_python_assets(
 ) -> None:
     code = gen_code(model, machine_name, "python", namespace_base, type_prefix)
     output_path.write_text(code, encoding="utf-8")
+    profile_count("emitted lines", code.count("\n"))
 
 
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+
+class _BytecodeCache(FileSystemBytecodeCache):
+    def dump_bytecode(self, bucket) -> None:
+        # An unwritable cache directory only costs a recompile next time.
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+_TEMPLATE_ENV: Optional[Environment] = None
+
+
+def configure_template_cache(directory: Optional[Path]) -> Environment:
+    """Replace the shared template environment; ``None`` disables bytecode caching."""
+    global _TEMPLATE_ENV
+    bytecode_cache = None
+    if directory is not None:
+        try:
+            ensure_dir(Path(directory))
+            bytecode_cache = _BytecodeCache(str(directory))
+        except OSError:
+            bytecode_cache = None
+    _TEMPLATE_ENV = Environment(
+        loader=FileSystemLoader(str(TEMPLATE_DIR)),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        bytecode_cache=bytecode_cache,
+    )
+    return _TEMPLATE_ENV
+
+
+def template_environment() -> Environment:
+    # Compiled templates stay in this environment for the life of the process.
+    # The bytecode cache that carries them across processes is opt-in: the CLI
+    # enables it under the generation cache, library callers through
+    # configure_template_cache.
+    if _TEMPLATE_ENV is None:
+        return configure_template_cache(None)
+    return _TEMPLATE_ENV
+
+
 def render_template(template_name: str, **context) -> str:
-    template_dir = Path(__file__).parent / "templates"
-    env = Environment(loader=FileSystemLoader(str(template_dir)), trim_blocks=True, lstrip_blocks=True)
-    template = env.get_template(template_name)
+    template = template_environment().get_template(template_name)
     return template.render(**context)
 
 
+CACHE_DIR_ENV = "STATESURF_CACHE_DIR"
+CACHE_MAX_BYTES_ENV = "STATESURF_CACHE_MAX_BYTES"
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_FORMAT_VERSION = 1
+
+
+def default_cache_dir() -> Path:
+    configured = os.environ.get(CACHE_DIR_ENV)
+    if configured:
+        return Path(configured)
+    base = os.environ.get("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "statesurf"
+
+
+_GENERATOR_FINGERPRINT: Optional[str] = None
+
+
+def generator_fingerprint() -> str:
+    # Any edit to the generator or its templates must invalidate cached output.
+    global _GENERATOR_FINGERPRINT
+    if _GENERATOR_FINGERPRINT is None:
+        digest = hashlib.sha256(f"v{CACHE_FORMAT_VERSION}".encode("ascii"))
+        digest.update(Path(__file__).read_bytes())
+        for template in sorted(p for p in TEMPLATE_DIR.rglob("*") if p.is_file()):
+            digest.update(template.relative_to(TEMPLATE_DIR).as_posix().encode("utf-8"))
+            digest.update(template.read_bytes())
+        _GENERATOR_FINGERPRINT = digest.hexdigest()
+    return _GENERATOR_FINGERPRINT
+
+
+class GenerationCache:
+    """On-disk cache of parsed models and rendered output, keyed by content hash.
+
+    Entries live under ``<root>/model`` and ``<root>/output``. Hits refresh the
+    entry's mtime; ``evict()`` drops least recently used entries until the
+    cache fits in ``max_bytes``.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root) if root is not None else default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV, DEFAULT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def model_key(self, digest: str) -> str:
+        return self._key("model", digest)
+
+    def output_key(
+        self,
+        digest: str,
+        language: str,
+        machine_name: str,
+        namespace_base: str,
+        type_prefix: str,
+        options: CodegenOptions,
+    ) -> str:
+        return self._key(
+            "output",
+            digest,
+            language,
+            machine_name,
+            namespace_base,
+            type_prefix,
+            options.dispatch,
+            options.enums,
+            options.optimize,
+            options.trace,
+            str(options.trace_capacity),
+            str(options.counters),
+            hashlib.sha256(options.branch_profile).hexdigest() if options.branch_profile else "",
+        )
+
+    def load_model(self, key: str) -> Optional[Model]:
+        data = self._read("model", key)
+        if data is None:
+            return None
+        try:
+            return Model.from_dict(json.loads(data))
+        except (ValueError, KeyError, TypeError):
+            self._path("model", key).unlink(missing_ok=True)
+            return None
+
+    def store_model(self, key: str, model: Model) -> None:
+        self._write("model", key, json.dumps(model.to_dict(), separators=(",", ":")))
+
+    def load_output(self, key: str) -> Optional[str]:
+        return self._read("output", key)
+
+    def store_output(self, key: str, code: str) -> None:
+        self._write("output", key, code)
+
+    def evict(self) -> int:
+        entries = []
+        total = 0
+        for kind in ("model", "output"):
+            directory = self.root / kind
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for kind in ("model", "output"):
+            directory = self.root / kind
+            if directory.is_dir():
+                for path in directory.iterdir():
+                    path.unlink(missing_ok=True)
+
+    def _key(self, *parts: str) -> str:
+        payload = json.dumps([generator_fingerprint(), *parts])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.root / kind / key
+
+    def _read(self, kind: str, key: str) -> Optional[str]:
+        path = self._path(kind, key)
+        try:
+            data = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, kind: str, key: str, data: str) -> None:
+        path = self._path(kind, key)
+        try:
+            ensure_dir(path.parent)
+            tmp = path.with_name(f".{key}.{os.getpid()}.tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            # A read-only or full cache directory must never break generation.
+            pass
+
+
+SOURCE_DIGEST_CHUNK = 1 << 20
+
+
+def source_digest(path: Path) -> str:
+    """SHA-256 of a model file, read in chunks so large models are never held whole."""
+    digest = hashlib.sha256()
+    with path.open("rb") as stream:
+        for chunk in iter(lambda: stream.read(SOURCE_DIGEST_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_model(input_path: Path, cache: Optional[GenerationCache] = None, digest: Optional[str] = None) -> Model:
+    if cache is None:
+        return parse_puml(input_path)
+    key = cache.model_key(digest or source_digest(input_path))
+    model = cache.load_model(key)
+    if model is None:
+        model = parse_puml(input_path)
+        cache.store_model(key, model)
+    return model
+
+
 def generate(
     input_path: Path,
     output_path: Path,
     machine_name: Optional[str] = None,
     language: str = "cpp",
-) -> None:
-    model = parse_puml(input_path)
+    options: Optional[CodegenOptions] = None,
+    cache: Optional[GenerationCache] = None,
+) -> "GenerationTiming":
+    return generate_outputs(input_path, [(language, output_path)], machine_name, options, cache)
+
+
+def generate_outputs(
+    input_path: Path,
+    targets: List[Tuple[str, Path]],
+    machine_name: Optional[str] = None,
+    options: Optional[CodegenOptions] = None,
+    cache: Optional[GenerationCache] = None,
+) -> "GenerationTiming":
+    # The model is parsed at most once, and only if some target misses the cache.
+    started = time.perf_counter()
+    timing = GenerationTiming(input_path)
+    options = options or CodegenOptions()
+    digest = source_digest(input_path) if cache is not None else None
     namespace_base = generate_namespace_base(input_path)
     type_prefix = generate_type_prefix(input_path)
     effective_machine_name = machine_name or f"{type_prefix}Machine"
-    code = gen_code(model, effective_machine_name, language, namespace_base, type_prefix)
+    model: Optional[Model] = None
+    for language, output_path in targets:
+        render_started = time.perf_counter()
+        code = None
+        if cache is not None:
+            output_key = cache.output_key(
+                digest, language, effective_machine_name, namespace_base, type_prefix, options
+            )
+            code = cache.load_output(output_key)
+        if code is None:
+            if model is None:
+                parse_started = time.perf_counter()
+                model = load_model(input_path, cache, digest)
+                timing.parse = time.perf_counter() - parse_started
+                render_started = time.perf_counter()
+            code = render_language(model, language, effective_machine_name, namespace_base, type_prefix, options)
+            if cache is not None:
+                cache.store_output(output_key, code)
+        else:
+            timing.cached.add(language)
+            profile_count("cached outputs", 1)
+        output_path.write_text(code, encoding="utf-8")
+        profile_count("emitted lines", code.count("\n"))
+        timing.sizes[language] = len(code.encode("utf-8"))
+        timing.languages[language] = time.perf_counter() - render_started
+    timing.total = time.perf_counter() - started
+    return timing
+
+
+def render_language(
+    model: Model,
+    language: str,
+    machine_name: str,
+    namespace_base: str,
+    type_prefix: str,
+    options: CodegenOptions,
+) -> str:
+    if language == FLEET_LANGUAGE:
+        return gen_fleet_code(model, type_prefix, options)
+    return gen_code(model, machine_name, language, namespace_base, type_prefix, options)
+
+
+def generate_stream(
+    stream,
+    output_path: Path,
+    machine_name: Optional[str] = None,
+    language: str = "cpp",
+    options: Optional[CodegenOptions] = None,
+) -> Tuple[Model, str]:
+    """Generate from a model read incrementally from ``stream`` (e.g. stdin).
+
+    Namespace and type prefix come from the output file name. The cache is not
+    used: its key is the content hash, which is only known after the whole
+    model has been consumed. Returns the model and the code written.
+    """
+    model = parse_puml_stream(stream)
+    namespace_base = generate_namespace_base(output_path)
+    type_prefix = generate_type_prefix(output_path)
+    code = render_language(
+        model, language, machine_name or f"{type_prefix}Machine", namespace_base, type_prefix,
+        options or CodegenOptions(),
+    )
     output_path.write_text(code, encoding="utf-8")
+    profile_count("emitted lines", code.count("\n"))
+    return model, code
+
+
+def size_report(
+    model: Model,
+    output_path: Path,
+    size: int,
+    machine_name: Optional[str],
+    namespace_base: str,
+    type_prefix: str,
+    language: str,
+    options: CodegenOptions,
+) -> str:
+    """Describe how much smaller ``--optimize size`` output is than the default.
+
+    ``size`` is the byte length of the code already written to ``output_path``;
+    only the speed variant is rendered here, with the same names as that code.
+    """
+    machine_name = machine_name or f"{type_prefix}Machine"
+    speed_options = CodegenOptions(
+        options.dispatch,
+        options.enums,
+        "speed",
+        options.trace,
+        options.trace_capacity,
+        options.counters,
+        options.branch_profile,
+    )
+    speed_size = len(
+        render_language(model, language, machine_name, namespace_base, type_prefix, speed_options).encode("utf-8")
+    )
+    saved = speed_size - size
+    percent = 100.0 * saved / speed_size if speed_size else 0.0
+    return f"{output_path}: {size} bytes, {saved} bytes ({percent:.1f}%) saved by shared transition bodies"
+
+
+def transition_label(t: Transition) -> str:
+    """A transition written back in PlantUML syntax, for reports."""
+    label = t.event or ""
+    if t.guard:
+        label += f" [{t.guard}]"
+    if t.action:
+        label += f" / {t.action}"
+    if t.internal:
+        return f"{t.src} : {label}"
+    return f"{t.src} --> {t.dst or '[*]'} : {label}"
+
+
+class TraceEntry:
+    def __init__(
+        self,
+        timestamp: int,
+        state: str,
+        event: str,
+        dst: str,
+        guards: List[Tuple[str, bool]],
+        transition: Optional[Transition],
+    ):
+        self.timestamp = timestamp
+        self.state = state  # model state name, or "[*]" for the pseudo states
+        self.event = event
+        self.dst = dst
+        self.guards = guards  # (guard, passed) in evaluation order
+        self.transition = transition  # None when the event was ignored
+
+
+class DecodedTrace:
+    def __init__(self, capacity: int, total: int, entries: List[TraceEntry]):
+        self.capacity = capacity
+        self.total = total  # dispatches recorded, including overwritten ones
+        self.entries = entries
+
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.entries)
+
+
+def decode_trace(model: Model, data: bytes) -> DecodedTrace:
+    """Turn a ``--trace binary`` dump back into model names.
+
+    The model must be the one the machine was generated from: enum values are
+    mapped through the same MachinePlan, and guard results are matched to the
+    guarded branches of each (state, event) in evaluation order.
+    """
+    if len(data) < TRACE_HEADER.size:
+        raise ValueError("Trace dump is shorter than its header")
+    magic, version, record_size, state_count, event_count, guard_count, capacity, retained, total = (
+        TRACE_HEADER.unpack_from(data)
+    )
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"Not a StateSurf trace dump (magic {magic!r})")
+    if version != TRACE_FORMAT_VERSION or record_size != TRACE_RECORD.size:
+        raise ValueError(f"Unsupported trace format version {version} (record size {record_size})")
+    plan = build_machine_plan(model)
+    state_names = ["[*]"] + plan.states + ["[*]"]
+    if (state_count, event_count, guard_count) != (len(state_names), len(plan.events), len(plan.guard_ids)):
+        raise ValueError(
+            f"Trace was recorded for a machine with {state_count} states, {event_count} events and "
+            f"{guard_count} guards; the model has {len(state_names)}, {len(plan.events)} and {len(plan.guard_ids)}"
+        )
+    if len(data) < TRACE_HEADER.size + retained * record_size:
+        raise ValueError(f"Trace dump is truncated: expected {retained} records")
+
+    event_plans = {
+        (state, ep.event): ep.branches for state, plans in plan.state_events.items() for ep in plans
+    }
+    entries: List[TraceEntry] = []
+    for timestamp, state_id, event_id, dst_id, evaluated, bits in TRACE_RECORD.iter_unpack(
+        data[TRACE_HEADER.size:TRACE_HEADER.size + retained * record_size]
+    ):
+        if state_id >= state_count or dst_id >= state_count or event_id >= event_count:
+            raise ValueError(f"Trace record out of range: state {state_id}, event {event_id}, dst {dst_id}")
+        state = state_names[state_id]
+        event = plan.events[event_id]
+        guards: List[Tuple[str, bool]] = []
+        taken: Optional[Transition] = None
+        for branch in event_plans.get((state, event), []):
+            if branch.guard:
+                index = len(guards)
+                passed = index < 8 and bool(bits >> index & 1)
+                guards.append((branch.guard, passed))
+                if not passed:
+                    continue
+            taken = branch.transition
+            break
+        entries.append(TraceEntry(timestamp, state, event, state_names[dst_id], guards[:evaluated], taken))
+    return DecodedTrace(capacity, total, entries)
+
+
+def format_trace(trace: DecodedTrace, limit: Optional[int] = None) -> str:
+    """Records (the last ``limit`` of them, if given) followed by per-transition statistics."""
+    lines = [
+        f"{len(trace.entries)} of {trace.total} dispatches retained "
+        f"(capacity {trace.capacity}, {trace.dropped} overwritten)"
+    ]
+    shown = trace.entries if limit is None else trace.entries[len(trace.entries) - min(limit, len(trace.entries)):]
+    start = trace.entries[0].timestamp if trace.entries else 0
+    for entry in shown:
+        guards = "".join(f" [{guard}={'true' if passed else 'false'}]" for guard, passed in entry.guards)
+        outcome = entry.dst if entry.transition is not None else "ignored"
+        lines.append(f"{entry.timestamp - start:>12} {entry.state} --{entry.event}-->{guards} {outcome}")
+
+    taken: Dict[int, Tuple[Transition, int]] = {}
+    ignored: Dict[Tuple[str, str], int] = {}
+    guard_stats: Dict[str, List[int]] = {}
+    for entry in trace.entries:
+        if entry.transition is not None:
+            t, count = taken.get(id(entry.transition), (entry.transition, 0))
+            taken[id(entry.transition)] = (t, count + 1)
+        else:
+            ignored[(entry.state, entry.event)] = ignored.get((entry.state, entry.event), 0) + 1
+        for guard, passed in entry.guards:
+            counts = guard_stats.setdefault(guard, [0, 0])
+            counts[0 if passed else 1] += 1
+    total = len(trace.entries) or 1
+    lines.append("")
+    lines.append(f"{'count':>8} {'share':>7}  transition")
+    for t, count in sorted(taken.values(), key=lambda item: -item[1]):
+        lines.append(f"{count:>8} {100.0 * count / total:>6.1f}%  {transition_label(t)}")
+    for (state, event), count in sorted(ignored.items(), key=lambda item: -item[1]):
+        lines.append(f"{count:>8} {100.0 * count / total:>6.1f}%  {state} : {event} (ignored)")
+    if guard_stats:
+        lines.append("")
+        lines.append(f"{'passed':>8} {'failed':>7}  guard")
+        for guard, (passed, failed) in sorted(guard_stats.items()):
+            lines.append(f"{passed:>8} {failed:>7}  {guard}")
+    return "\n".join(lines)
+
+
+def stats_state_names(plan: MachinePlan, stats: dict) -> List[str]:
+    """Check a stats() dump against the plan; returns state names by enum value."""
+    if (
+        not isinstance(stats, dict)
+        or stats.get("format") != STATS_FORMAT
+        or stats.get("version") != STATS_FORMAT_VERSION
+    ):
+        raise ValueError(f"Not a {STATS_FORMAT} v{STATS_FORMAT_VERSION} dump")
+    for key in ("states", "events"):
+        if not _is_count(stats.get(key)):
+            raise ValueError(f"Stats dump has no valid '{key}' count")
+    counts = stats.get("counts")
+    if not isinstance(counts, list) or not all(_is_count(count) for count in counts):
+        raise ValueError("Stats dump 'counts' must be a list of non-negative integers")
+    callbacks = stats.get("callbacks")
+    if callbacks is not None and not (
+        isinstance(callbacks, dict)
+        and all(
+            isinstance(name, str)
+            and isinstance(timing, dict)
+            and _is_count(timing.get("calls"))
+            and isinstance(timing.get("seconds"), (int, float))
+            and not isinstance(timing.get("seconds"), bool)
+            for name, timing in callbacks.items()
+        )
+    ):
+        raise ValueError("Stats dump 'callbacks' must map names to {\"seconds\": number, \"calls\": integer}")
+    state_names = ["[*]"] + plan.states + ["[*]"]
+    if (stats["states"], stats["events"]) != (len(state_names), len(plan.events)) or (
+        len(stats["counts"]) != len(state_names) * len(plan.events)
+    ):
+        raise ValueError(
+            f"Stats were recorded for a machine with {stats['states']} states and {stats['events']} events; "
+            f"the model has {len(state_names)} and {len(plan.events)}"
+        )
+    return state_names
+
+
+def _is_count(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def load_branch_profile(model: Model, data: bytes) -> Dict[Tuple[str, str], int]:
+    """Dispatch counts per (state, event) from a ``--counters`` stats dump or a
+    ``--trace binary`` dump of a machine generated from ``model``."""
+    counts: Dict[Tuple[str, str], int] = {}
+    if data[:len(TRACE_MAGIC)] == TRACE_MAGIC:
+        for entry in decode_trace(model, data).entries:
+            counts[(entry.state, entry.event)] = counts.get((entry.state, entry.event), 0) + 1
+        return counts
+    try:
+        stats = json.loads(data)
+    except ValueError:
+        raise ValueError("Branch profile is neither a stats() JSON dump nor a --trace binary dump") from None
+    plan = build_machine_plan(model)
+    state_names = stats_state_names(plan, stats)
+    event_count = len(plan.events)
+    for cell, count in enumerate(stats["counts"]):
+        if count:
+            counts[(state_names[cell // event_count], plan.events[cell % event_count])] = count
+    return counts
+
+
+def format_stats_report(model: Model, stats: dict, limit: int = 10) -> str:
+    """Join a ``--counters`` stats() dump with the model: hottest (state, event)
+    pairs with the transitions they resolve to, then the most expensive
+    callbacks when the dump has timings (Python machines)."""
+    plan = build_machine_plan(model)
+    state_names = stats_state_names(plan, stats)
+    counts = stats["counts"]
+    event_plans = {
+        (state, ep.event): ep.branches for state, plans in plan.state_events.items() for ep in plans
+    }
+    total = sum(counts) or 1
+    hottest = sorted((c for c in range(len(counts)) if counts[c]), key=lambda c: -counts[c])[:limit]
+    lines = [f"{sum(counts)} dispatches", "", f"{'count':>10} {'share':>7}  state : event -> transitions"]
+    for cell in hottest:
+        state = state_names[cell // len(plan.events)]
+        event = plan.events[cell % len(plan.events)]
+        branches = event_plans.get((state, event), [])
+        targets = "; ".join(transition_label(b.transition) for b in branches) or "(ignored)"
+        lines.append(f"{counts[cell]:>10} {100.0 * counts[cell] / total:>6.1f}%  {state} : {event} -> {targets}")
+
+    callbacks = stats.get("callbacks") or {}
+    if callbacks:
+        lines.append("")
+        lines.append(f"{'total ms':>10} {'calls':>9} {'mean us':>9}  callback")
+        ranked = sorted(callbacks.items(), key=lambda item: -item[1]["seconds"])[:limit]
+        for name, timing in ranked:
+            mean = 1e6 * timing["seconds"] / timing["calls"] if timing["calls"] else 0.0
+            lines.append(f"{1e3 * timing['seconds']:>10.3f} {timing['calls']:>9} {mean:>9.2f}  {name}")
+    return "\n".join(lines)
+
+
+class GenerationTiming:
+    def __init__(self, input_path: Path):
+        self.input_path = input_path
+        self.parse = 0.0
+        self.languages: Dict[str, float] = {}
+        self.cached: Set[str] = set()
+        self.sizes: Dict[str, int] = {}
+        self.total = 0.0
+        self.error: Optional[str] = None
+
+
+def output_extension(language: str) -> str:
+    if language == FLEET_LANGUAGE:
+        return FLEET_EXTENSION
+    if language not in LANGUAGE_SPECS:
+        raise ValueError(
+            f"Unsupported language '{language}'. Available: "
+            f"{', '.join(sorted([*LANGUAGE_SPECS.keys(), FLEET_LANGUAGE]))}"
+        )
+    return LANGUAGE_SPECS[language].extension
+
+
+def collect_models(patterns: List[str], manifest: Optional[Path] = None) -> List[Path]:
+    entries: List[Tuple[str, Path]] = [(pattern, Path.cwd()) for pattern in patterns]
+    if manifest is not None:
+        for line in manifest.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                entries.append((line, manifest.parent))
+    models: List[Path] = []
+    seen: Set[Path] = set()
+    for pattern, base in entries:
+        full = pattern if os.path.isabs(pattern) else str(base / pattern)
+        matches = sorted(glob.glob(full, recursive=True)) if glob.has_magic(full) else [full]
+        if not matches:
+            raise ValueError(f"No models match '{pattern}'")
+        for match in matches:
+            path = Path(match)
+            if not path.is_file():
+                raise ValueError(f"Model file not found: {match}")
+            resolved = path.resolve()
+            if resolved not in seen:
+                seen.add(resolved)
+                models.append(path)
+    if not models:
+        raise ValueError("No models given; pass -i and/or --manifest")
+    return models
+
+
+def plan_batch_outputs(
+    models: List[Path], languages: List[str], output_pattern: str
+) -> List[Tuple[Path, List[Tuple[str, Path]]]]:
+    jobs = []
+    claimed: Set[Path] = set()
+    for model_path in models:
+        targets = []
+        for language in languages:
+            fields = {
+                "dir": str(model_path.parent),
+                "stem": model_path.stem,
+                "language": language,
+                "ext": output_extension(language),
+            }
+            try:
+                output_path = Path(output_pattern.format(**fields))
+            except (KeyError, IndexError) as err:
+                raise ValueError(
+                    f"Unknown field {err} in output pattern; use {{dir}}, {{stem}}, {{language}}, {{ext}}"
+                ) from None
+            if output_path.resolve() in claimed:
+                raise ValueError(f"Output pattern maps several targets onto {output_path}")
+            claimed.add(output_path.resolve())
+            targets.append((language, output_path))
+        jobs.append((model_path, targets))
+    return jobs
+
+
+def _generate_batch_job(
+    input_path: Path,
+    targets: List[Tuple[str, Path]],
+    options: CodegenOptions,
+    cache: Optional[GenerationCache],
+) -> GenerationTiming:
+    try:
+        for _, output_path in targets:
+            ensure_dir(output_path.parent)
+        return generate_outputs(input_path, targets, None, options, cache)
+    except (ParseError, ValueError, OSError) as err:
+        timing = GenerationTiming(input_path)
+        timing.error = str(err)
+        return timing
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def batch_workers(jobs: Optional[int], model_count: int) -> int:
+    return max(1, min(jobs or available_cpus(), model_count))
+
+
+def generate_all(
+    models: List[Path],
+    languages: List[str],
+    output_pattern: str,
+    options: Optional[CodegenOptions] = None,
+    cache: Optional[GenerationCache] = None,
+    jobs: Optional[int] = None,
+) -> List[GenerationTiming]:
+    options = options or CodegenOptions()
+    batch = plan_batch_outputs(models, languages, output_pattern)
+    workers = batch_workers(jobs, len(batch))
+    if workers <= 1:
+        results = [_generate_batch_job(path, targets, options, cache) for path, targets in batch]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_generate_batch_job, path, targets, options, cache)
+                for path, targets in batch
+            ]
+            results = [future.result() for future in futures]
+    if cache is not None:
+        cache.evict()
+    return results
+
+
+def format_timing_summary(results: List[GenerationTiming], languages: List[str], wall: float, workers: int) -> str:
+    name_width = max([len("model")] + [len(str(r.input_path)) for r in results])
+    columns = ["parse", *languages, "total"]
+    widths = [max(len(column), 9) for column in columns]
+    header = "  ".join([f"{'model':<{name_width}}", *(f"{c:>{w}}" for c, w in zip(columns, widths))])
+    lines = [header, "-" * len(header)]
+    for result in results:
+        if result.error is not None:
+            lines.append(f"{str(result.input_path):<{name_width}}  error: {result.error}")
+            continue
+        cells = [f"{result.parse * 1000:.1f}ms"]
+        for language in languages:
+            marker = "*" if language in result.cached else ""
+            cells.append(f"{marker}{result.languages[language] * 1000:.1f}ms")
+        cells.append(f"{result.total * 1000:.1f}ms")
+        lines.append("  ".join([f"{str(result.input_path):<{name_width}}", *(f"{c:>{w}}" for c, w in zip(cells, widths))]))
+    failed = sum(1 for result in results if result.error is not None)
+    lines.append("-" * len(header))
+    lines.append(
+        f"{len(results)} model(s), {len(languages)} language(s), {failed} failed, "
+        f"{workers} worker(s), {wall * 1000:.1f}ms wall (* = cache hit)"
+    )
+    return "\n".join(lines)
+
 
 def simulate(
     input_path: Path,
     simulation_dir: Path,
     machine_name: Optional[str] = None,
     plantuml_cmd: str = "plantuml",
+    render_cache_bytes: int = DEFAULT_RENDER_CACHE_BYTES,
+    prerender: bool = False,
+    diagram_format: str = "png",
 ) -> None:
+    """Write a NiceGUI simulator for ``input_path`` into ``simulation_dir``.
+
+    The simulator keeps rendered diagrams in a memory cache of up to
+    ``render_cache_bytes``; with ``prerender`` it renders the highlight of
+    every leaf state in the background when it starts. With
+    ``diagram_format="svg"`` the model is laid out once and highlights are
+    applied to the SVG, falling back to PNG if that does not work.
+    """
+    if diagram_format not in SIMULATOR_DIAGRAM_FORMATS:
+        raise ValueError(f"Unknown diagram format '{diagram_format}'. Available: {', '.join(SIMULATOR_DIAGRAM_FORMATS)}")
     model = parse_puml(input_path)
     namespace_base = generate_namespace_base(input_path)
     type_prefix = generate_type_prefix(input_path)
@@ -1183,22 +2665,38 @@ def simulate(
     event_names = [sanitize(ev) for ev in sorted(model.events)]
 
     module_alias = f"statesurf_sim_{sanitize(type_prefix).lower()}"
+    leaf_states = [
+        normalize_identifier(name)
+        for name, node in model.nodes.items()
+        if node is not model.root and not node.children
+    ]
 
-    simulator_code = render_template(
-        "python/simulator_app.py.j2",
-        machine_module="machine",
-        machine_module_alias=module_alias,
-        machine_module_filename="machine.py",
-        type_prefix=type_prefix,
-        machine_name=effective_machine_name,
-        event_names=event_names,
-        puml_filename=input_path.name,
-        plantuml_cmd=plantuml_cmd,
-    )
+    with profile_phase("simulator app"):
+        simulator_code = render_template(
+            "python/simulator_app.py.j2",
+            machine_module="machine",
+            machine_module_alias=module_alias,
+            machine_module_filename="machine.py",
+            type_prefix=type_prefix,
+            machine_name=effective_machine_name,
+            event_names=event_names,
+            puml_filename=input_path.name,
+            plantuml_cmd=plantuml_cmd,
+            render_cache_bytes=render_cache_bytes,
+            prerender_states=leaf_states if prerender else [],
+            diagram_format=diagram_format,
+        )
+        render_code = render_template("python/simulator_render.py.j2")
     simulator_path = simulation_dir / "simulator.py"
     simulator_path.write_text(simulator_code, encoding="utf-8")
+    (simulation_dir / SIMULATOR_RENDER_MODULE).write_text(render_code, encoding="utf-8")
+    profile_count("emitted lines", simulator_code.count("\n") + render_code.count("\n"))
 
-    sim_venv_dir = simulation_dir / ".venv"
+    with profile_phase("venv"):
+        bootstrap_simulator_venv(simulation_dir / ".venv")
+
+
+def bootstrap_simulator_venv(sim_venv_dir: Path) -> None:
     marker = sim_venv_dir / ".statesurf_bootstrap"
     if not sim_venv_dir.exists():
         venv.create(str(sim_venv_dir), with_pip=True)
@@ -1228,7 +2726,7 @@ def main(argv):
     sub = ap.add_subparsers(dest="cmd")
 
     g = sub.add_parser("generate")
-    g.add_argument("-i", "--input", required=True)
+    g.add_argument("-i", "--input", required=True, help="Model file, or - to read it from stdin")
     g.add_argument("-o", "--output", required=True)
     g.add_argument(
         "-n",
@@ -1236,7 +2734,85 @@ def main(argv):
         default=None,
         help="Optional machine class name (defaults to <puml_file_name>Machine)",
     )
-    g.add_argument("-l", "--language", default="cpp")
+    g.add_argument(
+        "-l",
+        "--language",
+        default="cpp",
+        help="cpp, rust, python, or python-fleet (NumPy engine that steps many instances at once)",
+    )
+    g.add_argument(
+        "--dispatch",
+        choices=DISPATCH_MODES,
+        default="switch",
+        help="Dispatch shape: nested if/switch chains, or a (state, event) handler table (python) / constexpr tables walked by a small interpreter (cpp)",
+    )
+    g.add_argument(
+        "--enums",
+        choices=ENUM_STYLES,
+        default="str",
+        help="Python enum representation: string-valued Enum or IntEnum with a __slots__ machine (python only)",
+    )
+    g.add_argument(
+        "--optimize",
+        choices=OPTIMIZE_MODES,
+        default="speed",
+        help="size: emit transition bodies shared by several (state, event) pairs once and call them",
+    )
+    g.add_argument(
+        "--trace",
+        choices=TRACE_MODES,
+        default="hooks",
+        help=(
+            "hooks: call on_event/on_transition; ring: record transitions in a fixed-size buffer; "
+            "binary: record packed per-dispatch records for decode-trace; none: no tracing code"
+        ),
+    )
+    g.add_argument(
+        "--trace-capacity",
+        type=int,
+        default=DEFAULT_TRACE_CAPACITY,
+        help=f"Buffer size for --trace ring/binary, a power of two (default: {DEFAULT_TRACE_CAPACITY})",
+    )
+    g.add_argument(
+        "--counters",
+        action="store_true",
+        help="Count dispatches per (state, event) (and time callbacks in Python); read them with stats()",
+    )
+    g.add_argument(
+        "--branch-profile",
+        default=None,
+        help=(
+            "stats() JSON (--counters) or trace dump (--trace binary) of a machine generated from the same "
+            "model; orders dispatch branches hottest first"
+        ),
+    )
+    g.add_argument(
+        "--cache-dir",
+        default=None,
+        help=f"Cache directory for parsed models and rendered output (defaults to ${CACHE_DIR_ENV} or ~/.cache/statesurf)",
+    )
+    g.add_argument("--no-cache", action="store_true", help="Neither read nor write the generation cache")
+    add_profile_arguments(g)
+
+    ga = sub.add_parser("generate-all", help="Generate several models and languages in one process pool")
+    ga.add_argument("-i", "--input", nargs="*", default=[], help="Model paths or glob patterns (quote globs)")
+    ga.add_argument("--manifest", default=None, help="File listing one model path or glob per line")
+    ga.add_argument("-l", "--languages", nargs="+", default=["cpp", "rust", "python"])
+    ga.add_argument(
+        "-o",
+        "--output",
+        default="{dir}/{stem}{ext}",
+        help="Output path pattern with {dir}, {stem}, {language} and {ext} fields (default: {dir}/{stem}{ext})",
+    )
+    ga.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (defaults to available cores)")
+    ga.add_argument("--dispatch", choices=DISPATCH_MODES, default="switch")
+    ga.add_argument("--enums", choices=ENUM_STYLES, default="str")
+    ga.add_argument("--optimize", choices=OPTIMIZE_MODES, default="speed")
+    ga.add_argument("--trace", choices=TRACE_MODES, default="hooks")
+    ga.add_argument("--trace-capacity", type=int, default=DEFAULT_TRACE_CAPACITY)
+    ga.add_argument("--counters", action="store_true")
+    ga.add_argument("--cache-dir", default=None)
+    ga.add_argument("--no-cache", action="store_true")
 
     s = sub.add_parser("simulate")
     s.add_argument("-i", "--input", required=True)
@@ -1252,32 +2828,216 @@ def main(argv):
         default="plantuml",
         help="Path to the PlantUML CLI executable (defaults to 'plantuml')",
     )
+    s.add_argument(
+        "--render-cache-mb",
+        type=float,
+        default=DEFAULT_RENDER_CACHE_BYTES / (1 << 20),
+        help="Memory for rendered diagrams in the simulator, in MiB (default: %(default)g)",
+    )
+    s.add_argument(
+        "--prerender",
+        action="store_true",
+        help="Render every leaf-state highlight in the background when the simulator starts",
+    )
+    s.add_argument(
+        "--diagram",
+        choices=SIMULATOR_DIAGRAM_FORMATS,
+        default="png",
+        help="png re-renders the highlighted model per step; svg lays it out once and recolors states in place",
+    )
+    add_profile_arguments(s)
 
     v = sub.add_parser("validate")
-    v.add_argument("-i", "--input", required=True)
+    v.add_argument("-i", "--input", required=True, help="Model file, or - to read it from stdin")
+    add_profile_arguments(v)
+
+    d = sub.add_parser("decode-trace", help="Decode a --trace binary dump with the model it was generated from")
+    d.add_argument("-i", "--input", required=True, help="Model file the machine was generated from")
+    d.add_argument("dump", help="Binary trace dump, or - to read it from stdin")
+    d.add_argument("-n", "--limit", type=int, default=None, help="Only print the last N records")
+
+    r = sub.add_parser("report", help="Summarize a --counters stats() dump against the model")
+    r.add_argument("-i", "--input", required=True, help="Model file the machine was generated from")
+    r.add_argument("stats", help="JSON written by stats()/write_stats(), or - to read it from stdin")
+    r.add_argument("-n", "--limit", type=int, default=10, help="Rows per section (default: 10)")
+
+    sy = sub.add_parser("synthesize", help="Write a random but valid model of a given shape, for scaling tests")
+    sy.add_argument("-o", "--output", default=STDIN_INPUT, help="Model file to write, or - for stdout (default)")
+    sy.add_argument("--seed", type=int, default=0, help="Same seed and shape, same model (default: 0)")
+    synth_defaults = ModelShape()
+    for flag, kind, help_text in (
+        ("states", int, "Total number of states"),
+        ("depth", int, "Maximum nesting depth"),
+        ("branching", int, "Children per composite state"),
+        ("events", int, "Number of distinct events"),
+        ("transitions", int, "External transitions per state"),
+        ("guard_ratio", float, "Share of transitions with a guard"),
+        ("action_ratio", float, "Share of transitions with an action"),
+        ("guard_reuse", float, "Chance a guard reuses an existing name instead of a new one"),
+        ("action_reuse", float, "Chance an action reuses an existing name instead of a new one"),
+        ("entry_exit_ratio", float, "Share of states with entry/exit actions"),
+        ("internal_ratio", float, "Share of states with an internal transition"),
+        ("deep_initial_ratio", float, "Share of composites whose initial transition targets a nested leaf"),
+        ("final_ratio", float, "Share of states with a transition to the final state"),
+    ):
+        default = getattr(synth_defaults, flag)
+        sy.add_argument(
+            "--" + flag.replace("_", "-"), type=kind, default=default, help=f"{help_text} (default: {default})"
+        )
 
     args = ap.parse_args(argv)
+    if not getattr(args, "profile", False) and not getattr(args, "profile_dump", None):
+        return run_command(ap, args)
+    profiler = PhaseProfiler() if args.profile else None
+    stats = cProfile.Profile() if args.profile_dump else None
+    configure_profiler(profiler)
+    try:
+        if stats is not None:
+            stats.enable()
+        with profile_phase(args.cmd):
+            return run_command(ap, args)
+    finally:
+        configure_profiler(None)
+        if stats is not None:
+            stats.disable()
+            stats.dump_stats(args.profile_dump)
+        if profiler is not None:
+            print(profiler.report(), file=sys.stderr)
+
+
+def add_profile_arguments(parser) -> None:
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print wall time and peak memory per phase (parse, plan, bodies, render, ...) to stderr",
+    )
+    parser.add_argument(
+        "--profile-dump", default=None, help="Write cProfile statistics for the whole run to this file (pstats format)"
+    )
+
+
+def run_command(ap, args) -> int:
     try:
         if args.cmd == "generate":
-            generate(Path(args.input), Path(args.output), args.name, args.language.lower())
+            options = CodegenOptions(
+                dispatch=args.dispatch,
+                enums=args.enums,
+                optimize=args.optimize,
+                trace=args.trace,
+                trace_capacity=args.trace_capacity,
+                counters=args.counters,
+                branch_profile=Path(args.branch_profile).read_bytes() if args.branch_profile else None,
+            )
+            cache = None if args.no_cache else GenerationCache(args.cache_dir)
+            configure_template_cache(cache.root / "jinja" if cache is not None else None)
+            language = args.language.lower()
+            output_path = Path(args.output)
+            if args.input == STDIN_INPUT:
+                model, code = generate_stream(sys.stdin.buffer, output_path, args.name, language, options)
+                size = len(code.encode("utf-8"))
+                names_from = output_path
+            else:
+                timing = generate(Path(args.input), output_path, args.name, language, options, cache)
+                model = None
+                size = timing.sizes[language]
+                names_from = Path(args.input)
+            if options.optimize == "size" and language != FLEET_LANGUAGE:
+                if model is None:
+                    model = load_model(Path(args.input), cache)
+                print(
+                    size_report(
+                        model,
+                        output_path,
+                        size,
+                        args.name,
+                        generate_namespace_base(names_from),
+                        generate_type_prefix(names_from),
+                        language,
+                        options,
+                    )
+                )
+            if cache is not None:
+                cache.evict()
             return 0
+        elif args.cmd == "generate-all":
+            options = CodegenOptions(
+                dispatch=args.dispatch,
+                enums=args.enums,
+                optimize=args.optimize,
+                trace=args.trace,
+                trace_capacity=args.trace_capacity,
+                counters=args.counters,
+            )
+            cache = None if args.no_cache else GenerationCache(args.cache_dir)
+            configure_template_cache(cache.root / "jinja" if cache is not None else None)
+            models = collect_models(args.input, Path(args.manifest) if args.manifest else None)
+            languages = [language.lower() for language in args.languages]
+            started = time.perf_counter()
+            results = generate_all(models, languages, args.output, options, cache, args.jobs)
+            wall = time.perf_counter() - started
+            print(format_timing_summary(results, languages, wall, batch_workers(args.jobs, len(models))))
+            return 1 if any(result.error is not None for result in results) else 0
         elif args.cmd == "simulate":
+            if args.input == STDIN_INPUT:
+                raise ValueError("simulate needs a model file; it cannot read the model from stdin")
             simulate(
                 Path(args.input),
                 Path(args.sim_dir),
                 machine_name=args.name,
                 plantuml_cmd=args.plantuml,
+                render_cache_bytes=int(args.render_cache_mb * (1 << 20)),
+                prerender=args.prerender,
+                diagram_format=args.diagram,
             )
             print("Simulator assets generated.")
             return 0
         elif args.cmd == "validate":
-            parse_puml(Path(args.input))
+            if args.input == STDIN_INPUT:
+                parse_puml_stream(sys.stdin.buffer)
+            else:
+                parse_puml(Path(args.input))
             print("OK")
             return 0
+        elif args.cmd == "decode-trace":
+            data = sys.stdin.buffer.read() if args.dump == STDIN_INPUT else Path(args.dump).read_bytes()
+            print(format_trace(decode_trace(parse_puml(Path(args.input)), data), args.limit))
+            return 0
+        elif args.cmd == "report":
+            text = sys.stdin.read() if args.stats == STDIN_INPUT else Path(args.stats).read_text(encoding="utf-8")
+            print(format_stats_report(parse_puml(Path(args.input)), json.loads(text), args.limit))
+            return 0
+        elif args.cmd == "synthesize":
+            shape = ModelShape(
+                states=args.states,
+                depth=args.depth,
+                branching=args.branching,
+                events=args.events,
+                transitions=args.transitions,
+                guard_ratio=args.guard_ratio,
+                action_ratio=args.action_ratio,
+                guard_reuse=args.guard_reuse,
+                action_reuse=args.action_reuse,
+                entry_exit_ratio=args.entry_exit_ratio,
+                internal_ratio=args.internal_ratio,
+                deep_initial_ratio=args.deep_initial_ratio,
+                final_ratio=args.final_ratio,
+            )
+            lines = synthesize_puml(shape, args.seed)
+            if args.output == STDIN_INPUT:
+                for line in lines:
+                    sys.stdout.write(line + "\n")
+            else:
+                with open(args.output, "w", encoding="utf-8") as out:
+                    count = 0
+                    for line in lines:
+                        out.write(line + "\n")
+                        count += 1
+                print(f"{args.output}: {count} lines, {shape.states} states")
+            return 0
         else:
             ap.print_help()
             return 1
-    except ParseError as err:
+    except (ParseError, ValueError) as err:
         print(f"Error: {err}", file=sys.stderr)
         return 1
 
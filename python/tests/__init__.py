@@ -0,0 +1,10 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# CLI runs under test must not write the generation or template cache into the
+# user's home directory; tests that exercise the cache pass --cache-dir.
+_CACHE_DIR = tempfile.mkdtemp(prefix="statesurf-test-cache-")
+os.environ["STATESURF_CACHE_DIR"] = _CACHE_DIR
+atexit.register(shutil.rmtree, _CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,327 @@
+import importlib.util
+import os
+import random
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+from python import statesurf
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+HSM_MODEL = REPO_ROOT / "plantuml" / "hsm.puml"
+
+
+def load_python_machine(
+    model_path: Path = HSM_MODEL,
+    options: Optional["statesurf.CodegenOptions"] = None,
+    module_name: str = "statesurf_test_machine",
+) -> ModuleType:
+    model = statesurf.parse_puml(model_path)
+    namespace_base = statesurf.generate_namespace_base(model_path)
+    type_prefix = statesurf.generate_type_prefix(model_path)
+    code = statesurf.gen_code(
+        model, f"{type_prefix}Machine", "python", namespace_base, type_prefix, options
+    )
+    with TemporaryDirectory() as tmp:
+        module_path = Path(tmp) / f"{module_name}.py"
+        module_path.write_text(code, encoding="utf-8")
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+class ScriptedCallbacks:
+    """Records every callback by name and answers guards from a seeded RNG."""
+
+    def __init__(self, seed: int) -> None:
+        self.log: List[Tuple[str, ...]] = []
+        self._rng = random.Random(seed)
+
+    def on_entry(self, state) -> None:
+        self.log.append(("entry", state.name))
+
+    def on_exit(self, state) -> None:
+        self.log.append(("exit", state.name))
+
+    def guard(self, state, event, guard) -> bool:
+        decision = self._rng.random() < 0.5
+        self.log.append(("guard", state.name, event.name, guard.name, str(decision)))
+        return decision
+
+    def action(self, state, event, action) -> None:
+        self.log.append(("action", state.name, event.name, action.name))
+
+
+def drive(
+    module: ModuleType, type_prefix: str, seed: int, steps: int, batch: int = 1
+) -> List[Tuple[str, ...]]:
+    """Dispatch a seeded random event stream and return the callback/state log.
+
+    With ``batch > 1`` the stream is fed through ``dispatch_many`` in chunks.
+    """
+    machine_cls = getattr(module, f"{type_prefix}Machine")
+    event_cls = getattr(module, f"{type_prefix}Event")
+    callbacks_cls = getattr(module, f"{type_prefix}Callbacks")
+    callbacks = type("Recorder", (ScriptedCallbacks, callbacks_cls), {})(seed)
+    machine = machine_cls(callbacks)
+    events = list(event_cls)
+    rng = random.Random(seed * 7919 + 1)
+    stream = [rng.choice(events) for _ in range(steps)]
+    while stream:
+        if batch > 1:
+            consumed = machine.dispatch_many(stream[:batch])
+        else:
+            machine.dispatch(stream[0])
+            consumed = 1
+        # A terminated machine consumes nothing, so always make progress.
+        stream = stream[max(consumed, 1):]
+        callbacks.log.append(("state", machine.state().name, str(machine.terminated())))
+        if machine.terminated():
+            machine.reset()
+    return callbacks.log
+
+
+def record_run(module: ModuleType, seed: int, steps: int):
+    """Drive an Hsm machine and return it with (state, event, dst, guards) per dispatch."""
+    callbacks = type("Recorder", (ScriptedCallbacks, module.HsmCallbacks), {})(seed)
+    machine = module.HsmMachine(callbacks)
+    rng = random.Random(seed)
+    events = list(module.HsmEvent)
+    expected = []
+    for _ in range(steps):
+        event = rng.choice(events)
+        machine.start()
+        state = machine.state()
+        logged = len(callbacks.log)
+        machine.dispatch(event)
+        guards = [(entry[3], entry[4] == "True") for entry in callbacks.log[logged:] if entry[0] == "guard"]
+        expected.append((state.name, event.name, machine.state().name, guards))
+        if machine.terminated():
+            machine.reset()
+    return machine, expected
+
+
+# Native drivers: dispatch a seeded xorshift event stream into a generated machine
+# (type prefix "P") and print every callback and the state after each dispatch.
+# Guards flip a second xorshift stream, so C++ and Rust runs of one model agree.
+CPP_DRIVER = """\
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <fstream>
+
+#include "machine.hpp"
+
+namespace {
+
+std::uint64_t next(std::uint64_t& x) {
+  x ^= x << 13;
+  x ^= x >> 7;
+  x ^= x << 17;
+  return x;
+}
+
+struct Callbacks {
+  std::uint64_t rng;
+  std::uint64_t sink;
+
+  void on_entry(PState s) {
+    std::printf("entry %d\\n", static_cast<int>(s));
+    sink += static_cast<std::uint64_t>(s);
+  }
+  void on_exit(PState s) {
+    std::printf("exit %d\\n", static_cast<int>(s));
+    sink += static_cast<std::uint64_t>(s) << 1;
+  }
+  bool guard(PState s, PEvent e, PGuardId g) {
+    const bool decision = (next(rng) & 1) != 0;
+    std::printf("guard %d %d %d %d\\n", static_cast<int>(s), static_cast<int>(e), static_cast<int>(g),
+                decision ? 1 : 0);
+    return decision;
+  }
+  void action(PState s, PEvent e, PActionId a) {
+    std::printf("action %d %d %d\\n", static_cast<int>(s), static_cast<int>(e), static_cast<int>(a));
+    sink += static_cast<std::uint64_t>(a);
+  }
+  std::uint64_t trace_clock() const { return sink; }
+};
+
+}  // namespace
+
+int main(int, char** argv) {
+  const std::size_t steps = std::strtoull(argv[1], nullptr, 10);
+  std::uint64_t seed = 0x9E3779B97F4A7C15ull;
+  Callbacks callbacks{0x2545F4914F6CDD1Dull, 0};
+  PMachine<Callbacks> machine(callbacks);
+  for (std::size_t i = 0; i < steps; ++i) {
+    machine.dispatch(static_cast<PEvent>(next(seed) % EVENT_COUNT));
+    std::printf("state %d\\n", static_cast<int>(machine.state()));
+    if (machine.terminated()) machine.reset();
+  }
+#ifdef TRACE_DUMP
+  static std::uint8_t dump[PMachine<Callbacks>::kTraceDumpSize];
+  const std::size_t size = machine.trace_dump(dump, sizeof dump);
+  std::FILE* out = std::fopen("trace.bin", "wb");
+  std::fwrite(dump, 1, size, out);
+  std::fclose(out);
+#endif
+#ifdef STATS_DUMP
+  std::ofstream stats("stats.json");
+  machine.write_stats(stats);
+#endif
+  return 0;
+}
+"""
+
+RUST_DRIVER = """\
+#![allow(dead_code)]
+include!("machine.rs");
+
+use bench::*;
+
+fn next(x: &mut u64) -> u64 {
+    *x ^= *x << 13;
+    *x ^= *x >> 7;
+    *x ^= *x << 17;
+    *x
+}
+
+const EVENTS: [PEvent; EVENT_COUNT] = [EVENT_LIST];
+
+struct Callbacks {
+    rng: u64,
+    sink: u64,
+}
+
+impl PCallbacks for Callbacks {
+    fn on_entry(&mut self, state: PState) {
+        println!("entry {:?}", state);
+        self.sink += state as u64;
+    }
+
+    fn on_exit(&mut self, state: PState) {
+        println!("exit {:?}", state);
+        self.sink += (state as u64) << 1;
+    }
+
+    fn guard(&mut self, state: PState, event: PEvent, guard: PGuardId) -> bool {
+        let decision = next(&mut self.rng) & 1 == 1;
+        println!("guard {:?} {:?} {:?} {}", state, event, guard, decision);
+        decision
+    }
+
+    fn action(&mut self, state: PState, event: PEvent, action: PActionId) {
+        println!("action {:?} {:?} {:?}", state, event, action);
+        self.sink += action as u64;
+    }
+
+    #[cfg(trace_dump)]
+    fn trace_clock(&mut self) -> u64 {
+        self.sink
+    }
+}
+
+fn main() {
+    let steps: usize = std::env::args().nth(1).unwrap().parse().unwrap();
+    let mut seed = 0x9E37_79B9_7F4A_7C15u64;
+    let mut machine = PMachine::new(Callbacks { rng: 0x2545_F491_4F6C_DD1D, sink: 0 });
+    for _ in 0..steps {
+        machine.dispatch(EVENTS[(next(&mut seed) % EVENT_COUNT as u64) as usize]);
+        println!("state {:?}", machine.state());
+        if machine.terminated() {
+            machine.reset();
+        }
+    }
+    #[cfg(trace_dump)]
+    {
+        let mut dump = [0u8; TRACE_DUMP_SIZE];
+        let size = machine.trace().dump(&mut dump);
+        std::fs::write("trace.bin", &dump[..size]).unwrap();
+    }
+    #[cfg(stats_dump)]
+    {
+        let mut stats = String::new();
+        machine.write_stats(&mut stats).unwrap();
+        std::fs::write("stats.json", stats).unwrap();
+    }
+}
+"""
+
+DRIVER_FILES = ("trace.bin", "stats.json")
+
+
+def cpp_compiler() -> Optional[str]:
+    return os.environ.get("CXX") or shutil.which("g++") or shutil.which("clang++")
+
+
+def rust_compiler() -> Optional[str]:
+    return os.environ.get("RUSTC") or shutil.which("rustc")
+
+
+def _build_cpp_driver(directory: Path, model: "statesurf.Model", options: "statesurf.CodegenOptions") -> Path:
+    header = statesurf.gen_code(model, "PMachine", "cpp", "bench", "P", options)
+    (directory / "machine.hpp").write_text(header, encoding="utf-8")
+    (directory / "driver.cpp").write_text(CPP_DRIVER, encoding="utf-8")
+    binary = directory / "driver"
+    subprocess.run(
+        [
+            cpp_compiler(), "-std=c++11", "-O1", "-Wall", "-Wextra", "-Werror",
+            f"-DEVENT_COUNT={max(len(model.events), 1)}", "-I", str(directory),
+            *(["-DTRACE_DUMP"] if options.trace == "binary" else []),
+            *(["-DSTATS_DUMP"] if options.counters else []),
+            str(directory / "driver.cpp"), "-o", str(binary),
+        ],
+        check=True,
+    )
+    return binary
+
+
+def _build_rust_driver(directory: Path, model: "statesurf.Model", options: "statesurf.CodegenOptions") -> Path:
+    code = statesurf.gen_code(model, "PMachine", "rust", "bench", "P", options)
+    (directory / "machine.rs").write_text(code, encoding="utf-8")
+    events = [statesurf.normalize_identifier(e) for e in sorted(model.events)] or ["__None"]
+    driver = RUST_DRIVER.replace("EVENT_COUNT", str(len(events))).replace(
+        "EVENT_LIST", ", ".join(f"PEvent::{e}" for e in events)
+    )
+    (directory / "driver.rs").write_text(driver, encoding="utf-8")
+    binary = directory / "driver"
+    subprocess.run(
+        [
+            rust_compiler(), "--edition", "2021", "-C", "opt-level=1", "-D", "warnings", "-o", str(binary),
+            *(["--cfg", "trace_dump"] if options.trace == "binary" else []),
+            *(["--cfg", "stats_dump"] if options.counters else []),
+            str(directory / "driver.rs"),
+        ],
+        check=True,
+        cwd=directory,
+    )
+    return binary
+
+
+def native_trace_artifacts(
+    language: str, model: "statesurf.Model", options: "statesurf.CodegenOptions", steps: int
+) -> Tuple[str, Dict[str, bytes]]:
+    """Compile ``model`` for ``language`` ("cpp" or "rust") into a driver and run it.
+
+    Returns the callback trace, plus the files the driver wrote: the trace dump
+    as trace.bin for --trace binary and the write_stats() output as stats.json
+    for --counters.
+    """
+    build = _build_cpp_driver if language == "cpp" else _build_rust_driver
+    with TemporaryDirectory() as tmp:
+        binary = build(Path(tmp), model, options)
+        out = subprocess.run(
+            [str(binary), str(steps)], check=True, capture_output=True, text=True, cwd=tmp
+        ).stdout
+        files = {name: (Path(tmp) / name).read_bytes() for name in DRIVER_FILES if (Path(tmp) / name).exists()}
+    return out, files
+
+
+def native_trace(language: str, model: "statesurf.Model", options: "statesurf.CodegenOptions", steps: int) -> str:
+    return native_trace_artifacts(language, model, options, steps)[0]
@@ -0,0 +1,50 @@
+import argparse
+import contextlib
+import io
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from python.benchmarks import bench_suite
+
+
+class BenchSuiteTest(unittest.TestCase):
+    def test_shapes_control_the_synthesized_model(self) -> None:
+        shape = bench_suite.parse_shape("states=20,depth=4,events=6,guards=0")
+        self.assertEqual(bench_suite.shape_name(shape), "s20-d4-e6-g0")
+        model = bench_suite.shape_model(shape, seed=1)
+        self.assertFalse(any(t.guard for t in model.transitions))
+        self.assertEqual(max(node.depth for node in model.nodes.values()), 4)
+        self.assertLessEqual(len(model.events), 7)
+        guarded = bench_suite.shape_model(bench_suite.parse_shape("states=20,guards=1"), seed=1)
+        self.assertTrue(all(t.guard for t in guarded.transitions if not t.internal and t.dst is not None))
+        for text in ("states=0", "colour=red", "guards=2", "depth=x"):
+            with self.subTest(shape=text), self.assertRaises(argparse.ArgumentTypeError):
+                bench_suite.parse_shape(text)
+
+    def test_json_report_and_baseline(self) -> None:
+        args = ["--shape", "states=10,events=4", "-l", "python", "--python-steps", "200", "-r", "1"]
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bench.json"
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(bench_suite.main(args + ["--json", str(path)]), 0)
+            report = json.loads(path.read_text(encoding="utf-8"))
+            self.assertEqual((report["format"], report["version"]), ("statesurf-bench", 1))
+            self.assertEqual(report["environment"]["python_steps"], 200)
+            self.assertEqual([row["dispatch"] for row in report["results"]], ["switch", "table"])
+            for row in report["results"]:
+                self.assertEqual((row["shape"], row["language"]), ("s10-d1-e4-g0.3", "python"))
+                self.assertGreater(row["ns"], 0)
+                self.assertAlmostEqual(row["events_per_sec"], 1e9 / row["ns"])
+                self.assertGreater(row["source_bytes"], 0)
+
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(bench_suite.main(args + ["--baseline", str(path)]), 0)
+        self.assertIn("vs base", stdout.getvalue())
+        self.assertRegex(stdout.getvalue(), r"[+-]\d+\.\d%")
+
+
+if __name__ == "__main__":
+    unittest.main()
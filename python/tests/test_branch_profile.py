@@ -0,0 +1,110 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from python import statesurf
+from python.benchmarks.models import nested_puml
+from python.tests.support import (
+    HSM_MODEL,
+    cpp_compiler,
+    drive,
+    load_python_machine,
+    native_trace,
+    native_trace_artifacts,
+    record_run,
+    rust_compiler,
+)
+
+
+class BranchProfileTest(unittest.TestCase):
+    def stats_profile(self) -> bytes:
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(counters=True), module_name="hsm_profile_counters"
+        )
+        machine, _ = record_run(module, 6, 300)
+        return json.dumps(machine.stats()).encode("utf-8")
+
+    def test_profile_keeps_call_order(self) -> None:
+        reference = load_python_machine(module_name="hsm_profile_reference")
+        binary = load_python_machine(
+            options=statesurf.CodegenOptions(trace="binary", trace_capacity=256), module_name="hsm_profile_binary"
+        )
+        machine, _ = record_run(binary, 7, 200)
+        profiles = {"stats": self.stats_profile(), "trace": machine.trace_dump()}
+        for kind, profile in profiles.items():
+            for dispatch in ("switch", "table"):
+                for enums in ("str", "int"):
+                    module = load_python_machine(
+                        options=statesurf.CodegenOptions(dispatch=dispatch, enums=enums, branch_profile=profile),
+                        module_name=f"hsm_profile_{kind}_{dispatch}_{enums}",
+                    )
+                    with self.subTest(profile=kind, dispatch=dispatch, enums=enums):
+                        self.assertEqual(
+                            drive(module, "Hsm", 8, 300, batch=5), drive(reference, "Hsm", 8, 300, batch=5)
+                        )
+
+    def test_hottest_branches_come_first(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        plan = statesurf.build_machine_plan(model)
+        state_names = ["[*]"] + plan.states + ["[*]"]
+        counts = [0] * (len(state_names) * len(plan.events))
+        counts[state_names.index("s211") * len(plan.events) + plan.events.index("G")] = 9
+        counts[state_names.index("s211") * len(plan.events) + plan.events.index("D")] = 5
+        counts[state_names.index("s11") * len(plan.events) + plan.events.index("H")] = 3
+        stats = {
+            "format": statesurf.STATS_FORMAT,
+            "version": statesurf.STATS_FORMAT_VERSION,
+            "states": len(state_names),
+            "events": len(plan.events),
+            "counts": counts,
+        }
+        options = statesurf.CodegenOptions(branch_profile=json.dumps(stats).encode("utf-8"))
+        code = statesurf.gen_code(model, "HsmMachine", "python", "hsm", "Hsm", options)
+        react = code[code.index("def _react"):]
+        self.assertLess(react.index("HsmState.s211:"), react.index("HsmState.s11:"))
+        self.assertLess(react.index("HsmState.s11:"), react.index("HsmState.s1:"))
+        s211 = react[react.index("HsmState.s211:"):]
+        self.assertIn("if event == HsmEvent.G:", s211.splitlines()[1])
+        self.assertIn("elif event == HsmEvent.D:", s211)
+        # Enum values are unchanged, so profiles stay valid across regenerations.
+        self.assertEqual(
+            code[:code.index("class HsmEvent")],
+            statesurf.gen_code(model, "HsmMachine", "python", "hsm", "Hsm")[:code.index("class HsmEvent")],
+        )
+        cpp = statesurf.gen_code(model, "HsmMachine", "cpp", "hsm", "Hsm", options)
+        self.assertLess(cpp.index("case HsmState::s211:"), cpp.index("case HsmState::s1:"))
+
+    def test_generate_reads_profile_and_rejects_foreign_ones(self) -> None:
+        with TemporaryDirectory() as tmp:
+            profile = Path(tmp) / "stats.json"
+            profile.write_bytes(self.stats_profile())
+            output = Path(tmp) / "hsm.py"
+            args = ["generate", "-i", str(HSM_MODEL), "-o", str(output), "-l", "python", "--no-cache"]
+            self.assertEqual(statesurf.main(args + ["--branch-profile", str(profile)]), 0)
+            self.assertIn("class HsmMachine", output.read_text(encoding="utf-8"))
+        other = statesurf.parse_puml_text(nested_puml(depth=2, width=2))
+        for data in (self.stats_profile(), b"not a profile", b"[]"):
+            with self.assertRaises(ValueError):
+                statesurf.gen_code(
+                    other, "M", "python", "m", "M", statesurf.CodegenOptions(branch_profile=data)
+                )
+
+
+@unittest.skipUnless(cpp_compiler(), "needs a C++ compiler")
+class CppBranchProfileTest(unittest.TestCase):
+    def test_branch_profile_keeps_call_order(self) -> None:
+        model = statesurf.parse_puml_text(nested_puml(depth=6, width=3, seed=4))
+        files = native_trace_artifacts("cpp", model, statesurf.CodegenOptions(counters=True), 500)[1]
+        expected = native_trace("cpp", model, statesurf.CodegenOptions(), 2000)
+        profiled = statesurf.CodegenOptions(branch_profile=files["stats.json"])
+        self.assertEqual(native_trace("cpp", model, profiled, 2000), expected)
+        if rust_compiler():
+            self.assertEqual(
+                native_trace("rust", model, profiled, 2000),
+                native_trace("rust", model, statesurf.CodegenOptions(), 2000),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import contextlib
+import io
+import json
+import random
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from python import statesurf
+from python.benchmarks.models import nested_puml
+from python.tests.support import (
+    HSM_MODEL,
+    ScriptedCallbacks,
+    cpp_compiler,
+    drive,
+    load_python_machine,
+    native_trace_artifacts,
+    rust_compiler,
+)
+
+
+class CountersTest(unittest.TestCase):
+    def test_counters_keep_call_order(self) -> None:
+        reference = load_python_machine(module_name="hsm_counters_reference")
+        for dispatch in ("switch", "table"):
+            for enums in ("str", "int"):
+                module = load_python_machine(
+                    options=statesurf.CodegenOptions(dispatch=dispatch, enums=enums, counters=True),
+                    module_name=f"hsm_counters_{dispatch}_{enums}",
+                )
+                with self.subTest(dispatch=dispatch, enums=enums):
+                    self.assertEqual(
+                        drive(module, "Hsm", 4, 200, batch=6), drive(reference, "Hsm", 4, 200, batch=6)
+                    )
+
+    def test_stats_count_dispatches_and_time_callbacks(self) -> None:
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(counters=True), module_name="hsm_counters_stats"
+        )
+        callbacks = type("Recorder", (ScriptedCallbacks, module.HsmCallbacks), {})(5)
+        machine = module.HsmMachine(callbacks)
+        states, events = list(module.HsmState), list(module.HsmEvent)
+        rng = random.Random(5)
+        expected = [0] * (len(states) * len(events))
+        for _ in range(150):
+            event = rng.choice(events)
+            machine.start()
+            expected[states.index(machine.state()) * len(events) + events.index(event)] += 1
+            machine.dispatch(event)
+            if machine.terminated():
+                machine.reset()
+        stats = json.loads(json.dumps(machine.stats()))
+        self.assertEqual(stats["counts"], expected)
+        entries = sum(1 for entry in callbacks.log if entry[0] == "entry")
+        timed = sum(timing["calls"] for name, timing in stats["callbacks"].items() if name.startswith("entry:"))
+        self.assertEqual(timed, entries)
+        self.assertIn("guard:isFooTrue", stats["callbacks"])
+
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "stats.json"
+            path.write_text(json.dumps(stats), encoding="utf-8")
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                code = statesurf.main(["report", "-i", str(HSM_MODEL), str(path), "-n", "5"])
+        self.assertEqual(code, 0)
+        output = stdout.getvalue()
+        self.assertIn("150 dispatches", output)
+        self.assertIn("mean us", output)
+
+    def test_report_rejects_stats_of_another_model(self) -> None:
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(counters=True), module_name="hsm_counters_foreign"
+        )
+        stats = module.HsmMachine(module.HsmCallbacks()).stats()
+        with self.assertRaises(ValueError):
+            statesurf.format_stats_report(statesurf.parse_puml_text(nested_puml(depth=2, width=2)), stats)
+        with self.assertRaises(ValueError):
+            statesurf.format_stats_report(statesurf.parse_puml(HSM_MODEL), {**stats, "format": "other"})
+
+    def test_report_rejects_malformed_stats(self) -> None:
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(counters=True), module_name="hsm_counters_malformed"
+        )
+        stats = module.HsmMachine(module.HsmCallbacks()).stats()
+        model = statesurf.parse_puml(HSM_MODEL)
+        malformed = {
+            "missing counts": {k: v for k, v in stats.items() if k != "counts"},
+            "missing states": {k: v for k, v in stats.items() if k != "states"},
+            "string events": {**stats, "events": str(stats["events"])},
+            "counts not a list": {**stats, "counts": {}},
+            "float count": {**stats, "counts": [0.5] * len(stats["counts"])},
+            "not an object": [stats],
+            "callbacks not a mapping": {**stats, "callbacks": ["entry:s1"]},
+            "callback timing not a mapping": {**stats, "callbacks": {"entry:s1": 3}},
+            "callback without seconds": {**stats, "callbacks": {"entry:s1": {"calls": 1}}},
+            "callback with string calls": {**stats, "callbacks": {"entry:s1": {"calls": "1", "seconds": 0.5}}},
+        }
+        for name, data in malformed.items():
+            with self.subTest(name):
+                with self.assertRaises(ValueError):
+                    statesurf.format_stats_report(model, data)
+                with self.assertRaises(ValueError):
+                    statesurf.load_branch_profile(model, json.dumps(data).encode("utf-8"))
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "stats.json"
+            path.write_text(json.dumps({**stats, "callbacks": {"entry:s1": None}}), encoding="utf-8")
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                code = statesurf.main(["report", "-i", str(HSM_MODEL), str(path)])
+        self.assertNotEqual(code, 0)
+        self.assertIn("callbacks", stderr.getvalue())
+        self.assertNotIn("Traceback", stderr.getvalue())
+
+
+@unittest.skipUnless(cpp_compiler(), "needs a C++ compiler")
+class CppCountersTest(unittest.TestCase):
+    def test_counters_match_dispatched_pairs(self) -> None:
+        model = statesurf.parse_puml_text(nested_puml(depth=6, width=3, seed=4))
+        options = statesurf.CodegenOptions(dispatch="table", trace="binary", trace_capacity=512, counters=True)
+        files = native_trace_artifacts("cpp", model, options, 500)[1]
+        stats = json.loads(files["stats.json"])
+        expected = [0] * (stats["states"] * stats["events"])
+        for record in statesurf.TRACE_RECORD.iter_unpack(files["trace.bin"][statesurf.TRACE_HEADER.size:]):
+            expected[record[1] * stats["events"] + record[2]] += 1
+        self.assertEqual(stats["counts"], expected)
+        self.assertEqual(sum(expected), 500)
+        if rust_compiler():
+            switch = statesurf.CodegenOptions(counters=True)
+            rust_stats = native_trace_artifacts("rust", model, switch, 500)[1]["stats.json"]
+            self.assertEqual(json.loads(rust_stats), stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from python import statesurf
+from python.tests.support import drive, load_python_machine
+
+
+class DispatchManyTest(unittest.TestCase):
+    def test_dispatch_many_matches_dispatch_loop(self) -> None:
+        def callbacks_only(log):
+            return [entry for entry in log if entry[0] != "state"]
+
+        for dispatch in ("switch", "table"):
+            module = load_python_machine(
+                options=statesurf.CodegenOptions(dispatch=dispatch),
+                module_name=f"hsm_many_{dispatch}",
+            )
+            for seed in range(10):
+                with self.subTest(dispatch=dispatch, seed=seed):
+                    self.assertEqual(
+                        callbacks_only(drive(module, "Hsm", seed, 300, batch=17)),
+                        callbacks_only(drive(module, "Hsm", seed, 300)),
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
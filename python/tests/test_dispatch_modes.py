@@ -0,0 +1,63 @@
+import unittest
+
+from python import statesurf
+from python.benchmarks.models import nested_puml
+from python.tests.support import (
+    HSM_MODEL,
+    cpp_compiler,
+    drive,
+    load_python_machine,
+    native_trace,
+    rust_compiler,
+)
+
+
+class TableDispatchTest(unittest.TestCase):
+    def test_table_matches_switch_call_order(self) -> None:
+        switch_module = load_python_machine(module_name="hsm_switch")
+        table_module = load_python_machine(
+            options=statesurf.CodegenOptions(dispatch="table"),
+            module_name="hsm_table",
+        )
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                self.assertEqual(
+                    drive(table_module, "Hsm", seed, 200),
+                    drive(switch_module, "Hsm", seed, 200),
+                )
+
+
+@unittest.skipUnless(cpp_compiler(), "needs a C++ compiler")
+class CppTableDispatchTest(unittest.TestCase):
+    def test_table_backend_matches_switch_backend(self) -> None:
+        models = {
+            "hsm": statesurf.parse_puml(HSM_MODEL),
+            "nested": statesurf.parse_puml_text(nested_puml(depth=6, width=3, seed=4)),
+        }
+        for name, model in models.items():
+            with self.subTest(model=name):
+                switch = native_trace("cpp", model, statesurf.CodegenOptions(dispatch="switch"), 2000)
+                self.assertGreater(switch.count("\n"), 2000)
+                self.assertEqual(native_trace("cpp", model, statesurf.CodegenOptions(dispatch="table"), 2000), switch)
+
+    def test_tables_use_smallest_integer_types(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        code = statesurf.gen_code(
+            model, "HsmMachine", "cpp", "hsm", "Hsm", statesurf.CodegenOptions(dispatch="table")
+        )
+        self.assertIn("namespace hsm_tables", code)
+        self.assertIn("static constexpr std::uint8_t kCellRows[]", code)
+        self.assertNotIn("handle_", code)
+
+
+@unittest.skipUnless(rust_compiler(), "needs rustc")
+class RustTableDispatchTest(unittest.TestCase):
+    def test_table_backend_matches_match_backend(self) -> None:
+        model = statesurf.parse_puml_text(nested_puml(depth=6, width=3, seed=4))
+        expected = native_trace("rust", model, statesurf.CodegenOptions(dispatch="switch"), 2000)
+        self.assertGreater(expected.count("\n"), 2000)
+        self.assertEqual(native_trace("rust", model, statesurf.CodegenOptions(dispatch="table"), 2000), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
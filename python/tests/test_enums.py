@@ -0,0 +1,38 @@
+import unittest
+
+from python import statesurf
+from python.tests.support import HSM_MODEL, drive, load_python_machine
+
+
+class IntEnumTest(unittest.TestCase):
+    def test_int_enums_match_str_enums(self) -> None:
+        reference = load_python_machine(module_name="hsm_str_enums")
+        for dispatch in ("switch", "table"):
+            module = load_python_machine(
+                options=statesurf.CodegenOptions(dispatch=dispatch, enums="int"),
+                module_name=f"hsm_int_enums_{dispatch}",
+            )
+            for seed in range(10):
+                with self.subTest(dispatch=dispatch, seed=seed):
+                    self.assertEqual(drive(module, "Hsm", seed, 200), drive(reference, "Hsm", seed, 200))
+
+    def test_int_machine_uses_slots_and_small_ints(self) -> None:
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(enums="int"), module_name="hsm_int_slots"
+        )
+        machine = module.HsmMachine(module.HsmCallbacks())
+        self.assertFalse(hasattr(machine, "__dict__"))
+        self.assertEqual(machine.state(), 0)
+        self.assertIsInstance(machine.state(), int)
+        self.assertEqual(module.HsmState.FinalPseudoState, len(module.HsmState) - 1)
+
+    def test_int_enums_are_python_only(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        with self.assertRaises(ValueError):
+            statesurf.gen_code(
+                model, "HsmMachine", "rust", "hsm", "Hsm", statesurf.CodegenOptions(enums="int")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import importlib.util
+import random
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from python import statesurf
+from python.tests.support import HSM_MODEL, load_python_machine
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional for the generator
+    np = None
+
+
+def load_fleet_module(model_path: Path = HSM_MODEL):
+    model = statesurf.parse_puml(model_path)
+    code = statesurf.gen_fleet_code(model, statesurf.generate_type_prefix(model_path))
+    with TemporaryDirectory() as tmp:
+        module_path = Path(tmp) / "statesurf_test_fleet.py"
+        module_path.write_text(code, encoding="utf-8")
+        spec = importlib.util.spec_from_file_location("statesurf_test_fleet", module_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["statesurf_test_fleet"] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+@unittest.skipIf(np is None, "numpy is required for the fleet engine")
+class FleetTest(unittest.TestCase):
+    SIZE = 64
+    STEPS = 60
+
+    def test_fleet_matches_individual_machines(self) -> None:
+        fleet_module = load_fleet_module()
+        machine_module = load_python_machine(
+            options=statesurf.CodegenOptions(enums="int"), module_name="hsm_fleet_reference"
+        )
+        op_names = {fleet_module.OP_EXIT: "exit", fleet_module.OP_ENTRY: "entry", fleet_module.OP_ACTION: "action"}
+
+        class FleetRecorder(fleet_module.HsmFleetCallbacks):
+            def __init__(self, size: int) -> None:
+                self.rngs = [random.Random(i) for i in range(size)]
+                self.logs = [[] for _ in range(size)]
+
+            def guard(self, instance, state, event, guard) -> bool:
+                decision = self.rngs[instance].random() < 0.5
+                self.logs[instance].append(("guard", int(state), int(guard), decision))
+                return decision
+
+            def effects(self, instances, ops, states, actions) -> None:
+                for instance, op, state, action in zip(instances, ops, states, actions):
+                    entry = (op_names[int(op)], int(state))
+                    if op == fleet_module.OP_ACTION:
+                        entry += (int(action),)
+                    self.logs[int(instance)].append(entry)
+
+        class MachineRecorder(machine_module.HsmCallbacks):
+            def __init__(self, seed: int) -> None:
+                self.rng = random.Random(seed)
+                self.log = []
+
+            def on_entry(self, state) -> None:
+                self.log.append(("entry", int(state)))
+
+            def on_exit(self, state) -> None:
+                self.log.append(("exit", int(state)))
+
+            def guard(self, state, event, guard) -> bool:
+                decision = self.rng.random() < 0.5
+                self.log.append(("guard", int(state), int(guard), decision))
+                return decision
+
+            def action(self, state, event, action) -> None:
+                self.log.append(("action", int(state), int(action)))
+
+        recorder = FleetRecorder(self.SIZE)
+        fleet = fleet_module.HsmFleet(self.SIZE, recorder)
+        machines = [machine_module.HsmMachine(MachineRecorder(i)) for i in range(self.SIZE)]
+
+        rng = np.random.default_rng(1234)
+        event_count = len(fleet_module.HsmEvent)
+        for _ in range(self.STEPS):
+            # Mostly real events, some NO_EVENT holes, rare TERMINATE.
+            events = rng.integers(-1, event_count - 1, size=self.SIZE)
+            events[rng.random(self.SIZE) < 0.02] = fleet_module.HsmEvent.TERMINATE
+            fleet.step(events)
+            for instance, machine in enumerate(machines):
+                if events[instance] >= 0:
+                    machine.dispatch(machine_module.HsmEvent(int(events[instance])))
+
+            self.assertEqual(fleet.states.tolist(), [int(m.state()) for m in machines])
+            self.assertEqual(fleet.terminated.tolist(), [m.terminated() for m in machines])
+        for instance, machine in enumerate(machines):
+            self.assertEqual(recorder.logs[instance], machine._callbacks.log)
+
+    def test_scalar_event_broadcasts(self) -> None:
+        fleet_module = load_fleet_module()
+        fleet = fleet_module.HsmFleet(5)
+        fleet.step(fleet_module.HsmEvent.TERMINATE)
+        self.assertTrue(fleet.terminated.all())
+        self.assertTrue((fleet.states == fleet_module.HsmState.FinalPseudoState).all())
+
+
+
+class FleetOptionsTest(unittest.TestCase):
+    def test_non_default_options_are_rejected(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        self.assertIn("class HsmFleet", statesurf.gen_fleet_code(model, "Hsm", statesurf.CodegenOptions()))
+        for options in (
+            statesurf.CodegenOptions(dispatch="table"),
+            statesurf.CodegenOptions(enums="int"),
+            statesurf.CodegenOptions(optimize="size"),
+            statesurf.CodegenOptions(trace="binary"),
+            statesurf.CodegenOptions(trace_capacity=256),
+            statesurf.CodegenOptions(counters=True),
+            statesurf.CodegenOptions(branch_profile=b"{}"),
+        ):
+            with self.subTest(options=vars(options)):
+                with self.assertRaises(ValueError):
+                    statesurf.render_language(model, statesurf.FLEET_LANGUAGE, "HsmMachine", "hsm", "Hsm", options)
+        with TemporaryDirectory() as tmp:
+            output = Path(tmp) / "hsm_fleet.py"
+            args = ["generate", "-i", str(HSM_MODEL), "-o", str(output), "-l", "python-fleet", "--no-cache"]
+            self.assertNotEqual(statesurf.main(args + ["--trace", "binary"]), 0)
+            self.assertFalse(output.exists())
+
+if __name__ == "__main__":
+    unittest.main()
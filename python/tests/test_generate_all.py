@@ -0,0 +1,75 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import contextlib
+import io
+import unittest
+
+from python import statesurf
+from python.tests.support import REPO_ROOT
+
+MODELS = sorted((REPO_ROOT / "plantuml").glob("*.puml"))
+
+
+class GenerateAllTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_pool_output_matches_single_generate(self) -> None:
+        languages = ["cpp", "rust", "python"]
+        pattern = str(self.tmp / "{language}" / "{stem}{ext}")
+        results = statesurf.generate_all(MODELS, languages, pattern, jobs=2)
+
+        self.assertEqual([r.input_path for r in results], MODELS)
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertEqual(sorted(result.languages), sorted(languages))
+        for model in MODELS:
+            for language in languages:
+                expected = self.tmp / f"expected{statesurf.output_extension(language)}"
+                statesurf.generate(model, expected, language=language)
+                actual = self.tmp / language / f"{model.stem}{statesurf.output_extension(language)}"
+                self.assertEqual(actual.read_text(encoding="utf-8"), expected.read_text(encoding="utf-8"))
+
+    def test_manifest_and_globs_are_merged_without_duplicates(self) -> None:
+        manifest = self.tmp / "models.txt"
+        manifest.write_text(
+            f"# models\n{MODELS[0]}\n\n{REPO_ROOT / 'plantuml' / '*.puml'}\n", encoding="utf-8"
+        )
+        models = statesurf.collect_models([str(MODELS[-1])], manifest)
+        self.assertEqual([m.resolve() for m in models], [MODELS[-1], *MODELS[:-1]])
+
+        with self.assertRaises(ValueError):
+            statesurf.collect_models([str(self.tmp / "*.puml")])
+
+    def test_colliding_outputs_are_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            statesurf.plan_batch_outputs(MODELS, ["cpp", "rust"], str(self.tmp / "{stem}.out"))
+
+    def test_bad_model_is_reported_in_summary(self) -> None:
+        broken = self.tmp / "broken.puml"
+        broken.write_text("@startuml\nthis is not plantuml\n@enduml\n", encoding="utf-8")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            code = statesurf.main(
+                [
+                    "generate-all",
+                    "-i", str(MODELS[0]), str(broken),
+                    "-l", "cpp",
+                    "-o", str(self.tmp / "out" / "{stem}{ext}"),
+                    "-j", "1",
+                    "--no-cache",
+                ]
+            )
+        self.assertEqual(code, 1)
+        self.assertTrue((self.tmp / "out" / f"{MODELS[0].stem}.hpp").exists())
+        summary = stdout.getvalue()
+        self.assertIn("error: syntax error at line 2", summary)
+        self.assertIn("2 model(s), 1 language(s), 1 failed", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+import contextlib
+import hashlib
+import io
+import os
+import pstats
+import unittest
+
+from python import statesurf
+from python.tests.support import HSM_MODEL
+
+
+class GenerationCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.model = self.tmp / "hsm.puml"
+        self.model.write_bytes(HSM_MODEL.read_bytes())
+        self.cache = statesurf.GenerationCache(self.tmp / "cache")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def generate(self, language: str = "cpp", **kwargs) -> str:
+        output = self.tmp / f"out.{language}"
+        statesurf.generate(self.model, output, language=language, cache=self.cache, **kwargs)
+        return output.read_text(encoding="utf-8")
+
+    def test_unchanged_input_skips_parsing_and_rendering(self) -> None:
+        expected = self.generate()
+        with mock.patch.object(statesurf, "parse_puml_lines") as parse, mock.patch.object(
+            statesurf, "gen_code"
+        ) as render:
+            self.assertEqual(self.generate(), expected)
+        parse.assert_not_called()
+        render.assert_not_called()
+
+    def test_parsed_model_is_shared_across_languages(self) -> None:
+        self.generate("cpp")
+        with mock.patch.object(statesurf, "parse_puml_lines") as parse:
+            rust = self.generate("rust")
+        parse.assert_not_called()
+        uncached = self.tmp / "uncached.rs"
+        statesurf.generate(self.model, uncached, language="rust")
+        self.assertEqual(rust, uncached.read_text(encoding="utf-8"))
+
+    def test_model_file_is_streamed_not_read_whole(self) -> None:
+        expected = self.generate()
+        digest = hashlib.sha256(self.model.read_bytes()).hexdigest()
+        self.cache.clear()
+        read_text = Path.read_text
+
+        def read_cache_entry(path: Path, *args, **kwargs) -> str:
+            self.assertNotEqual(path, self.model, "model read whole")
+            return read_text(path, *args, **kwargs)
+
+        with mock.patch.object(statesurf, "SOURCE_DIGEST_CHUNK", 7), mock.patch.object(
+            Path, "read_bytes", side_effect=AssertionError("model read whole")
+        ), mock.patch.object(Path, "read_text", autospec=True, side_effect=read_cache_entry):
+            self.assertEqual(statesurf.source_digest(self.model), digest)
+            statesurf.generate(self.model, self.tmp / "cached.hpp", cache=self.cache)
+            statesurf.generate(self.model, self.tmp / "uncached.hpp")
+        for name in ("cached.hpp", "uncached.hpp"):
+            self.assertEqual((self.tmp / name).read_text(encoding="utf-8"), expected)
+
+    def test_options_and_content_changes_miss(self) -> None:
+        switch = self.generate("python")
+        table = self.generate("python", options=statesurf.CodegenOptions(dispatch="table"))
+        self.assertNotEqual(switch, table)
+
+        self.model.write_text(
+            self.model.read_text(encoding="utf-8").replace("TERMINATE", "SHUTDOWN"), encoding="utf-8"
+        )
+        self.assertIn("SHUTDOWN", self.generate("python"))
+
+    def test_eviction_drops_least_recently_used_entries(self) -> None:
+        for index in range(4):
+            self.cache.store_output(f"{index:064x}", "x" * 100)
+            path = self.cache.root / "output" / f"{index:064x}"
+            os.utime(path, (1000 + index, 1000 + index))
+        # Reading refreshes an old entry so it survives eviction.
+        self.assertIsNotNone(self.cache.load_output(f"{0:064x}"))
+
+        self.cache.max_bytes = 250
+        self.assertEqual(self.cache.evict(), 2)
+        remaining = sorted(p.name for p in (self.cache.root / "output").iterdir())
+        self.assertEqual(remaining, [f"{0:064x}", f"{3:064x}"])
+
+    def test_no_cache_flag_leaves_cache_dir_untouched(self) -> None:
+        cache_dir = self.tmp / "cli-cache"
+        args = ["generate", "-i", str(self.model), "-o", str(self.tmp / "out.hpp"), "--cache-dir", str(cache_dir)]
+        self.assertEqual(statesurf.main(args + ["--no-cache"]), 0)
+        self.assertFalse(cache_dir.exists())
+        self.assertEqual(statesurf.main(args), 0)
+        self.assertTrue(any((cache_dir / "output").iterdir()))
+
+
+class TemplateEnvironmentTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        statesurf.configure_template_cache(None)
+
+    def render(self) -> str:
+        model = statesurf.parse_puml(HSM_MODEL)
+        return statesurf.gen_code(model, "HsmMachine", "cpp", "hsm", "Hsm")
+
+    def test_templates_compile_once_per_process(self) -> None:
+        env = statesurf.configure_template_cache(None)
+        with mock.patch.object(env, "compile", wraps=env.compile) as compile:
+            first = self.render()
+            compiled = compile.call_count
+            self.assertEqual(self.render(), first)
+        self.assertGreater(compiled, 0)
+        self.assertEqual(compile.call_count, compiled)
+
+    def test_library_rendering_writes_no_bytecode_cache(self) -> None:
+        with TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {statesurf.CACHE_DIR_ENV: tmp}), mock.patch.object(
+            statesurf, "_TEMPLATE_ENV", None
+        ):
+            self.render()
+            self.assertIsNone(statesurf.template_environment().bytecode_cache)
+            self.assertEqual(list(Path(tmp).iterdir()), [])
+
+    def test_bytecode_cache_skips_compilation_in_fresh_environment(self) -> None:
+        with TemporaryDirectory() as tmp:
+            statesurf.configure_template_cache(Path(tmp))
+            expected = self.render()
+            self.assertTrue(any(Path(tmp).iterdir()))
+
+            env = statesurf.configure_template_cache(Path(tmp))
+            with mock.patch.object(env, "compile", wraps=env.compile) as compile:
+                self.assertEqual(self.render(), expected)
+            compile.assert_not_called()
+
+
+class ProfileTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        statesurf.configure_profiler(None)
+
+    def test_profile_reports_phases_without_changing_output(self) -> None:
+        with TemporaryDirectory() as tmp:
+            plain, profiled, dump = Path(tmp) / "plain.py", Path(tmp) / "profiled.py", Path(tmp) / "run.pstats"
+            args = ["generate", "-i", str(HSM_MODEL), "-l", "python", "--no-cache"]
+            self.assertEqual(statesurf.main(args + ["-o", str(plain)]), 0)
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                code = statesurf.main(args + ["-o", str(profiled), "--profile", "--profile-dump", str(dump)])
+            self.assertEqual(code, 0)
+            self.assertEqual(profiled.read_text(encoding="utf-8"), plain.read_text(encoding="utf-8"))
+            report = stderr.getvalue()
+            for phase in ("generate", "parse", "plan", "bodies", "render"):
+                self.assertRegex(report, rf"(?m)^ *{phase} +1 ")
+            lines = len(plain.read_text(encoding="utf-8").splitlines())
+            self.assertIn(f"emitted lines: {lines}", report)
+            self.assertGreater(pstats.Stats(str(dump)).total_calls, 0)
+
+            stderr = io.StringIO()
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+                self.assertEqual(statesurf.main(["validate", "-i", str(HSM_MODEL), "--profile"]), 0)
+            self.assertRegex(stderr.getvalue(), r"(?m)^  parse +1 ")
+            self.assertNotIn("render", stderr.getvalue())
+        self.assertIsNone(statesurf._PROFILER)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -195,6 +195,30 @@ class HsmMachineTest(unittest.TestCase):
         self.assertTrue(machine.terminated())
         self.assertEqual(machine.state(), HsmState.FinalPseudoState)
 
+    def test_dispatch_many_matches_repeated_dispatch(self) -> None:
+        events = [
+            HsmEvent.G, HsmEvent.I, HsmEvent.A, HsmEvent.D, HsmEvent.D, HsmEvent.C,
+            HsmEvent.E, HsmEvent.I, HsmEvent.I, HsmEvent.TERMINATE, HsmEvent.A, HsmEvent.B,
+        ]
+
+        single_callbacks = RecordingCallbacks()
+        single = HsmMachine(single_callbacks)
+        for event in events:
+            single.dispatch(event)
+
+        batch_callbacks = RecordingCallbacks()
+        batch = HsmMachine(batch_callbacks)
+        consumed = batch.dispatch_many(iter(events))
+
+        self.assertEqual(consumed, 10)
+        self.assertTrue(batch.terminated())
+        self.assertEqual(batch.state(), single.state())
+        self.assertEqual(batch_callbacks.entries, single_callbacks.entries)
+        self.assertEqual(batch_callbacks.exits, single_callbacks.exits)
+        self.assertEqual(batch_callbacks.actions, single_callbacks.actions)
+        self.assertEqual(batch_callbacks.guard_calls, single_callbacks.guard_calls)
+        self.assertEqual(batch.dispatch_many(events), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
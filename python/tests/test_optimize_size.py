@@ -0,0 +1,84 @@
+import contextlib
+import io
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from python import statesurf
+from python.benchmarks.models import nested_puml
+from python.tests.support import HSM_MODEL, cpp_compiler, drive, load_python_machine, native_trace, rust_compiler
+
+
+class SizeOptimizationTest(unittest.TestCase):
+    def test_shared_bodies_keep_call_order(self) -> None:
+        reference = load_python_machine(module_name="hsm_speed")
+        for dispatch in ("switch", "table"):
+            module = load_python_machine(
+                options=statesurf.CodegenOptions(dispatch=dispatch, optimize="size"),
+                module_name=f"hsm_size_{dispatch}",
+            )
+            for seed in range(10):
+                with self.subTest(dispatch=dispatch, seed=seed):
+                    self.assertEqual(drive(module, "Hsm", seed, 200), drive(reference, "Hsm", seed, 200))
+
+    def test_size_mode_shrinks_every_language(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        for language in ("cpp", "rust", "python"):
+            with self.subTest(language=language):
+                speed = statesurf.gen_code(model, "HsmMachine", language, "hsm", "Hsm")
+                size = statesurf.gen_code(
+                    model, "HsmMachine", language, "hsm", "Hsm", statesurf.CodegenOptions(optimize="size")
+                )
+                self.assertLess(len(size), len(speed))
+                self.assertIn("body_0(", size)
+                self.assertNotIn("body_0(", speed)
+
+    def test_size_report_matches_written_file(self) -> None:
+        with TemporaryDirectory() as tmp:
+            # The output name differs from the model name, so the report must use the model's names.
+            output = Path(tmp) / "renamed_output.hpp"
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                code = statesurf.main(
+                    ["generate", "-i", str(HSM_MODEL), "-o", str(output), "--optimize", "size", "--no-cache"]
+                )
+            self.assertEqual(code, 0)
+            size = output.stat().st_size
+            self.assertTrue(stdout.getvalue().startswith(f"{output}: {size} bytes, "))
+            model = statesurf.parse_puml(HSM_MODEL)
+            speed = statesurf.gen_code(model, "HsmMachine", "cpp", "hsm", "Hsm")
+            self.assertIn(f", {len(speed.encode('utf-8')) - size} bytes (", stdout.getvalue())
+
+
+
+@unittest.skipUnless(cpp_compiler(), "needs a C++ compiler")
+class CppSizeOptimizationTest(unittest.TestCase):
+    def test_untraced_shared_bodies_build_warning_free(self) -> None:
+        # Shared bodies without actions or traced transitions leave the event
+        # parameter unnamed, so -Wall -Wextra -Werror still passes.
+        model = statesurf.parse_puml_text(nested_puml(depth=6, width=3, seed=4))
+        for trace in ("none", "binary"):
+            with self.subTest(trace=trace):
+                size = statesurf.CodegenOptions(optimize="size", trace=trace)
+                self.assertIn("Event) {", statesurf.gen_code(model, "PMachine", "cpp", "bench", "P", size))
+                self.assertEqual(
+                    native_trace("cpp", model, size, 1000),
+                    native_trace("cpp", model, statesurf.CodegenOptions(trace=trace), 1000),
+                )
+
+
+@unittest.skipUnless(rust_compiler(), "needs rustc")
+class RustSizeOptimizationTest(unittest.TestCase):
+    def test_untraced_shared_bodies_build_warning_free(self) -> None:
+        model = statesurf.parse_puml_text(nested_puml(depth=6, width=3, seed=4))
+        for trace in ("none", "binary"):
+            with self.subTest(trace=trace):
+                size = statesurf.CodegenOptions(optimize="size", trace=trace)
+                self.assertIn("_event: PEvent", statesurf.gen_code(model, "PMachine", "rust", "bench", "P", size))
+                self.assertEqual(
+                    native_trace("rust", model, size, 1000),
+                    native_trace("rust", model, statesurf.CodegenOptions(trace=trace), 1000),
+                )
+
+if __name__ == "__main__":
+    unittest.main()
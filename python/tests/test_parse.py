@@ -0,0 +1,176 @@
+import io
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from python import statesurf
+from python.benchmarks.bench_transitions import ancestor_walk
+from python.benchmarks.models import nested_puml, synthetic_puml
+from python.tests.support import HSM_MODEL, drive, load_python_machine
+
+
+class ParseTest(unittest.TestCase):
+    def test_line_kinds(self) -> None:
+        cases = {
+            "state s {": "state_open",
+            "state s": "state_decl",
+            "}": "close",
+            "[*] --> s1 : / init": "initial",
+            "s1 : entry / enter": "entryexit",
+            "s1 --> s2 : E [g] / a": "transition",
+            "s1 -> [*] : TERMINATE": "transition",
+            "s1 : E [g] / a": "internal",
+            "s1 --> s2": None,
+            "state s -> t": None,
+        }
+        for line, kind in cases.items():
+            with self.subTest(line=line):
+                self.assertEqual(statesurf.classify_line(line)[0], kind)
+
+    def test_synthetic_model_line_mix(self) -> None:
+        text = synthetic_puml(states=200, seed=3)
+        model = statesurf.parse_puml_text(text)
+        self.assertEqual(len([n for n in model.nodes if n.startswith("s")]), 200)
+        # 8 external + 1 internal transition per leaf, plus the final one.
+        self.assertEqual(len(model.transitions), 200 * 9 + 1)
+        self.assertEqual(sum(t.internal for t in model.transitions), 200)
+        hsm = statesurf.parse_puml(HSM_MODEL)
+        self.assertIn("TERMINATE", hsm.events)
+
+    def test_parse_error_reports_line_and_snippet(self) -> None:
+        text = "@startuml\nstate s {\n  s1 --> s2\n}\n@enduml\n"
+        with self.assertRaises(statesurf.ParseError) as ctx:
+            statesurf.parse_puml_text(text)
+        self.assertEqual(ctx.exception.line, 3)
+        self.assertEqual(ctx.exception.snippet, "  s1 --> s2")
+
+        with self.assertRaises(statesurf.ParseError) as ctx:
+            statesurf.parse_puml_text("state s {\n  state t\n")
+        self.assertEqual(ctx.exception.line, 2)
+
+
+class StreamingParseTest(unittest.TestCase):
+    def test_streams_and_line_iterables_match_text(self) -> None:
+        text = HSM_MODEL.read_text(encoding="utf-8")
+        expected = statesurf.parse_puml_text(text).to_dict()
+        crlf = text.replace("\n", "\r\n").encode("utf-8")
+        sources = {
+            "path": lambda: statesurf.parse_puml(HSM_MODEL),
+            "binary": lambda: statesurf.parse_puml_stream(io.BytesIO(crlf)),
+            "text": lambda: statesurf.parse_puml_stream(io.StringIO(text)),
+            "generator": lambda: statesurf.parse_puml_lines(line for line in text.splitlines(True)),
+        }
+        for name, parse in sources.items():
+            with self.subTest(source=name):
+                self.assertEqual(parse().to_dict(), expected)
+
+    def test_stream_errors_keep_line_and_snippet(self) -> None:
+        with self.assertRaises(statesurf.ParseError) as ctx:
+            statesurf.parse_puml_stream(io.BytesIO(b"[*] --> a\r\n  a -> b\r\n"))
+        self.assertEqual(ctx.exception.line, 2)
+        self.assertEqual(ctx.exception.snippet, "  a -> b")
+
+    def test_generate_reads_model_from_stdin(self) -> None:
+        stdin = mock.Mock(buffer=io.BytesIO(HSM_MODEL.read_bytes()))
+        with TemporaryDirectory() as tmp:
+            output = Path(tmp) / "hsm.py"
+            with mock.patch.object(sys, "stdin", stdin):
+                code = statesurf.main(["generate", "-i", "-", "-o", str(output), "-l", "python", "--no-cache"])
+            self.assertEqual(code, 0)
+            reference = Path(tmp) / "reference" / "hsm.py"
+            reference.parent.mkdir()
+            statesurf.generate(HSM_MODEL, reference, language="python")
+            self.assertEqual(output.read_text(encoding="utf-8"), reference.read_text(encoding="utf-8"))
+
+
+class TransitionResolutionTest(unittest.TestCase):
+    def test_top_down_matches_ancestor_walk(self) -> None:
+        models = {
+            "hsm": statesurf.parse_puml(HSM_MODEL),
+            "nested": statesurf.parse_puml_text(nested_puml(depth=12, width=4, seed=1)),
+            "flat": statesurf.parse_puml_text(synthetic_puml(states=50, seed=2)),
+        }
+        for name, model in models.items():
+            with self.subTest(model=name):
+                expected = ancestor_walk(model)
+                actual = statesurf.build_transitions_by_state(model)
+                self.assertEqual(list(actual), list(expected))
+                for state, evmap in expected.items():
+                    self.assertEqual(list(actual[state]), list(evmap))
+                    for event, transitions in evmap.items():
+                        self.assertEqual([id(t) for t in actual[state][event]], [id(t) for t in transitions])
+
+    def test_depth_is_cached_on_nodes(self) -> None:
+        model = statesurf.parse_puml_text(nested_puml(depth=5, width=1))
+        self.assertEqual(model.nodes["c0"].depth, 0)
+        self.assertEqual(model.nodes["l4_0"].depth, 5)
+        self.assertEqual(statesurf.compute_state_depth(model, "c3"), 3)
+
+    def test_depth_of_very_deep_nesting_needs_no_recursion(self) -> None:
+        model = statesurf.Model()
+        node = model.root
+        levels = sys.getrecursionlimit() * 2
+        for level in range(levels):
+            node = statesurf.Node(f"s{level}", node)
+        self.assertEqual(node.depth, levels - 1)
+        # The depths filled in on the way down are reused, not recomputed.
+        middle = node
+        for _ in range(levels // 2):
+            middle = middle.parent
+        self.assertEqual(middle._depth, levels // 2 - 1)
+        self.assertEqual(model.root.depth, 0)
+
+
+class SynthesizeTest(unittest.TestCase):
+    def synthesize(self, seed: int = 0, **shape) -> str:
+        return "\n".join(statesurf.synthesize_puml(statesurf.ModelShape(**shape), seed)) + "\n"
+
+    def test_same_seed_same_model(self) -> None:
+        self.assertEqual(self.synthesize(5, states=300), self.synthesize(5, states=300))
+        self.assertNotEqual(self.synthesize(5, states=300), self.synthesize(6, states=300))
+
+    def test_shape_is_respected(self) -> None:
+        text = self.synthesize(1, states=500, depth=5, branching=3, transitions=3, guard_ratio=1.0, guard_reuse=0.0)
+        model = statesurf.parse_puml_text(text)
+        states = [node for name, node in model.nodes.items() if name != "__root__"]
+        self.assertEqual(len(states), 500)
+        self.assertEqual(max(node.depth for node in states), 4)
+        self.assertLessEqual(max(len(node.children) for node in states), 3)
+        guarded = [t for t in model.transitions if t.guard]
+        self.assertEqual(len(guarded), len(model.transitions))
+        self.assertEqual(len(model.guards), len(guarded))
+
+        flat = statesurf.parse_puml_text(
+            self.synthesize(
+                2, states=50, depth=1, final_ratio=1.0, internal_ratio=0.0, guard_ratio=0.0, action_ratio=0.0,
+                entry_exit_ratio=0.0,
+            )
+        )
+        self.assertFalse(any(node.children for node in flat.nodes.values() if node.name != "__root__"))
+        self.assertEqual(sum(t.dst is None for t in flat.transitions), 50)
+        self.assertFalse(flat.guards or flat.actions)
+        with self.assertRaises(ValueError):
+            statesurf.ModelShape(guard_ratio=1.5)
+
+    def test_synthesized_machines_run(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "synth.puml"
+            code = statesurf.main(
+                ["synthesize", "-o", str(path), "--states", "120", "--depth", "4", "--seed", "9",
+                 "--deep-initial-ratio", "0.5", "--final-ratio", "0.05"]
+            )
+            self.assertEqual(code, 0)
+            self.assertEqual(path.read_text(encoding="utf-8"), self.synthesize(
+                9, states=120, depth=4, deep_initial_ratio=0.5, final_ratio=0.05
+            ))
+            switch = load_python_machine(path, module_name="synth_switch")
+            table = load_python_machine(
+                path, statesurf.CodegenOptions(dispatch="table"), module_name="synth_table"
+            )
+        self.assertEqual(drive(table, "Synth", 3, 300), drive(switch, "Synth", 3, 300))
+
+
+if __name__ == "__main__":
+    unittest.main()
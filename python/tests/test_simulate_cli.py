@@ -14,6 +14,8 @@ class SimulateCommandTest(unittest.TestCase):
                 simulation_dir=sim_dir,
                 machine_name="TestMachine",
                 plantuml_cmd="plantuml",
+                render_cache_bytes=1 << 20,
+                prerender=True,
             )
 
             machine_file = sim_dir / "machine.py"
@@ -23,12 +25,27 @@ class SimulateCommandTest(unittest.TestCase):
             self.assertTrue(machine_file.exists(), "machine.py should be generated")
             self.assertTrue(simulator_file.exists(), "simulator.py should be generated")
             self.assertTrue(model_copy.exists(), "A copy of the original PlantUML file should be present")
+            render_file = sim_dir / statesurf.SIMULATOR_RENDER_MODULE
+            self.assertTrue(render_file.exists(), "simulator_render.py should be generated")
 
             machine_content = machine_file.read_text(encoding="utf-8")
             self.assertIn("class HsmMachine", machine_content)
 
             simulator_content = simulator_file.read_text(encoding="utf-8")
             self.assertIn("nicegui", simulator_content.lower())
+            compile(simulator_content, str(simulator_file), "exec")
+            self.assertIn("from simulator_render import", simulator_content)
+            self.assertNotIn("nicegui", render_file.read_text(encoding="utf-8"))
+            self.assertIn("RENDER_CACHE_MAX_BYTES = 1048576", simulator_content)
+            # Only leaf states are pre-rendered; composites never stay active on their own.
+            prerender = simulator_content.split("PRERENDER_STATES: List[str] = [", 1)[1].split("]", 1)[0]
+            self.assertEqual(prerender.split(), ['"s11",', '"s211",'])
+
+    def test_unknown_diagram_format_is_rejected(self) -> None:
+        with TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                statesurf.simulate(Path("plantuml/hsm.puml"), Path(tmp) / "sim", diagram_format="gif")
+            self.assertFalse((Path(tmp) / "sim").exists())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,279 @@
+import gc
+import importlib.util
+import os
+import sys
+import threading
+import time
+import unittest
+import warnings
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import ModuleType
+from typing import List
+
+from python import statesurf
+
+
+def load_render_module(module_name: str = "statesurf_test_simulator_render") -> ModuleType:
+    code = statesurf.render_template("python/simulator_render.py.j2")
+    with TemporaryDirectory() as tmp:
+        module_path = Path(tmp) / statesurf.SIMULATOR_RENDER_MODULE
+        module_path.write_text(code, encoding="utf-8")
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+render = load_render_module()
+
+
+class FakeRenderer:
+    """Counts renders; optionally blocks each one until released, or fails."""
+
+    def __init__(self, error: bool = False, gate: bool = False) -> None:
+        self.calls = 0
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not gate:
+            self.release.set()
+
+    def __call__(self, source: str) -> bytes:
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise render.RenderError(f"cannot render {source}")
+        return f"image:{source}".encode("utf-8")
+
+
+class RenderCacheTest(unittest.TestCase):
+    def test_hit_skips_the_renderer(self) -> None:
+        cache = render.RenderCache(1 << 10)
+        renderer = FakeRenderer()
+        key = render.RenderCache.key(["a"])
+        self.assertEqual(cache.render(key, "a", renderer), b"image:a")
+        self.assertEqual(cache.render(key, "a", renderer), b"image:a")
+        self.assertEqual(renderer.calls, 1)
+        self.assertNotEqual(render.RenderCache.key(["b"]), key)
+
+    def test_least_recently_used_image_is_evicted(self) -> None:
+        cache = render.RenderCache(len(b"image:a") * 2)
+        renderer = FakeRenderer()
+        cache.render("a", "a", renderer)
+        cache.render("b", "b", renderer)
+        cache.render("a", "a", renderer)  # refreshes a, so b is the oldest
+        cache.render("c", "c", renderer)
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, len(b"image:a") * 2)
+        cache.render("b", "b", renderer)
+        self.assertEqual(renderer.calls, 4)
+        # Images larger than the whole cache are returned but never stored.
+        self.assertEqual(cache.render("big", "x" * 100, renderer), b"image:" + b"x" * 100)
+        self.assertNotIn("big", cache.entries)
+
+    def test_concurrent_misses_share_one_render(self) -> None:
+        cache = render.RenderCache(1 << 10)
+        renderer = FakeRenderer(gate=True)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.render("k", "k", renderer))) for _ in range(4)]
+        threads[0].start()
+        self.assertTrue(renderer.started.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)  # let the others find the pending render before it finishes
+        renderer.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [b"image:k"] * 4)
+        self.assertEqual(renderer.calls, 1)
+        self.assertEqual(cache.pending, {})
+
+    def test_errors_reach_every_waiter_and_are_not_cached(self) -> None:
+        cache = render.RenderCache(1 << 10)
+        renderer = FakeRenderer(error=True, gate=True)
+        errors = []
+
+        def waiter() -> None:
+            try:
+                cache.render("k", "k", renderer)
+            except render.RenderError as exc:
+                errors.append(str(exc))
+
+        threads = [threading.Thread(target=waiter) for _ in range(3)]
+        threads[0].start()
+        self.assertTrue(renderer.started.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)  # let the others find the pending render before it finishes
+        renderer.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(errors, ["cannot render k"] * 3)
+        self.assertEqual((cache.entries, cache.pending), ({}, {}))
+        renderer.error = False
+        self.assertEqual(cache.render("k", "k", renderer), b"image:k")
+        self.assertEqual(renderer.calls, 2)
+
+
+
+STUB_PLANTUML = """\
+import sys, time
+args = sys.argv[1:]
+with open("starts.log", "a") as log:
+    log.write(" ".join(args) + "\\n")
+if "-pipedelimitor" in args and {old}:
+    sys.exit("Unknown option -pipedelimitor")
+delimiter = args[args.index("-pipedelimitor") + 1].encode() if "-pipedelimitor" in args else None
+lines = []
+for line in sys.stdin.buffer:
+    lines.append(line)
+    if line.strip() != b"@enduml":
+        continue
+    source = b"".join(lines)
+    lines = []
+    if b"DIE" in source:
+        sys.exit(1)
+    if b"ERROR" in source:
+        sys.stderr.write("Syntax Error?\\n")
+        sys.stderr.flush()
+        time.sleep(0.3)
+    sys.stdout.buffer.write(b"IMG " + args[0].encode() + b" " + source.split(b"\\n")[1])
+    if delimiter is not None:
+        sys.stdout.buffer.write(delimiter + b"\\n")
+    sys.stdout.buffer.flush()
+"""
+
+
+@unittest.skipIf(os.name == "nt", "the stub PlantUML is a shebang script")
+class PlantUMLPipeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        # Every process and pipe must be released by close(), not by the garbage collector.
+        self._warnings = warnings.catch_warnings(record=True)
+        self.caught = self._warnings.__enter__()
+        warnings.simplefilter("always", ResourceWarning)
+
+    def tearDown(self) -> None:
+        gc.collect()
+        self._warnings.__exit__(None, None, None)
+        self._tmp.cleanup()
+        leaks = [str(w.message) for w in self.caught if issubclass(w.category, ResourceWarning)]
+        self.assertEqual(leaks, [])
+
+    def stub(self, old: bool = False) -> str:
+        script = self.tmp / "plantuml"
+        script.write_text(f"#!{sys.executable}\n" + STUB_PLANTUML.format(old=old), encoding="utf-8")
+        script.chmod(0o755)
+        return str(script)
+
+    def starts(self) -> List[str]:
+        return (self.tmp / "starts.log").read_text(encoding="utf-8").splitlines()
+
+    def test_one_process_renders_every_diagram(self) -> None:
+        pipe = render.PlantUMLPipe(self.stub(), self.tmp)
+        try:
+            for name in ("a", "b", "c"):
+                self.assertEqual(pipe.render(f"@startuml\n{name}\n@enduml"), f"IMG -tpng {name}".encode())
+        finally:
+            pipe.close()
+        self.assertEqual(self.starts(), [f"-tpng -pipe -pipedelimitor {render.PIPE_DELIMITER}"])
+        self.assertFalse(pipe.fallback)
+
+    def test_stderr_output_is_a_render_error(self) -> None:
+        pipe = render.PlantUMLPipe(self.stub(), self.tmp, "svg")
+        try:
+            with self.assertRaisesRegex(render.RenderError, "Syntax Error"):
+                pipe.render("@startuml\nERROR\n@enduml")
+            self.assertEqual(pipe.render("@startuml\nok\n@enduml"), b"IMG -tsvg ok")
+        finally:
+            pipe.close()
+        self.assertEqual(len(self.starts()), 1)
+
+    def test_dead_process_is_restarted_on_the_next_render(self) -> None:
+        pipe = render.PlantUMLPipe(self.stub(), self.tmp)
+        try:
+            self.assertEqual(pipe.render("@startuml\na\n@enduml"), b"IMG -tpng a")
+            with self.assertRaises(render.RenderError):
+                pipe.render("@startuml\nDIE\n@enduml")
+            self.assertEqual(pipe.render("@startuml\nb\n@enduml"), b"IMG -tpng b")
+        finally:
+            pipe.close()
+        self.assertEqual(len(self.starts()), 2)
+        self.assertFalse(pipe.fallback)
+
+    def test_plantuml_without_pipe_delimiter_falls_back_to_one_shot_renders(self) -> None:
+        pipe = render.PlantUMLPipe(self.stub(old=True), self.tmp)
+        self.assertEqual(pipe.render("@startuml\na\n@enduml"), b"IMG -tpng a")
+        self.assertTrue(pipe.fallback)
+        self.assertEqual(pipe.render("@startuml\nb\n@enduml"), b"IMG -tpng b")
+        self.assertEqual(
+            self.starts(), [f"-tpng -pipe -pipedelimitor {render.PIPE_DELIMITER}", "-tpng -pipe", "-tpng -pipe"]
+        )
+
+    def test_missing_command_is_a_render_error(self) -> None:
+        pipe = render.PlantUMLPipe(str(self.tmp / "no-such-plantuml"), self.tmp)
+        with self.assertRaisesRegex(render.RenderError, "not found"):
+            pipe.render("@startuml\na\n@enduml")
+
+
+# Older PlantUML releases mark each element with a comment; newer ones wrap it in a classed group.
+COMMENT_SVG = (
+    '<svg><g><!--cluster s1--><rect fill="#F1F1F1" stroke="#181818"/><text fill="#000000">s1</text>'
+    '<!--entity s11--><rect fill="#F1F1F1" stroke="#181818"/>'
+    '<!--entity s2--><ellipse fill="#F1F1F1"/>'
+    '<!--link s11 to s2--><path d="M0 0" fill="none" stroke="#181818"/><polygon fill="#181818" stroke="#181818"/>'
+    "</g></svg>"
+)
+GROUP_SVG = (
+    '<svg><g><g class="cluster" data-qualified-name="top.s1" id="ent0001"><rect fill="#F1F1F1" stroke="#181818"/>'
+    '<text fill="#000000">s1</text></g>'
+    '<g class="entity" data-qualified-name="top.s1.s11" id="ent0002"><rect fill="#F1F1F1" stroke="#181818"/></g>'
+    '<g class="entity" data-qualified-name="top.s2" id="ent0003"><ellipse fill="#F1F1F1"/></g>'
+    '<g class="link" data-entity-1="ent0002" data-entity-2="ent0003" id="lnk4">'
+    '<path d="M0 0" fill="none" stroke="#181818"/><polygon fill="#181818" stroke="#181818"/></g>'
+    "</g></svg>"
+)
+
+
+class SvgDiagramTest(unittest.TestCase):
+    def test_highlight_recolors_states_and_transition_in_both_dialects(self) -> None:
+        highlight = render.Highlight(
+            "s2", "E", {"kind": "state", "from_state": "s11", "to_state": "s2"}, exits=["s11"]
+        )
+        for dialect, svg in (("comments", COMMENT_SVG), ("groups", GROUP_SVG)):
+            with self.subTest(dialect):
+                diagram = render.SvgDiagram(svg)
+                self.assertEqual(sorted(diagram.states), ["s1", "s11", "s2"])
+                self.assertEqual(list(diagram.links), [("s11", "s2")])
+                out = diagram.highlight(highlight).decode("utf-8")
+                s1, s11, s2, link = (
+                    out.split("s1", 1)[1].split("s11", 1)[0],
+                    out.split("s11", 1)[1].split("s2", 1)[0],
+                    out.split("s2", 1)[1].split("<path", 1)[0],
+                    out[out.index("<path"):],
+                )
+                # Fills of state shapes change; their borders, texts and unrelated states do not.
+                self.assertIn('<rect fill="#F1F1F1" stroke="#181818"/>', s1)
+                self.assertIn('<text fill="#000000">', s1)
+                self.assertIn(f'<rect fill="{render.EXIT_COLOR}" stroke="#181818"/>', s11)
+                self.assertIn(f'<ellipse fill="{render.ACTIVE_COLOR}"/>', s2)
+                color = render.TRANSITION_COLOR
+                self.assertIn(f'<path d="M0 0" fill="none" stroke="{color}"/>', link)
+                self.assertIn(f'<polygon fill="{color}" stroke="{color}"/>', link)
+                self.assertEqual(diagram.highlight(render.Highlight("missing")), svg.encode("utf-8"))
+
+    def test_entered_states_and_other_records_leave_links_alone(self) -> None:
+        diagram = render.SvgDiagram(GROUP_SVG)
+        out = diagram.highlight(
+            render.Highlight("s1", record={"kind": "entry", "state": "s11"}, entries=["s11"])
+        ).decode("utf-8")
+        self.assertIn(f'data-qualified-name="top.s1.s11" id="ent0002"><rect fill="{render.ENTRY_COLOR}"', out)
+        self.assertIn(f'id="ent0001"><rect fill="{render.ACTIVE_COLOR}"', out)
+        self.assertNotIn(render.TRANSITION_COLOR, out)
+
+if __name__ == "__main__":
+    unittest.main()
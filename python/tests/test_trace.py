@@ -0,0 +1,192 @@
+import contextlib
+import io
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from python import statesurf
+from python.benchmarks.models import nested_puml
+from python.tests.support import (
+    HSM_MODEL,
+    ScriptedCallbacks,
+    cpp_compiler,
+    drive,
+    load_python_machine,
+    native_trace,
+    native_trace_artifacts,
+    record_run,
+    rust_compiler,
+)
+
+
+class TraceModeTest(unittest.TestCase):
+    def test_trace_modes_keep_call_order(self) -> None:
+        reference = load_python_machine(module_name="hsm_trace_hooks")
+        for dispatch in ("switch", "table"):
+            for trace in ("none", "ring"):
+                module = load_python_machine(
+                    options=statesurf.CodegenOptions(dispatch=dispatch, trace=trace),
+                    module_name=f"hsm_trace_{trace}_{dispatch}",
+                )
+                for seed in range(5):
+                    with self.subTest(dispatch=dispatch, trace=trace, seed=seed):
+                        self.assertEqual(drive(module, "Hsm", seed, 200), drive(reference, "Hsm", seed, 200))
+                        self.assertEqual(
+                            drive(module, "Hsm", seed, 200, batch=9), drive(reference, "Hsm", seed, 200, batch=9)
+                        )
+
+    def test_ring_keeps_the_latest_records(self) -> None:
+        small = load_python_machine(
+            options=statesurf.CodegenOptions(trace="ring", trace_capacity=16), module_name="hsm_trace_ring16"
+        )
+        large = load_python_machine(
+            options=statesurf.CodegenOptions(trace="ring", trace_capacity=1024), module_name="hsm_trace_ring1024"
+        )
+        def machine_for(module):
+            return module.HsmMachine(type("Recorder", (ScriptedCallbacks, module.HsmCallbacks), {})(0))
+
+        machine = machine_for(small)
+        self.assertEqual(machine.trace(), [])
+        events = [small.HsmEvent.C, small.HsmEvent.E, small.HsmEvent.B]
+        for event in events:
+            machine.dispatch(event)
+        records = machine.trace()
+        self.assertEqual(records[0].from_state, small.HsmState.InitialPseudoState)
+        self.assertEqual([r.event for r in records if not r.transition], events)
+        self.assertEqual([r for r in records if r.transition][-1].to_state, machine.state())
+
+        reference = machine_for(large)
+        machine = machine_for(small)
+        for name in "CEBDAFGHICEBDAFGHI":
+            reference.dispatch(large.HsmEvent[name])
+            machine.dispatch(small.HsmEvent[name])
+        expected = [tuple(part.name if hasattr(part, "name") else part for part in r) for r in reference.trace()]
+        actual = [tuple(part.name if hasattr(part, "name") else part for part in r) for r in machine.trace()]
+        self.assertGreater(len(expected), 16)
+        self.assertEqual(actual, expected[-16:])
+
+    def test_none_mode_emits_no_trace_calls(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        for language in ("cpp", "rust", "python"):
+            with self.subTest(language=language):
+                code = statesurf.gen_code(
+                    model, "HsmMachine", language, "hsm", "Hsm", statesurf.CodegenOptions(trace="none")
+                )
+                self.assertNotIn("on_event(current_state_", code)
+                self.assertNotIn("on_event(self.state", code)
+                self.assertNotIn("on_event(self._state", code)
+                self.assertNotIn("trace_record", code)
+
+    def test_trace_capacity_must_be_a_power_of_two(self) -> None:
+        with self.assertRaises(ValueError):
+            statesurf.CodegenOptions(trace="ring", trace_capacity=48)
+
+
+class BinaryTraceTest(unittest.TestCase):
+    def test_dump_decodes_to_the_dispatched_events(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        for dispatch in ("switch", "table"):
+            for enums in ("str", "int"):
+                module = load_python_machine(
+                    options=statesurf.CodegenOptions(dispatch=dispatch, enums=enums, trace="binary", trace_capacity=16),
+                    module_name=f"hsm_binary_{dispatch}_{enums}",
+                )
+                with self.subTest(dispatch=dispatch, enums=enums):
+                    machine, expected = record_run(module, 3, 100)
+                    decoded = statesurf.decode_trace(model, machine.trace_dump())
+                    self.assertEqual((decoded.total, decoded.dropped, decoded.capacity), (100, 84, 16))
+                    names = {"InitialPseudoState": "[*]", "FinalPseudoState": "[*]"}
+                    self.assertEqual(
+                        [(e.state, e.event, e.dst, e.guards) for e in decoded.entries],
+                        [(names.get(s, s), e, names.get(d, d), g) for s, e, d, g in expected[-16:]],
+                    )
+                    timestamps = [entry.timestamp for entry in decoded.entries]
+                    self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_binary_mode_keeps_call_order(self) -> None:
+        reference = load_python_machine(module_name="hsm_binary_reference")
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(dispatch="table", trace="binary"), module_name="hsm_binary_order"
+        )
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                self.assertEqual(
+                    drive(module, "Hsm", seed, 200, batch=7), drive(reference, "Hsm", seed, 200, batch=7)
+                )
+
+    def test_decode_rejects_foreign_dumps(self) -> None:
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(trace="binary"), module_name="hsm_binary_foreign"
+        )
+        machine, _ = record_run(module, 1, 10)
+        dump = machine.trace_dump()
+        other = statesurf.parse_puml_text(nested_puml(depth=2, width=2))
+        for data in (dump[:10], b"XXXX" + dump[4:], dump[:-1]):
+            with self.assertRaises(ValueError):
+                statesurf.decode_trace(statesurf.parse_puml(HSM_MODEL), data)
+        with self.assertRaises(ValueError):
+            statesurf.decode_trace(other, dump)
+
+    def test_decode_trace_command(self) -> None:
+        module = load_python_machine(
+            options=statesurf.CodegenOptions(trace="binary"), module_name="hsm_binary_cli"
+        )
+        machine, expected = record_run(module, 2, 40)
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trace.bin"
+            path.write_bytes(machine.trace_dump())
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                code = statesurf.main(["decode-trace", "-i", str(HSM_MODEL), str(path), "-n", "3"])
+        self.assertEqual(code, 0)
+        output = stdout.getvalue()
+        self.assertIn("40 of 40 dispatches retained", output)
+        self.assertIn(f"--{expected[-1][1]}-->", output)
+        self.assertIn("share  transition", output)
+
+
+@unittest.skipUnless(cpp_compiler(), "needs a C++ compiler")
+class CppTraceTest(unittest.TestCase):
+    def test_trace_modes_keep_call_order(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        expected = native_trace("cpp", model, statesurf.CodegenOptions(), 2000)
+        for dispatch in ("switch", "table"):
+            for trace in ("none", "ring"):
+                with self.subTest(dispatch=dispatch, trace=trace):
+                    options = statesurf.CodegenOptions(dispatch=dispatch, trace=trace, trace_capacity=8)
+                    self.assertEqual(native_trace("cpp", model, options, 2000), expected)
+
+    def test_binary_trace_matches_dispatches(self) -> None:
+        model = statesurf.parse_puml(HSM_MODEL)
+        expected = native_trace("cpp", model, statesurf.CodegenOptions(), 500)
+        states = [int(line.split()[1]) for line in expected.splitlines() if line.startswith("state ")]
+        dumps = []
+        for dispatch in ("switch", "table"):
+            with self.subTest(dispatch=dispatch):
+                options = statesurf.CodegenOptions(dispatch=dispatch, trace="binary", trace_capacity=32)
+                out, files = native_trace_artifacts("cpp", model, options, 500)
+                dump = files["trace.bin"]
+                self.assertEqual(out, expected)
+                records = list(statesurf.TRACE_RECORD.iter_unpack(dump[statesurf.TRACE_HEADER.size:]))
+                self.assertEqual([record[3] for record in records], states[-32:])
+                self.assertEqual(statesurf.decode_trace(model, dump).total, 500)
+                dumps.append(dump)
+        self.assertEqual(dumps[0], dumps[1])
+        if rust_compiler():
+            options = statesurf.CodegenOptions(dispatch="table", trace="binary", trace_capacity=32)
+            self.assertEqual(native_trace_artifacts("rust", model, options, 500)[1]["trace.bin"], dumps[0])
+
+
+@unittest.skipUnless(rust_compiler(), "needs rustc")
+class RustTraceTest(unittest.TestCase):
+    def test_trace_modes_keep_call_order(self) -> None:
+        model = statesurf.parse_puml_text(nested_puml(depth=6, width=3, seed=4))
+        expected = native_trace("rust", model, statesurf.CodegenOptions(), 2000)
+        for trace in ("none", "ring"):
+            with self.subTest(trace=trace):
+                options = statesurf.CodegenOptions(dispatch="table", trace=trace, trace_capacity=8)
+                self.assertEqual(native_trace("rust", model, options, 2000), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
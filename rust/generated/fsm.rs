@@ -118,6 +118,43 @@ pub mod fsm {
                 }
             }
             on_event(self.state, event);
+            self.react(event);
+        }
+
+        /// Dispatches `events` in order, exactly like repeated `dispatch`
+        /// calls, with the started/terminated checks hoisted out of the loop.
+        /// Accepts slices (`&[Event]`) as well as iterators of events, stops
+        /// right after the event that terminates the machine and returns the
+        /// number of events consumed.
+        pub fn dispatch_many<I>(&mut self, events: I) -> usize
+        where
+            I: IntoIterator,
+            I::Item: core::borrow::Borrow<FsmEvent>,
+        {
+            if self.terminated {
+                return 0;
+            }
+            if !self.started {
+                self.start();
+                if !self.started {
+                    return 0;
+                }
+            }
+            let mut consumed = 0;
+            for item in events {
+                let event = *<I::Item as core::borrow::Borrow<FsmEvent>>::borrow(&item);
+                on_event(self.state, event);
+                self.react(event);
+                consumed += 1;
+                if self.terminated {
+                    break;
+                }
+            }
+            consumed
+        }
+
+        #[inline]
+        fn react(&mut self, event: FsmEvent) {
             match self.state {
                 FsmState::State1 => {
                     match event {
@@ -127,6 +127,43 @@ pub mod hsm {
                 }
             }
             on_event(self.state, event);
+            self.react(event);
+        }
+
+        /// Dispatches `events` in order, exactly like repeated `dispatch`
+        /// calls, with the started/terminated checks hoisted out of the loop.
+        /// Accepts slices (`&[Event]`) as well as iterators of events, stops
+        /// right after the event that terminates the machine and returns the
+        /// number of events consumed.
+        pub fn dispatch_many<I>(&mut self, events: I) -> usize
+        where
+            I: IntoIterator,
+            I::Item: core::borrow::Borrow<HsmEvent>,
+        {
+            if self.terminated {
+                return 0;
+            }
+            if !self.started {
+                self.start();
+                if !self.started {
+                    return 0;
+                }
+            }
+            let mut consumed = 0;
+            for item in events {
+                let event = *<I::Item as core::borrow::Borrow<HsmEvent>>::borrow(&item);
+                on_event(self.state, event);
+                self.react(event);
+                consumed += 1;
+                if self.terminated {
+                    break;
+                }
+            }
+            consumed
+        }
+
+        #[inline]
+        fn react(&mut self, event: HsmEvent) {
             match self.state {
                 HsmState::s => {
                     match event {
@@ -0,0 +1,462 @@
+#[allow(dead_code)]
+#[allow(non_camel_case_types)]
+#[allow(clippy::upper_case_acronyms)]
+#[allow(unreachable_code)]
+#[allow(unreachable_patterns)]
+pub mod hsm {
+    #[derive(Clone, Copy, Debug, PartialEq, Eq)]
+    pub enum HsmState {
+        InitialPseudoState,
+        s,
+        s1,
+        s11,
+        s2,
+        s21,
+        s211,
+        FinalPseudoState,
+    }
+
+    #[derive(Clone, Copy, Debug, PartialEq, Eq)]
+    pub enum HsmEvent {
+        A,
+        B,
+        C,
+        D,
+        E,
+        F,
+        G,
+        H,
+        I,
+        TERMINATE
+    }
+
+    impl Default for HsmEvent {
+        fn default() -> Self {
+            HsmEvent::A
+        }
+    }
+
+    #[derive(Clone, Copy, Debug, PartialEq, Eq)]
+    pub enum HsmGuardId {
+        isFooTrue,
+        isFooFalse
+    }
+
+    #[derive(Clone, Copy, Debug, PartialEq, Eq)]
+    pub enum HsmActionId {
+        setFooFalse,
+        setFooTrue
+    }
+
+    pub trait HsmCallbacks {
+        fn on_entry(&mut self, state: HsmState);
+        fn on_exit(&mut self, state: HsmState);
+        fn guard(&mut self, state: HsmState, event: HsmEvent, guard: HsmGuardId) -> bool;
+        fn action(&mut self, state: HsmState, event: HsmEvent, action: HsmActionId);
+    }
+
+    #[inline]
+    pub fn on_event(_state: HsmState, _event: HsmEvent) {}
+
+    #[inline]
+    pub fn on_transition(_from: HsmState, _to: HsmState, _event: HsmEvent) {}
+
+    /// Flattened transition plan interpreted by the machine's `react`.
+    ///
+    /// Rows of cell `state * EVENT_COUNT + event` are
+    /// `ROWS[CELL_ROWS[cell]..CELL_ROWS[cell + 1]]`; the first row whose guard
+    /// passes (or that has none) runs its `OPS` span.
+    mod tables {
+        use super::{HsmActionId, HsmGuardId, HsmState};
+
+        pub const OP_TRANSITION: u8 = 0;
+        pub const OP_EXIT: u8 = 1;
+        pub const OP_ENTRY: u8 = 2;
+        pub const OP_ACTION: u8 = 3;
+        pub const OP_SET_STATE: u8 = 4;
+        pub const OP_TERMINATE: u8 = 5;
+
+        pub struct Op {
+            pub kind: u8,
+            pub state: u8,
+            pub action: u8,
+        }
+
+        pub struct Row {
+            pub guard: u8,
+            pub first: u8,
+            pub count: u8,
+        }
+
+        pub const EVENT_COUNT: usize = 10;
+        pub const CURRENT_STATE: u8 = 8;
+        pub const NO_GUARD: u8 = 2;
+
+        pub const STATES: [HsmState; 8] = [
+            HsmState::InitialPseudoState,
+            HsmState::s,
+            HsmState::s1,
+            HsmState::s11,
+            HsmState::s2,
+            HsmState::s21,
+            HsmState::s211,
+            HsmState::FinalPseudoState,
+        ];
+
+        pub const GUARDS: [HsmGuardId; 2] = [
+            HsmGuardId::isFooTrue,
+            HsmGuardId::isFooFalse,
+        ];
+
+        pub const ACTIONS: [HsmActionId; 2] = [
+            HsmActionId::setFooFalse,
+            HsmActionId::setFooTrue,
+        ];
+
+        pub static OPS: [Op; 141] = [
+            Op { kind: OP_TRANSITION, state: 8, action: 0 },
+            Op { kind: OP_ACTION, state: 8, action: 0 },
+            Op { kind: OP_TRANSITION, state: 7, action: 0 },
+            Op { kind: OP_EXIT, state: 1, action: 0 },
+            Op { kind: OP_ENTRY, state: 7, action: 0 },
+            Op { kind: OP_SET_STATE, state: 7, action: 0 },
+            Op { kind: OP_TERMINATE, state: 7, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 1, action: 0 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 8, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_ACTION, state: 8, action: 1 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 4, action: 0 },
+            Op { kind: OP_ENTRY, state: 5, action: 0 },
+            Op { kind: OP_ENTRY, state: 6, action: 0 },
+            Op { kind: OP_SET_STATE, state: 6, action: 0 },
+            Op { kind: OP_TRANSITION, state: 7, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_EXIT, state: 1, action: 0 },
+            Op { kind: OP_ENTRY, state: 7, action: 0 },
+            Op { kind: OP_SET_STATE, state: 7, action: 0 },
+            Op { kind: OP_TERMINATE, state: 7, action: 0 },
+            Op { kind: OP_TRANSITION, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 4, action: 0 },
+            Op { kind: OP_ENTRY, state: 5, action: 0 },
+            Op { kind: OP_ENTRY, state: 6, action: 0 },
+            Op { kind: OP_SET_STATE, state: 6, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 3, action: 0 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 3, action: 0 },
+            Op { kind: OP_ACTION, state: 8, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_ACTION, state: 8, action: 1 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 3, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 7, action: 0 },
+            Op { kind: OP_EXIT, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 2, action: 0 },
+            Op { kind: OP_EXIT, state: 1, action: 0 },
+            Op { kind: OP_ENTRY, state: 7, action: 0 },
+            Op { kind: OP_SET_STATE, state: 7, action: 0 },
+            Op { kind: OP_TERMINATE, state: 7, action: 0 },
+            Op { kind: OP_TRANSITION, state: 8, action: 0 },
+            Op { kind: OP_ACTION, state: 8, action: 1 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 4, action: 0 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 7, action: 0 },
+            Op { kind: OP_EXIT, state: 4, action: 0 },
+            Op { kind: OP_EXIT, state: 1, action: 0 },
+            Op { kind: OP_ENTRY, state: 7, action: 0 },
+            Op { kind: OP_SET_STATE, state: 7, action: 0 },
+            Op { kind: OP_TERMINATE, state: 7, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 5, action: 0 },
+            Op { kind: OP_EXIT, state: 4, action: 0 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 5, action: 0 },
+            Op { kind: OP_ENTRY, state: 5, action: 0 },
+            Op { kind: OP_ENTRY, state: 6, action: 0 },
+            Op { kind: OP_SET_STATE, state: 6, action: 0 },
+            Op { kind: OP_TRANSITION, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 5, action: 0 },
+            Op { kind: OP_ENTRY, state: 6, action: 0 },
+            Op { kind: OP_SET_STATE, state: 6, action: 0 },
+            Op { kind: OP_TRANSITION, state: 7, action: 0 },
+            Op { kind: OP_EXIT, state: 5, action: 0 },
+            Op { kind: OP_EXIT, state: 4, action: 0 },
+            Op { kind: OP_EXIT, state: 1, action: 0 },
+            Op { kind: OP_ENTRY, state: 7, action: 0 },
+            Op { kind: OP_SET_STATE, state: 7, action: 0 },
+            Op { kind: OP_TERMINATE, state: 7, action: 0 },
+            Op { kind: OP_TRANSITION, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 6, action: 0 },
+            Op { kind: OP_ENTRY, state: 6, action: 0 },
+            Op { kind: OP_SET_STATE, state: 6, action: 0 },
+            Op { kind: OP_TRANSITION, state: 3, action: 0 },
+            Op { kind: OP_EXIT, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 5, action: 0 },
+            Op { kind: OP_EXIT, state: 4, action: 0 },
+            Op { kind: OP_ENTRY, state: 2, action: 0 },
+            Op { kind: OP_ENTRY, state: 3, action: 0 },
+            Op { kind: OP_SET_STATE, state: 3, action: 0 },
+            Op { kind: OP_TRANSITION, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 5, action: 0 },
+            Op { kind: OP_ENTRY, state: 5, action: 0 },
+            Op { kind: OP_ENTRY, state: 6, action: 0 },
+            Op { kind: OP_SET_STATE, state: 6, action: 0 },
+            Op { kind: OP_TRANSITION, state: 7, action: 0 },
+            Op { kind: OP_EXIT, state: 6, action: 0 },
+            Op { kind: OP_EXIT, state: 5, action: 0 },
+            Op { kind: OP_EXIT, state: 4, action: 0 },
+            Op { kind: OP_EXIT, state: 1, action: 0 },
+            Op { kind: OP_ENTRY, state: 7, action: 0 },
+            Op { kind: OP_SET_STATE, state: 7, action: 0 },
+            Op { kind: OP_TERMINATE, state: 7, action: 0 },
+        ];
+
+        pub static ROWS: [Row; 48] = [
+            Row { guard: 2, first: 7, count: 5 }, // s / E
+            Row { guard: 0, first: 0, count: 2 }, // s / I [isFooTrue]
+            Row { guard: 2, first: 2, count: 5 }, // s / TERMINATE
+            Row { guard: 2, first: 19, count: 5 }, // s1 / A
+            Row { guard: 2, first: 24, count: 4 }, // s1 / B
+            Row { guard: 2, first: 28, count: 6 }, // s1 / C
+            Row { guard: 1, first: 13, count: 6 }, // s1 / D [isFooFalse]
+            Row { guard: 2, first: 19, count: 5 }, // s1 / E
+            Row { guard: 2, first: 28, count: 6 }, // s1 / F
+            Row { guard: 2, first: 12, count: 1 }, // s1 / I
+            Row { guard: 2, first: 34, count: 6 }, // s1 / TERMINATE
+            Row { guard: 2, first: 64, count: 6 }, // s11 / A
+            Row { guard: 2, first: 70, count: 4 }, // s11 / B
+            Row { guard: 2, first: 40, count: 7 }, // s11 / C
+            Row { guard: 0, first: 52, count: 5 }, // s11 / D [isFooTrue]
+            Row { guard: 1, first: 57, count: 7 }, // s11 / D [isFooFalse]
+            Row { guard: 2, first: 64, count: 6 }, // s11 / E
+            Row { guard: 2, first: 40, count: 7 }, // s11 / F
+            Row { guard: 2, first: 40, count: 7 }, // s11 / G
+            Row { guard: 2, first: 47, count: 5 }, // s11 / H
+            Row { guard: 2, first: 12, count: 1 }, // s11 / I
+            Row { guard: 2, first: 74, count: 7 }, // s11 / TERMINATE
+            Row { guard: 2, first: 83, count: 5 }, // s2 / C
+            Row { guard: 2, first: 83, count: 5 }, // s2 / E
+            Row { guard: 2, first: 83, count: 5 }, // s2 / F
+            Row { guard: 1, first: 81, count: 2 }, // s2 / I [isFooFalse]
+            Row { guard: 0, first: 0, count: 2 }, // s2 / I [isFooTrue]
+            Row { guard: 2, first: 88, count: 6 }, // s2 / TERMINATE
+            Row { guard: 2, first: 100, count: 5 }, // s21 / A
+            Row { guard: 2, first: 105, count: 4 }, // s21 / B
+            Row { guard: 2, first: 94, count: 6 }, // s21 / C
+            Row { guard: 2, first: 94, count: 6 }, // s21 / E
+            Row { guard: 2, first: 94, count: 6 }, // s21 / F
+            Row { guard: 2, first: 94, count: 6 }, // s21 / G
+            Row { guard: 1, first: 81, count: 2 }, // s21 / I [isFooFalse]
+            Row { guard: 0, first: 0, count: 2 }, // s21 / I [isFooTrue]
+            Row { guard: 2, first: 109, count: 7 }, // s21 / TERMINATE
+            Row { guard: 2, first: 127, count: 6 }, // s211 / A
+            Row { guard: 2, first: 116, count: 4 }, // s211 / B
+            Row { guard: 2, first: 120, count: 7 }, // s211 / C
+            Row { guard: 2, first: 116, count: 4 }, // s211 / D
+            Row { guard: 2, first: 120, count: 7 }, // s211 / E
+            Row { guard: 2, first: 120, count: 7 }, // s211 / F
+            Row { guard: 2, first: 120, count: 7 }, // s211 / G
+            Row { guard: 2, first: 120, count: 7 }, // s211 / H
+            Row { guard: 1, first: 81, count: 2 }, // s211 / I [isFooFalse]
+            Row { guard: 0, first: 0, count: 2 }, // s211 / I [isFooTrue]
+            Row { guard: 2, first: 133, count: 8 }, // s211 / TERMINATE
+        ];
+
+        pub static CELL_ROWS: [u8; 81] = [
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, 0, 0, 0, 0, 1, 1, 1, 1, 2,
+            3, 4, 5, 6, 7, 8, 9, 9, 9, 10,
+            11, 12, 13, 14, 16, 17, 18, 19, 20, 21,
+            22, 22, 22, 23, 23, 24, 25, 25, 25, 27,
+            28, 29, 30, 31, 31, 32, 33, 34, 34, 36,
+            37, 38, 39, 40, 41, 42, 43, 44, 45, 47,
+            48, 48, 48, 48, 48, 48, 48, 48, 48, 48,
+            48,
+        ];
+    }
+
+    pub struct HsmMachine<H: HsmCallbacks> {
+        callbacks: H,
+        state: HsmState,
+        started: bool,
+        terminated: bool,
+    }
+
+    impl<H: HsmCallbacks> HsmMachine<H> {
+        pub fn new(callbacks: H) -> Self {
+            let mut machine = Self {
+                callbacks,
+                state: HsmState::InitialPseudoState,
+                started: false,
+                terminated: false,
+            };
+            machine.reset();
+            machine
+        }
+
+        pub fn reset(&mut self) {
+            self.terminated = false;
+            self.started = false;
+            self.state = HsmState::InitialPseudoState;
+        }
+
+        pub fn start(&mut self) {
+            if self.terminated || self.started {
+                return;
+            }
+            self.started = true;
+            on_transition(HsmState::InitialPseudoState, HsmState::s211, HsmEvent::default());
+            self.state = HsmState::s211;
+            self.callbacks.action(HsmState::s, HsmEvent::default(), HsmActionId::setFooFalse);
+            self.callbacks.on_entry(HsmState::s);
+            self.callbacks.on_entry(HsmState::s2);
+            self.callbacks.on_entry(HsmState::s21);
+            self.callbacks.on_entry(HsmState::s211);
+        }
+
+        pub fn state(&self) -> HsmState {
+            self.state
+        }
+
+        pub fn terminated(&self) -> bool {
+            self.terminated
+        }
+
+        pub fn callbacks(&self) -> &H {
+            &self.callbacks
+        }
+
+        pub fn callbacks_mut(&mut self) -> &mut H {
+            &mut self.callbacks
+        }
+
+        pub fn dispatch(&mut self, event: HsmEvent) {
+            if self.terminated {
+                return;
+            }
+            if !self.started {
+                self.start();
+                if !self.started {
+                    return;
+                }
+            }
+            on_event(self.state, event);
+            self.react(event);
+        }
+
+        /// Dispatches `events` in order, exactly like repeated `dispatch`
+        /// calls, with the started/terminated checks hoisted out of the loop.
+        /// Accepts slices (`&[Event]`) as well as iterators of events, stops
+        /// right after the event that terminates the machine and returns the
+        /// number of events consumed.
+        pub fn dispatch_many<I>(&mut self, events: I) -> usize
+        where
+            I: IntoIterator,
+            I::Item: core::borrow::Borrow<HsmEvent>,
+        {
+            if self.terminated {
+                return 0;
+            }
+            if !self.started {
+                self.start();
+                if !self.started {
+                    return 0;
+                }
+            }
+            let mut consumed = 0;
+            for item in events {
+                let event = *<I::Item as core::borrow::Borrow<HsmEvent>>::borrow(&item);
+                on_event(self.state, event);
+                self.react(event);
+                consumed += 1;
+                if self.terminated {
+                    break;
+                }
+            }
+            consumed
+        }
+
+        #[inline]
+        fn react(&mut self, event: HsmEvent) {
+            let cell = self.state as usize * tables::EVENT_COUNT + event as usize;
+            let end = tables::CELL_ROWS[cell + 1] as usize;
+            let mut r = tables::CELL_ROWS[cell] as usize;
+            while r < end {
+                let row = &tables::ROWS[r];
+                if row.guard == tables::NO_GUARD
+                    || self.callbacks.guard(self.state, event, tables::GUARDS[row.guard as usize])
+                {
+                    self.run(row.first as usize, row.count as usize, event);
+                    return;
+                }
+                r += 1;
+            }
+        }
+
+        fn run(&mut self, first: usize, count: usize, event: HsmEvent) {
+            for op in &tables::OPS[first..first + count] {
+                let state = if op.state == tables::CURRENT_STATE {
+                    self.state
+                } else {
+                    tables::STATES[op.state as usize]
+                };
+                match op.kind {
+                    tables::OP_TRANSITION => on_transition(self.state, state, event),
+                    tables::OP_EXIT => self.callbacks.on_exit(state),
+                    tables::OP_ENTRY => self.callbacks.on_entry(state),
+                    tables::OP_ACTION => {
+                        self.callbacks.action(state, event, tables::ACTIONS[op.action as usize])
+                    }
+                    tables::OP_SET_STATE => self.state = state,
+                    _ => self.terminated = true,
+                }
+            }
+        }
+    }
+}
\ No newline at end of file
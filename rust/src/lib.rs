@@ -3,6 +3,10 @@ pub mod generated {
         include!(concat!(env!("CARGO_MANIFEST_DIR"), "/generated/hsm.rs"));
     }
 
+    pub mod hsm_table {
+        include!(concat!(env!("CARGO_MANIFEST_DIR"), "/generated/hsm_table.rs"));
+    }
+
     pub mod fsm {
         include!(concat!(env!("CARGO_MANIFEST_DIR"), "/generated/fsm.rs"));
     }
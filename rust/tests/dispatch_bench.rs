@@ -0,0 +1,114 @@
+//! Dispatch latency of the `match` and table backends for `hsm.puml`.
+//!
+//! A dependency-free, Criterion-style measurement: warm up, then take several
+//! timed samples and report the best and median ns/dispatch. Run with
+//! `cargo test --release --test dispatch_bench -- --ignored --nocapture`.
+//! `python3 -m python.benchmarks.bench_rust_backends` adds `.text` sizes and a
+//! large synthetic model.
+
+use std::hint::black_box;
+use std::time::Instant;
+
+use state_surf::generated::hsm::hsm as matched;
+use state_surf::generated::hsm_table::hsm as table;
+
+const EVENTS: usize = 1 << 16;
+const SAMPLES: usize = 15;
+
+fn next(x: &mut u64) -> u64 {
+    *x ^= *x << 13;
+    *x ^= *x >> 7;
+    *x ^= *x << 17;
+    *x
+}
+
+macro_rules! counter {
+    ($name:ident, $m:ident) => {
+        struct $name {
+            rng: u64,
+            sink: u64,
+        }
+
+        impl $m::HsmCallbacks for $name {
+            fn on_entry(&mut self, state: $m::HsmState) {
+                self.sink += state as u64;
+            }
+
+            fn on_exit(&mut self, state: $m::HsmState) {
+                self.sink += (state as u64) << 1;
+            }
+
+            fn guard(&mut self, _: $m::HsmState, _: $m::HsmEvent, _: $m::HsmGuardId) -> bool {
+                next(&mut self.rng) & 1 == 1
+            }
+
+            fn action(&mut self, _: $m::HsmState, _: $m::HsmEvent, action: $m::HsmActionId) {
+                self.sink += action as u64;
+            }
+        }
+    };
+}
+
+counter!(MatchCounter, matched);
+counter!(TableCounter, table);
+
+fn indices() -> Vec<usize> {
+    let mut x = 0x2545_F491_4F6C_DD1D;
+    (0..EVENTS).map(|_| (next(&mut x) % 10) as usize).collect()
+}
+
+fn report(name: &str, mut samples: Vec<f64>) {
+    samples.sort_by(|a, b| a.partial_cmp(b).unwrap());
+    println!(
+        "{:<8} best {:>7.2} ns/dispatch   median {:>7.2} ns/dispatch",
+        name,
+        samples[0],
+        samples[samples.len() / 2]
+    );
+}
+
+macro_rules! measure {
+    ($m:ident, $callbacks:expr) => {{
+        let events: Vec<$m::HsmEvent> = indices()
+            .into_iter()
+            .map(|i| {
+                [
+                    $m::HsmEvent::A,
+                    $m::HsmEvent::B,
+                    $m::HsmEvent::C,
+                    $m::HsmEvent::D,
+                    $m::HsmEvent::E,
+                    $m::HsmEvent::F,
+                    $m::HsmEvent::G,
+                    $m::HsmEvent::H,
+                    $m::HsmEvent::I,
+                    $m::HsmEvent::TERMINATE,
+                ][i]
+            })
+            .collect();
+        let mut machine = $m::HsmMachine::new($callbacks);
+        let mut samples = Vec::with_capacity(SAMPLES);
+        for sample in 0..=SAMPLES {
+            let started = Instant::now();
+            for &event in &events {
+                machine.dispatch(black_box(event));
+                if machine.terminated() {
+                    machine.reset();
+                }
+            }
+            // The first pass only warms up caches and branch predictors.
+            if sample > 0 {
+                samples.push(started.elapsed().as_nanos() as f64 / EVENTS as f64);
+            }
+        }
+        black_box(machine.callbacks().sink);
+        samples
+    }};
+}
+
+#[test]
+#[ignore]
+fn dispatch_latency() {
+    report("match", measure!(matched, MatchCounter { rng: 1, sink: 0 }));
+    report("table", measure!(table, TableCounter { rng: 1, sink: 0 }));
+}
@@ -231,3 +231,38 @@ fn drives_through_lifecycle() {
         assert_eq!(callbacks_view.entries, vec![HsmState::FinalPseudoState]);
     }
 }
+
+#[test]
+fn dispatch_many_matches_repeated_dispatch() {
+    let events = [
+        HsmEvent::G,
+        HsmEvent::I,
+        HsmEvent::A,
+        HsmEvent::D,
+        HsmEvent::D,
+        HsmEvent::C,
+        HsmEvent::E,
+        HsmEvent::I,
+        HsmEvent::I,
+        HsmEvent::TERMINATE,
+        HsmEvent::A,
+        HsmEvent::B,
+    ];
+
+    let mut single = HsmMachine::new(RecordingCallbacks::new());
+    for event in events {
+        single.dispatch(event);
+    }
+
+    let mut batch = HsmMachine::new(RecordingCallbacks::new());
+    let consumed = batch.dispatch_many(&events);
+
+    assert_eq!(consumed, 10);
+    assert!(batch.terminated());
+    assert_eq!(batch.state(), single.state());
+    assert_eq!(batch.callbacks().entries, single.callbacks().entries);
+    assert_eq!(batch.callbacks().exits, single.callbacks().exits);
+    assert_eq!(batch.callbacks().actions, single.callbacks().actions);
+    assert_eq!(batch.callbacks().guard_calls, single.callbacks().guard_calls);
+    assert_eq!(batch.dispatch_many(events.iter().copied()), 0);
+}
@@ -0,0 +1,89 @@
+use state_surf::generated::hsm::hsm as matched;
+use state_surf::generated::hsm_table::hsm as table;
+
+fn next(x: &mut u64) -> u64 {
+    *x ^= *x << 13;
+    *x ^= *x >> 7;
+    *x ^= *x << 17;
+    *x
+}
+
+/// Records every callback as text and answers guards from a seeded generator.
+macro_rules! recorder {
+    ($name:ident, $m:ident) => {
+        struct $name {
+            rng: u64,
+            log: Vec<String>,
+        }
+
+        impl $m::HsmCallbacks for $name {
+            fn on_entry(&mut self, state: $m::HsmState) {
+                self.log.push(format!("entry {:?}", state));
+            }
+
+            fn on_exit(&mut self, state: $m::HsmState) {
+                self.log.push(format!("exit {:?}", state));
+            }
+
+            fn guard(&mut self, state: $m::HsmState, event: $m::HsmEvent, guard: $m::HsmGuardId) -> bool {
+                let decision = next(&mut self.rng) & 1 == 1;
+                self.log.push(format!("guard {:?} {:?} {:?} {}", state, event, guard, decision));
+                decision
+            }
+
+            fn action(&mut self, state: $m::HsmState, event: $m::HsmEvent, action: $m::HsmActionId) {
+                self.log.push(format!("action {:?} {:?} {:?}", state, event, action));
+            }
+        }
+    };
+}
+
+recorder!(MatchRecorder, matched);
+recorder!(TableRecorder, table);
+
+const MATCH_EVENTS: [matched::HsmEvent; 10] = [
+    matched::HsmEvent::A,
+    matched::HsmEvent::B,
+    matched::HsmEvent::C,
+    matched::HsmEvent::D,
+    matched::HsmEvent::E,
+    matched::HsmEvent::F,
+    matched::HsmEvent::G,
+    matched::HsmEvent::H,
+    matched::HsmEvent::I,
+    matched::HsmEvent::TERMINATE,
+];
+
+const TABLE_EVENTS: [table::HsmEvent; 10] = [
+    table::HsmEvent::A,
+    table::HsmEvent::B,
+    table::HsmEvent::C,
+    table::HsmEvent::D,
+    table::HsmEvent::E,
+    table::HsmEvent::F,
+    table::HsmEvent::G,
+    table::HsmEvent::H,
+    table::HsmEvent::I,
+    table::HsmEvent::TERMINATE,
+];
+
+#[test]
+fn table_dispatch_matches_match_dispatch() {
+    for seed in 1..=20u64 {
+        let mut reference = matched::HsmMachine::new(MatchRecorder { rng: seed, log: Vec::new() });
+        let mut machine = table::HsmMachine::new(TableRecorder { rng: seed, log: Vec::new() });
+        let mut stream = seed.wrapping_mul(0x9E37_79B9_7F4A_7C15) | 1;
+        for _ in 0..500 {
+            let index = (next(&mut stream) % 10) as usize;
+            reference.dispatch(MATCH_EVENTS[index]);
+            machine.dispatch(TABLE_EVENTS[index]);
+            assert_eq!(format!("{:?}", reference.state()), format!("{:?}", machine.state()));
+            assert_eq!(reference.terminated(), machine.terminated());
+            if machine.terminated() {
+                reference.reset();
+                machine.reset();
+            }
+        }
+        assert_eq!(reference.callbacks().log, machine.callbacks().log, "seed {}", seed);
+    }
+}
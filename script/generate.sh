@@ -14,12 +14,13 @@ SIM_OUTPUT_DIR="${ROOT_DIR}/simulation/generated"
 mkdir -p "${OUTPUT_DIR}"
 mkdir -p "${RUST_OUTPUT_DIR}"
 mkdir -p "${PYTHON_OUTPUT_DIR}"
-shopt -s nullglob
-for puml in "${PLANTUML_DIR}"/*.puml; do
-  name="$(basename "${puml}" .puml)"
-  python3 "${GENERATOR}" generate -i "${puml}" -o "${OUTPUT_DIR}/${name}.hpp" -l cpp
-  python3 "${GENERATOR}" generate -i "${puml}" -o "${RUST_OUTPUT_DIR}/${name}.rs" -l rust
-  python3 "${GENERATOR}" generate -i "${puml}" -o "${PYTHON_OUTPUT_DIR}/${name}.py" -l python
-done
+# One process parses each model once and renders every language from it.
+python3 "${GENERATOR}" generate-all \
+  -i "${PLANTUML_DIR}/*.puml" \
+  -l cpp rust python \
+  -o "${ROOT_DIR}/{language}/generated/{stem}{ext}"
+
+# Table-driven Rust variant, exercised by rust/tests/hsm_table_test.rs.
+python3 "${GENERATOR}" generate -i "${PLANTUML_DIR}/hsm.puml" -o "${RUST_OUTPUT_DIR}/hsm_table.rs" -l rust --dispatch table
 
 python3 "${GENERATOR}" simulate -i "${PLANTUML_DIR}/fsm.puml" --sim-dir "${SIM_OUTPUT_DIR}"